@@ -0,0 +1,105 @@
+from pathlib import Path
+from typing import Any, NamedTuple
+import asyncio
+import hashlib
+import json
+import os
+import dns.asyncresolver
+import dns.exception
+import dns.name
+from .backends import RemoteRRSet, RRSetChange, RRSetKey, RRSetMap
+
+
+class AuditResult(NamedTuple):
+    domain: str
+    status: str                 # 'ok', 'drift' oder 'failed'
+    check: str                  # 'serial' (nur SOA-Zähler) oder 'full' (RRSets verglichen)
+    changes: list[RRSetChange]  # Änderungen, die den synchronisierten Stand wiederherstellen
+    message: str = ''
+
+
+class SyncState:
+    """Stand der Zonen nach dem letzten Upload, je Domain eine JSON-Datei.
+
+    Gespeichert werden die hochgeladenen RRSets und – sobald ein Audit sie
+    bestätigt hat – der SOA-Zähler, den die Nameserver dafür ausliefern.
+    """
+
+    def __init__(self, cache_dir: Path, config_file: Path) -> None:
+        key = hashlib.sha1(str(config_file.resolve()).encode('utf-8')).hexdigest()
+        self.dir = cache_dir / 'sync-state' / key
+
+    def _path(self, domain: str) -> Path:
+        return self.dir / f'{domain}.json'
+
+    def load(self, domain: str) -> tuple[RRSetMap, int | None] | None:
+        try:
+            entry = json.loads(self._path(domain).read_text(encoding='utf-8'))
+            rrsets = {(name, rdtype): (ttl, records) for name, rdtype, ttl, records in entry['rrsets']}
+            return rrsets, entry.get('serial')
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, domain: str, rrsets: RRSetMap, serial: int | None = None) -> None:
+        entry: dict[str, Any] = {
+            'serial': serial,
+            'rrsets': [[name, rdtype, ttl, records] for (name, rdtype), (ttl, records) in sorted(rrsets.items())],
+        }
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(domain)
+            tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+            tmp.write_text(json.dumps(entry), encoding='utf-8')
+            tmp.replace(path)
+        except OSError:
+            pass                  # ohne Zustand prüft das nächste Audit vollständig
+
+
+def remote_rrset_map(current: dict[RRSetKey, RemoteRRSet]) -> RRSetMap:
+    """Aktueller Stand beim Backend im Modell von zone_to_rrsets()."""
+    return {key: (rrset.ttl, sorted(rrset.records)) for key, rrset in current.items()}
+
+
+async def _serial(resolver: dns.asyncresolver.Resolver, domain: str,
+                  semaphore: asyncio.Semaphore, timeout: float) -> int | None:
+    async with semaphore:
+        try:
+            answer = await resolver.resolve(dns.name.from_text(domain), 'SOA', lifetime=timeout,
+                                            raise_on_no_answer=False)
+        except dns.exception.DNSException:
+            return None
+    if answer.rrset is None:
+        return None
+    return int(answer.rrset[0].serial)
+
+
+async def _live_serials(domains: list[str], name_servers: list[str], port: int,
+                        timeout: float, concurrency: int) -> dict[str, int | None]:
+    semaphore = asyncio.Semaphore(concurrency)
+    resolvers = []
+    for ns in name_servers:
+        resolver = dns.asyncresolver.Resolver(configure=False)
+        resolver.nameservers = [ns]
+        resolver.port = port
+        resolvers.append(resolver)
+    serials = await asyncio.gather(*(
+        _serial(r, d, semaphore, timeout) for d in domains for r in resolvers
+    ))
+    result: dict[str, int | None] = {}
+    for i, domain in enumerate(domains):
+        answers = set(serials[i * len(resolvers):(i + 1) * len(resolvers)])
+        # Nur ein übereinstimmender Zähler aller Nameserver ist verwertbar
+        result[domain] = answers.pop() if len(answers) == 1 else None
+    return result
+
+
+def live_serials(domains: list[str], name_servers: list[str], port: int = 53,
+                 timeout: float = 5.0, concurrency: int = 200) -> dict[str, int | None]:
+    """SOA-Zähler aller Domains von allen Nameservern, gleichzeitig abgefragt.
+
+    None, wenn ein Nameserver nicht antwortet oder die Nameserver
+    unterschiedliche Zähler ausliefern.
+    """
+    if not domains or not name_servers:
+        return {d: None for d in domains}
+    return asyncio.run(_live_serials(domains, name_servers, port, timeout, concurrency))
@@ -0,0 +1,630 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, NamedTuple, TextIO
+import logging
+import sys
+import threading
+import hcloud
+from hcloud.zones.client import BoundZoneRRSet
+from hcloud.zones.domain import ZoneRecord
+import dns.exception
+import dns.message
+import dns.name
+import dns.query
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.tokenizer
+import dns.tsig
+import dns.update
+import dns.xfr
+import dns.zone
+import dns.zonefile
+from .zone_cache import MAX_PER_PAGE, ZoneListCache, bound_zone, fetch_all_zones
+
+logger = logging.getLogger(__name__)
+
+RRSetKey = tuple[str, str]
+RRSetMap = dict[RRSetKey, tuple[int, list[str]]]
+OnApplied = Callable[[int], None] | None
+
+
+class BackendError(Exception):
+    """Fehler bei der Kommunikation mit einem Backend (außer hcloud-API-Fehlern)."""
+    pass
+
+
+class RemoteRRSet(NamedTuple):
+    """Aktueller Stand eines RRSets beim Backend."""
+    ttl: int
+    records: list[str]
+    protected: bool = False
+    handle: Any = None        # backend-spezifisches Objekt (z.B. hcloud BoundZoneRRSet)
+
+
+class RRSetChange(NamedTuple):
+    """Eine Änderung an einem RRSet: 'create', 'update' oder 'delete'."""
+    action: str
+    name: str
+    rdtype: str
+    ttl: int
+    records: list[str]
+    current: RemoteRRSet | None = None
+
+
+class RRSetOperation(NamedTuple):
+    """Ein API-Aufruf für ein bestehendes RRSet: 'set', 'add', 'remove' oder 'ttl'."""
+    action: str
+    records: list[str]
+
+
+class WriteCost(NamedTuple):
+    """Schreibaufwand von Änderungen: Anfragen und übertragene Records,
+    zum Vergleich bei vollständigem Ersetzen jedes geänderten RRSets."""
+    requests: int = 0
+    records: int = 0
+    full_requests: int = 0
+    full_records: int = 0
+
+    def __add__(self, other) -> 'WriteCost':
+        return WriteCost(*(a + b for a, b in zip(self, other)))
+
+
+def update_operations(change: RRSetChange, delta: bool = True) -> list[RRSetOperation]:
+    """Günstigste Folge von Aufrufen für ein 'update'.
+
+    Nur die TTL geändert: ein Aufruf ohne Records. Sonst entweder alle
+    Records ersetzen oder nur die hinzugekommenen ergänzen bzw. entfallenen
+    entfernen – maßgeblich ist die Zahl der Anfragen, bei Gleichstand die
+    Zahl der übertragenen Records. Ohne `delta` werden immer alle Records
+    ersetzt (Ergebnis unabhängig davon, ob der gelesene Stand aktuell war).
+    """
+    current = change.current
+    ttl = [RRSetOperation('ttl', [])] if current.ttl != change.ttl else []
+    existing, wanted = set(current.records), set(change.records)
+    if existing == wanted:
+        return ttl
+    full = [RRSetOperation('set', change.records)] + ttl
+    if not delta:
+        return full
+    partial = [RRSetOperation(action, sorted(values)) for action, values in
+             (('add', wanted - existing), ('remove', existing - wanted)) if values] + ttl
+    return min(full, partial, key=lambda ops: (len(ops), sum(len(op.records) for op in ops)))
+
+
+def zone_to_rrsets(zone: dns.zone.Zone) -> RRSetMap:
+    """Wandelt eine dnspython-Zone in {(name, rdtype): (ttl, [rdata_values])}.
+
+    SOA-Records werden ausgeschlossen (vom Backend verwaltet).
+    Hostnamen innerhalb der Zone werden relativ ausgegeben (wie Hetzner
+    sie erwartet), externe FQDNs behalten den abschließenden Punkt.
+    """
+    origin = zone.origin
+    result: RRSetMap = {}
+    for name, node in zone.nodes.items():
+        if name.is_absolute():
+            name = name.relativize(origin)
+        rel_name = '@' if name == dns.name.empty else str(name)
+        for rdataset in node.rdatasets:
+            rdtype = dns.rdatatype.to_text(rdataset.rdtype)
+            if rdtype == 'SOA':
+                continue
+            records = sorted(
+                r.to_text(origin=origin, relativize=True) for r in rdataset
+            )
+            result[(rel_name, rdtype)] = (int(rdataset.ttl), records)
+    return result
+
+
+class _TextReader:
+    """Liefert dem Tokenizer die Zeichen eines Strings, ohne ihn zu kopieren.
+
+    dns.tokenizer.Tokenizer legt für Strings ein io.StringIO an, das den
+    Text intern mit vier Byte je Zeichen vorhält.
+    """
+
+    __slots__ = ('text', 'pos')
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.pos = 0
+
+    def read(self, size: int = 1) -> str:
+        c = self.text[self.pos:self.pos + size]
+        self.pos += len(c)
+        return c
+
+
+class _RRSetSink:
+    """Nimmt die Records von dns.zonefile.Reader entgegen, ohne eine Zone aufzubauen.
+
+    Implementiert den Teil der Transaktions-Schnittstelle, den der Reader
+    nutzt. Diese Schnittstelle ist intern und mit dnspython 2.9 getestet;
+    weicht sie ab, liest text_to_rrsets() über dns.zone (siehe
+    _reader_usable()). Jeder Record wird sofort in Text umgewandelt;
+    Owner-Namen und Typen werden interniert, so dass je Name nur ein
+    String existiert.
+    """
+
+    def __init__(self, origin: dns.name.Name) -> None:
+        self.origin = origin
+        self.manager = self
+        self.rrsets: dict[RRSetKey, Any] = {}      # zunächst [ttl, records]
+        self.has_soa = False
+        self.cname: set[str] = set()
+        self.other: set[str] = set()
+
+    def origin_information(self):
+        return self.origin, True, self.origin
+
+    def check_put_rdataset(self, check) -> None:
+        pass                        # CNAME-Prüfung erfolgt in text_to_rrsets()
+
+    def _set_origin(self, origin) -> None:
+        pass
+
+    def add_unicode(self, value) -> None:
+        pass
+
+    def add(self, name: dns.name.Name, ttl: int, rdata) -> None:
+        if name.is_absolute():
+            name = name.relativize(self.origin)   # Namen außerhalb der Zone überspringt der Reader
+        rdtype = sys.intern(dns.rdatatype.to_text(rdata.rdtype))
+        if rdtype == 'SOA':
+            self.has_soa = self.has_soa or name == dns.name.empty
+            return
+        owner = sys.intern('@' if name == dns.name.empty else name.to_text())
+        if rdtype == 'CNAME':
+            self.cname.add(owner)
+        elif rdtype not in _NEUTRAL_TYPES:
+            self.other.add(owner)
+        value = rdata.to_text(origin=self.origin, relativize=True)
+        entry = self.rrsets.get((owner, rdtype))
+        if entry is None:
+            self.rrsets[(owner, rdtype)] = [ttl, [value]]
+        else:
+            # Wie dns.rdataset: die kleinste TTL gilt für das ganze RRSet
+            entry[0] = min(entry[0], ttl)
+            entry[1].append(value)
+
+
+# Typen, die neben einem CNAME stehen dürfen (wie dns.node)
+_NEUTRAL_TYPES = {'NSEC', 'NSEC3', 'RRSIG', 'KEY'}
+
+# Ergebnis von _reader_usable(), einmal je Prozess ermittelt
+_reader_ok: bool | None = None
+
+
+def _reader_usable() -> bool:
+    """Passt die Schnittstelle von dns.zonefile.Reader zu _RRSetSink?
+
+    Geprüft wird einmal mit einer minimalen Zone; nur dabei gelten
+    AttributeError und TypeError als abweichende Schnittstelle, Fehler beim
+    Lesen echter Zonen werden nicht abgefangen.
+    """
+    global _reader_ok
+    if _reader_ok is None:
+        origin = dns.name.from_text('probe.invalid')
+        tokenizer = dns.tokenizer.Tokenizer(_TextReader('@ 60 IN SOA ns hostmaster 1 2 3 4 5\n@ 60 IN NS ns\n'),
+                                            filename='<probe>')
+        try:
+            dns.zonefile.Reader(tokenizer, dns.rdataclass.IN, _RRSetSink(origin)).read()
+            _reader_ok = True
+        except (AttributeError, TypeError) as e:
+            logger.warning('dns.zonefile.Reader nicht nutzbar (%s), Zonen werden über dns.zone gelesen', e)
+            _reader_ok = False
+    return _reader_ok
+
+
+def text_to_rrsets(text: str | TextIO, origin: str) -> RRSetMap:
+    """Liest ein Zone-File (String oder geöffnete Datei) direkt in {(name, rdtype): (ttl, [rdata_values])}.
+
+    Ergebnis und Fehler entsprechen zone_to_rrsets(dns.zone.from_text(...)),
+    es entsteht aber keine dns.zone mit Node-, Rdataset- und Rdata-Objekten:
+    Der Speicherbedarf großer Zonen liegt nur wenig über dem des Ergebnisses.
+    """
+    origin_name = dns.name.from_text(origin)
+    if not _reader_usable():
+        # Andere Reader-Schnittstelle (dnspython-Version): über eine dns.zone lesen
+        if isinstance(text, str):
+            return zone_to_rrsets(dns.zone.from_text(text, origin=origin_name))
+        return zone_to_rrsets(dns.zone.from_file(text, origin=origin_name))
+    sink = _RRSetSink(origin_name)
+    if isinstance(text, str):
+        tokenizer = dns.tokenizer.Tokenizer(_TextReader(text), filename='<string>')
+    else:
+        tokenizer = dns.tokenizer.Tokenizer(text)
+    dns.zonefile.Reader(tokenizer, dns.rdataclass.IN, sink).read()
+    if not sink.has_soa:
+        raise dns.zone.NoSOA
+    if ('@', 'NS') not in sink.rrsets:
+        raise dns.zone.NoNS
+    if sink.cname & sink.other:
+        raise dns.zonefile.CNAMEAndOtherData('rdataset type is not compatible with a CNAME node')
+    rrsets = sink.rrsets
+    for key, (ttl, records) in rrsets.items():
+        # Werte ersetzen statt eine zweite Zuordnung aufzubauen
+        rrsets[key] = (ttl, sorted(set(records)) if len(records) > 1 else records)
+    return rrsets
+
+
+def zone_file_rrsets(path: str, origin: str) -> dict[RRSetKey, RemoteRRSet]:
+    """Liest ein Zone-File (z.B. ein Backup) als Stand beim Backend.
+
+    Die Datei wird zeichenweise gelesen (siehe text_to_rrsets()), weder der
+    Text noch eine dns.zone liegen als Ganzes im Speicher.
+    """
+    with open(path, encoding='utf-8') as fh:
+        rrsets = text_to_rrsets(fh, origin)
+    return {key: RemoteRRSet(ttl, records) for key, (ttl, records) in rrsets.items()}
+
+
+def plan_changes(desired: RRSetMap, current: dict[RRSetKey, RemoteRRSet]) -> list[RRSetChange]:
+    """Berechnet die Änderungen, die `current` in `desired` überführen.
+
+    Geschützte RRSets (``protected``) werden weder geändert noch gelöscht.
+    """
+    changes: list[RRSetChange] = []
+    for (name, rdtype), (ttl, records) in desired.items():
+        existing = current.get((name, rdtype))
+        if existing is None:
+            changes.append(RRSetChange('create', name, rdtype, ttl, records))
+            continue
+        if existing.protected:
+            logger.warning('RRSet %s/%s ist geschützt, wird übersprungen', name, rdtype)
+            continue
+        if sorted(existing.records) != records or existing.ttl != ttl:
+            changes.append(RRSetChange('update', name, rdtype, ttl, records, existing))
+
+    for (name, rdtype), existing in current.items():
+        if (name, rdtype) in desired:
+            continue
+        if existing.protected:
+            logger.warning('RRSet %s/%s ist geschützt, Löschung übersprungen', name, rdtype)
+            continue
+        changes.append(RRSetChange('delete', name, rdtype, existing.ttl, existing.records, existing))
+    return changes
+
+
+def rebind_changes(changes: list[RRSetChange], current: dict[RRSetKey, RemoteRRSet]) -> list[RRSetChange]:
+    """Bindet gespeicherte Änderungen (ohne Handles) an den aktuellen Stand.
+
+    Für das Fortsetzen abgebrochener Uploads: Änderungen, die bereits
+    angekommen sind (z.B. ein 'create', dessen Bestätigung fehlte), entfallen.
+    """
+    result: list[RRSetChange] = []
+    for ch in changes:
+        existing = current.get((ch.name, ch.rdtype))
+        if ch.action == 'delete':
+            if existing is not None and not existing.protected:
+                result.append(ch._replace(current=existing))
+        elif existing is None:
+            result.append(RRSetChange('create', ch.name, ch.rdtype, ch.ttl, ch.records))
+        elif existing.protected:
+            logger.warning('RRSet %s/%s ist geschützt, wird übersprungen', ch.name, ch.rdtype)
+        elif sorted(existing.records) != ch.records or existing.ttl != ch.ttl:
+            result.append(RRSetChange('update', ch.name, ch.rdtype, ch.ttl, ch.records, existing))
+    return result
+
+
+def _tsig_args(key: dns.tsig.Key | None) -> dict[str, Any]:
+    if key is None:
+        return {}
+    return {'keyring': key, 'keyname': key.name, 'keyalgorithm': key.algorithm}
+
+
+def transfer_zone(server: str, zone: str, port: int = 53, key: dns.tsig.Key | None = None,
+                  timeout: float = 10.0) -> dns.zone.Zone:
+    """Liest eine Zone per AXFR (optional mit TSIG)."""
+    result = dns.zone.Zone(zone)
+    query, _ = dns.xfr.make_query(result, **_tsig_args(key))
+    try:
+        dns.query.inbound_xfr(server, result, query=query, port=port, timeout=timeout)
+    except (dns.exception.DNSException, OSError) as e:
+        raise BackendError(f'Zonentransfer von {zone} fehlgeschlagen: {e}') from e
+    return result
+
+
+class AxfrStateReader:
+    """Aktueller Stand der Zonen per Zonentransfer statt über die REST-API.
+
+    Gelesen wird von einem autoritativen Server (z.B. einem Hidden Primary),
+    der den Stand des Backends ausliefert. prefetch() überträgt mehrere Zonen
+    gleichzeitig; rrsets() liefert ein vorab gelesenes Ergebnis nur einmal aus.
+    """
+
+    def __init__(self, server: str, port: int = 53, key: dns.tsig.Key | None = None,
+                 timeout: float = 10.0, concurrency: int = 16) -> None:
+        self.server = server
+        self.port = port
+        self.key = key
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.transfers = 0
+        self._prefetched: dict[str, RRSetMap | BackendError] = {}
+        self._lock = threading.Lock()
+
+    def _transfer(self, name: str) -> RRSetMap:
+        with self._lock:
+            self.transfers += 1
+        return zone_to_rrsets(transfer_zone(self.server, name, self.port, self.key, self.timeout))
+
+    def prefetch(self, names: list[str]) -> None:
+        names = [n for n in names if n not in self._prefetched]
+        if not names:
+            return
+
+        def fetch(name: str) -> RRSetMap | BackendError:
+            try:
+                return self._transfer(name)
+            except BackendError as e:
+                return e            # wird erst beim Zugriff auf die Zone gemeldet
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(names))) as executor:
+            results = list(executor.map(fetch, names))
+        with self._lock:
+            self._prefetched.update(zip(names, results))
+
+    def rrsets(self, name: str) -> RRSetMap:
+        with self._lock:
+            result = self._prefetched.pop(name, None)
+        if result is None:
+            return self._transfer(name)
+        if isinstance(result, BackendError):
+            raise result
+        return result
+
+
+class ZoneBackend:
+    """Schnittstelle zwischen DNSJinja und dem Server, der die Zonen ausliefert.
+
+    Zonen werden über ein backend-spezifisches Handle angesprochen, das
+    `list_zones()` bzw. `create_zone()` liefern.
+    """
+
+    label = ''
+
+    def list_zones(self, wanted: list[str]) -> dict[str, Any]:
+        """Liefert {zonenname: handle} aller beim Backend vorhandenen Zonen.
+
+        `wanted` enthält die konfigurierten Domains; Backends ohne eigene
+        Zonenliste prüfen nur diese.
+        """
+        raise NotImplementedError
+
+    def create_zone(self, name: str, zonefile: str | None = None) -> Any:
+        """Legt eine Zone an, optional gleich mit dem Inhalt von `zonefile`."""
+        raise NotImplementedError
+
+    def zone_id(self, zone: Any) -> Any:
+        """Kennung der Zone für config['domains'][...]['zone-id']."""
+        return zone
+
+    def get_rrsets(self, zone: Any) -> dict[RRSetKey, RemoteRRSet]:
+        raise NotImplementedError
+
+    def apply_changes(self, zone: Any, changes: list[RRSetChange], on_applied: OnApplied = None) -> None:
+        """Wendet `changes` an; `on_applied(i)` meldet jede angekommene Änderung."""
+        raise NotImplementedError
+
+    def export_zone(self, zone: Any) -> str:
+        raise NotImplementedError
+
+    def read_cost(self, rrsets: int) -> int:
+        """Anfragen, um den Stand einer Zone mit `rrsets` RRSets zu lesen; Standard: eine."""
+        return 1
+
+    def write_cost(self, changes: list[RRSetChange]) -> WriteCost:
+        """Aufwand für `changes`; Standard: eine Nachricht je Zone mit allen Records."""
+        if not changes:
+            return WriteCost()
+        records = sum(len(ch.records) for ch in changes if ch.action != 'delete')
+        return WriteCost(1, records, 1, records)
+
+    def sync_zone(self, zone: Any, desired: RRSetMap,
+                  on_planned: Callable[[list[RRSetChange]], None] | None = None,
+                  on_applied: OnApplied = None) -> list[RRSetChange]:
+        """Gleicht die Zone mit `desired` ab und gibt die angewandten Änderungen zurück."""
+        changes = plan_changes(desired, self.get_rrsets(zone))
+        if on_planned is not None:
+            on_planned(changes)
+        if changes:
+            self.apply_changes(zone, changes, on_applied)
+        return changes
+
+
+class HetznerBackend(ZoneBackend):
+    """Hetzner Cloud API über hcloud – ein Request je geändertem RRSet."""
+
+    label = 'Hetzner'
+
+    def __init__(self, client, zone_cache: ZoneListCache | None = None, workers: int = 8,
+                 state_reader: AxfrStateReader | None = None) -> None:
+        self.client = client
+        self.zone_cache = zone_cache
+        self.workers = workers
+        self.state_reader = state_reader
+
+    def list_zones(self, wanted: list[str]) -> dict[str, Any]:
+        """Zonenliste aus dem Cache, solange er gilt und alle `wanted` enthält."""
+        if self.zone_cache is not None:
+            cached = self.zone_cache.get()
+            if cached is not None and cached.keys() >= set(wanted):
+                return {name: bound_zone(self.client.zones, name, zone_id) for name, zone_id in cached.items()}
+        zones = {z.name: z for z in fetch_all_zones(self.client, self.workers)}
+        if self.zone_cache is not None:
+            self.zone_cache.put({name: z.id for name, z in zones.items()})
+        return zones
+
+    def create_zone(self, name: str, zonefile: str | None = None) -> Any:
+        if self.zone_cache is not None:
+            self.zone_cache.invalidate()
+        if zonefile is None:
+            return self.client.zones.create(name=name, mode="primary").zone
+        return self.client.zones.create(name=name, mode="primary", zonefile=zonefile).zone
+
+    def zone_id(self, zone: Any) -> Any:
+        return zone.id
+
+    def _protected(self, zone: Any) -> set[RRSetKey]:
+        """Geschützte RRSets am Apex, die per AXFR nicht erkennbar sind.
+
+        Eine Anfrage je Zone; Hetzner schützt dort die selbst verwalteten
+        SOA- und NS-RRSets. Ist die Liste nicht abrufbar, gelten diese als geschützt.
+        """
+        try:
+            rrsets = self.client.zones.get_rrset_list(zone, name='@', per_page=MAX_PER_PAGE).rrsets
+        except hcloud.APIException as e:
+            logger.warning('Schutz der RRSets von %s nicht abrufbar: %s', zone.name, e)
+            return {('@', 'SOA'), ('@', 'NS')}
+        return {(r.name, r.type) for r in rrsets if r.protection and r.protection.get('change')}
+
+    def _axfr_rrsets(self, zone: Any) -> dict[RRSetKey, RemoteRRSet]:
+        # Handles ohne weiteren API-Aufruf, nur der Schutz kommt aus der API
+        protected = self._protected(zone)
+        return {
+            (name, rdtype): RemoteRRSet(ttl, records, protected=(name, rdtype) in protected, handle=BoundZoneRRSet(
+                self.client.zones,
+                {'id': f'{name}/{rdtype}', 'name': name, 'type': rdtype, 'ttl': ttl, 'zone': zone.id},
+                complete=False,
+            ))
+            for (name, rdtype), (ttl, records) in self.state_reader.rrsets(zone.name).items()
+        }
+
+    def get_rrsets(self, zone: Any) -> dict[RRSetKey, RemoteRRSet]:
+        if self.state_reader is not None:
+            return self._axfr_rrsets(zone)
+        current: dict[RRSetKey, RemoteRRSet] = {}
+        try:
+            rrsets = self.client.zones.get_rrset_all(zone)
+        except hcloud.APIException as e:
+            if e.code == 'not_found' and self.zone_cache is not None:
+                # Zone inzwischen gelöscht: Liste beim nächsten Lauf neu laden
+                self.zone_cache.invalidate()
+            raise
+        for rrset in rrsets:
+            if rrset.type == 'SOA':
+                continue
+            current[(rrset.name, rrset.type)] = RemoteRRSet(
+                ttl=rrset.ttl,
+                records=sorted(r.value for r in (rrset.records or [])),
+                protected=bool(rrset.protection and rrset.protection.get('change')),
+                handle=rrset,
+            )
+        return current
+
+    def apply_changes(self, zone: Any, changes: list[RRSetChange], on_applied: OnApplied = None) -> None:
+        for i, ch in enumerate(changes):
+            hetzner_records = [ZoneRecord(value=v) for v in ch.records]
+            if ch.action == 'create':
+                self.client.zones.create_rrset(
+                    zone, name=ch.name, type=ch.rdtype, ttl=ch.ttl, records=hetzner_records,
+                )
+            elif ch.action == 'update':
+                handle = ch.current.handle
+                for op in update_operations(ch, delta=self.state_reader is None):
+                    records = [ZoneRecord(value=v) for v in op.records]
+                    if op.action == 'set':
+                        self.client.zones.set_rrset_records(handle, records)
+                    elif op.action == 'add':
+                        self.client.zones.add_rrset_records(handle, records)
+                    elif op.action == 'remove':
+                        self.client.zones.remove_rrset_records(handle, records)
+                    else:
+                        self.client.zones.change_rrset_ttl(handle, ch.ttl)
+            elif ch.action == 'delete':
+                try:
+                    self.client.zones.delete_rrset(ch.current.handle)
+                except hcloud.APIException as e:
+                    logger.warning('RRSet %s/%s konnte nicht gelöscht werden: %s', ch.name, ch.rdtype, e)
+            if on_applied is not None:
+                on_applied(i)
+
+    def export_zone(self, zone: Any) -> str:
+        return self.client.zones.export_zonefile(zone).zonefile
+
+    def read_cost(self, rrsets: int) -> int:
+        """Eine Anfrage je Seite der RRSet-Liste; mit AXFR-Leser nur die für den Schutz am Apex."""
+        if self.state_reader is not None:
+            return 1
+        return max(1, -(-rrsets // MAX_PER_PAGE))
+
+    def write_cost(self, changes: list[RRSetChange]) -> WriteCost:
+        """Eine Anfrage je Aufruf; verglichen mit Ersetzen aller Records plus eigener TTL-Anfrage."""
+        cost = WriteCost()
+        for ch in changes:
+            if ch.action == 'update':
+                ops = update_operations(ch, delta=self.state_reader is None)
+                cost += WriteCost(len(ops), sum(len(op.records) for op in ops),
+                                  1 + (ch.current.ttl != ch.ttl), len(ch.records))
+            else:
+                records = len(ch.records) if ch.action == 'create' else 0
+                cost += WriteCost(1, records, 1, records)
+        return cost
+
+
+class Rfc2136Backend(ZoneBackend):
+    """Dynamische Updates nach RFC 2136 mit TSIG – eine UPDATE-Nachricht je Zone.
+
+    Der aktuelle Stand wird per AXFR vom selben Server gelesen, die Änderungen
+    werden gesammelt in einer einzigen UPDATE-Nachricht übertragen.
+    Handle einer Zone ist ihr Name.
+    """
+
+    def __init__(self, server: str, port: int = 53, key_name: str = '',
+                 secret: str = '', algorithm: str = 'hmac-sha256',
+                 timeout: float = 10.0) -> None:
+        self.label = server
+        self.server = server
+        self.port = port
+        self.timeout = timeout
+        self.key = dns.tsig.Key(key_name, secret, algorithm) if key_name else None
+
+    def _tsig_args(self) -> dict[str, Any]:
+        return _tsig_args(self.key)
+
+    def _transfer(self, zone: str) -> dns.zone.Zone:
+        return transfer_zone(self.server, zone, self.port, self.key, self.timeout)
+
+    def list_zones(self, wanted: list[str]) -> dict[str, Any]:
+        zones: dict[str, Any] = {}
+        for name in wanted:
+            query = dns.message.make_query(name, 'SOA')
+            if self.key is not None:
+                query.use_tsig(self.key)
+            try:
+                response = dns.query.tcp(query, self.server, port=self.port, timeout=self.timeout)
+            except (dns.exception.DNSException, OSError) as e:
+                raise BackendError(f'{self.server} ist nicht erreichbar: {e}') from e
+            if response.rcode() == dns.rcode.NOERROR and response.answer:
+                zones[name] = name
+        return zones
+
+    def create_zone(self, name: str, zonefile: str | None = None) -> Any:
+        raise BackendError('Zonen können per RFC 2136 nicht angelegt werden')
+
+    def get_rrsets(self, zone: Any) -> dict[RRSetKey, RemoteRRSet]:
+        return {
+            key: RemoteRRSet(ttl, records, handle=zone)
+            for key, (ttl, records) in zone_to_rrsets(self._transfer(zone)).items()
+        }
+
+    def apply_changes(self, zone: Any, changes: list[RRSetChange], on_applied: OnApplied = None) -> None:
+        update = dns.update.UpdateMessage(zone, **self._tsig_args())
+        for ch in changes:
+            if ch.action == 'delete':
+                update.delete(ch.name, ch.rdtype)
+            else:
+                update.replace(ch.name, ch.ttl, ch.rdtype, *ch.records)
+        try:
+            response = dns.query.tcp(update, self.server, port=self.port, timeout=self.timeout)
+        except (dns.exception.DNSException, OSError) as e:
+            raise BackendError(f'UPDATE für {zone} fehlgeschlagen: {e}') from e
+        if response.rcode() != dns.rcode.NOERROR:
+            raise BackendError(f'UPDATE für {zone} abgelehnt: {dns.rcode.to_text(response.rcode())}')
+        if on_applied is not None:
+            # UPDATE ist atomar: alle oder keine
+            for i in range(len(changes)):
+                on_applied(i)
+
+    def export_zone(self, zone: Any) -> str:
+        return self._transfer(zone).to_text(want_origin=True)
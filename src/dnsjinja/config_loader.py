@@ -0,0 +1,195 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, NamedTuple
+import hashlib
+import json
+import os
+import pydantic
+from .dnsjinja_config_schema import DnsJinjaConfig, DomainConfig, GlobalConfig
+
+DEFAULT_DOMAINS_DIR = 'domains.d'
+
+_DOMAINS_ADAPTER = pydantic.TypeAdapter(dict[str, DomainConfig])
+
+
+class ConfigError(Exception):
+    """Konfiguration konnte nicht gelesen oder validiert werden."""
+    pass
+
+
+class LoadedConfig(NamedTuple):
+    """Rohdaten (für Templates) und validiertes Modell der Konfiguration."""
+    data: dict[str, Any]
+    model: DnsJinjaConfig
+    sources: list[Path]
+    cache_hits: int
+
+
+class ConfigCache:
+    """Cache validierter Domain-Einträge je Quelldatei.
+
+    Gültig ist ein Eintrag, solange mtime und Größe der Datei unverändert sind
+    oder – nach einem bloßen touch/checkout – der SHA-256 des Inhalts passt.
+    """
+
+    def __init__(self, cache_dir: str | Path) -> None:
+        self.dir = Path(cache_dir) / 'config'
+
+    def _entry_path(self, source: Path) -> Path:
+        key = hashlib.sha1(str(source.resolve()).encode('utf-8')).hexdigest()
+        return self.dir / f'{key}.json'
+
+    def get(self, source: Path, stat: os.stat_result, raw: bytes | None) -> dict[str, Any] | None:
+        try:
+            entry = json.loads(self._entry_path(source).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if entry.get('mtime_ns') == stat.st_mtime_ns and entry.get('size') == stat.st_size:
+            return entry['domains']
+        if raw is not None and entry.get('sha256') == hashlib.sha256(raw).hexdigest():
+            return entry['domains']
+        return None
+
+    def put(self, source: Path, stat: os.stat_result, raw: bytes, domains: dict[str, Any]) -> None:
+        entry = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': hashlib.sha256(raw).hexdigest(),
+            'domains': domains,
+        }
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            path = self._entry_path(source)
+            tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp.write_text(json.dumps(entry), encoding='utf-8')
+            tmp.replace(path)
+        except OSError:
+            pass                  # ohne Cache geht es auch, nur langsamer
+
+
+def _parse_json(path: Path, raw: bytes) -> Any:
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ConfigError(f'{path}: {e}') from e
+
+
+def _read_json(path: Path) -> tuple[bytes, Any]:
+    raw = path.read_bytes()
+    return raw, _parse_json(path, raw)
+
+
+def _validate_domains(path: Path, domains: Any) -> dict[str, Any]:
+    try:
+        _DOMAINS_ADAPTER.validate_python(domains)
+    except pydantic.ValidationError as e:
+        raise ConfigError(f'{path}: {e}') from e
+    return domains
+
+
+class _DomainFile(NamedTuple):
+    """Gelesene Datei aus domains.d: Inhalt oder bereits validierte Einträge."""
+    path: Path
+    stat: os.stat_result
+    raw: bytes | None
+    cached: dict[str, Any] | None
+
+
+def _read_domain_file(path: Path, cache: ConfigCache | None) -> _DomainFile:
+    """Liest eine Datei aus domains.d, ohne sie zu parsen (läuft im Thread-Pool)."""
+    stat = path.stat()
+    if cache is not None:
+        domains = cache.get(path, stat, None)
+        if domains is not None:
+            return _DomainFile(path, stat, None, domains)
+    raw = path.read_bytes()
+    if cache is not None:
+        cached = cache.get(path, stat, raw)
+        if cached is not None:
+            cache.put(path, stat, raw, cached)
+            return _DomainFile(path, stat, None, cached)
+    return _DomainFile(path, stat, raw, None)
+
+
+def _load_domain_file(read: _DomainFile, cache: ConfigCache | None) -> tuple[dict[str, Any], bool]:
+    """Parst und validiert eine gelesene Datei; liefert (domains, aus_cache)."""
+    if read.cached is not None:
+        return read.cached, True
+    domains = _parse_json(read.path, read.raw)
+    if not isinstance(domains, dict):
+        raise ConfigError(f'{read.path}: Objekt mit Domains als Schlüssel erwartet')
+    _validate_domains(read.path, domains)
+    if cache is not None:
+        cache.put(read.path, read.stat, read.raw, domains)
+    return domains, False
+
+
+def domains_dir_for(config_file: Path, global_config: GlobalConfig) -> Path | None:
+    if global_config.domains_dir:
+        p = Path(global_config.domains_dir)
+        return p if p.is_absolute() else config_file.parent / p
+    default = config_file.parent / DEFAULT_DOMAINS_DIR
+    return default if default.is_dir() else None
+
+
+def load_config(config_file: Path, cache_dir: str | Path | None = None,
+                workers: int = 8) -> LoadedConfig:
+    """Lädt config.json und optional alle *.json aus domains.d/.
+
+    Jede Datei in domains.d enthält ein Objekt {domain: eintrag, ...} – eine
+    Domain je Datei oder eine ganze Gruppe. Die Dateien werden parallel
+    gelesen, aber nacheinander geparst und validiert (rechenintensiv, im
+    Thread-Pool ohne Gewinn); unveränderte Dateien werden nicht erneut
+    validiert. Eine Domain darf nur in einer Datei vorkommen.
+    """
+    cache = ConfigCache(cache_dir) if cache_dir else None
+
+    raw, data = _read_json(config_file)
+    if not isinstance(data, dict):
+        raise ConfigError(f'{config_file}: Objekt erwartet')
+    try:
+        global_config = GlobalConfig.model_validate(data.get('global'))
+    except pydantic.ValidationError as e:
+        raise ConfigError(f'{config_file}: {e}') from e
+
+    stat = config_file.stat()
+    main_domains = data.get('domains', {})
+    cached = cache.get(config_file, stat, raw) if cache is not None else None
+    cache_hits = 0
+    if cached is not None:
+        main_domains = cached
+        cache_hits += 1
+    else:
+        if not isinstance(main_domains, dict):
+            raise ConfigError(f'{config_file}: "domains" muss ein Objekt sein')
+        _validate_domains(config_file, main_domains)
+        if cache is not None:
+            cache.put(config_file, stat, raw, main_domains)
+
+    sources = [config_file]
+    owner: dict[str, Path] = {d: config_file for d in main_domains}
+    domains: dict[str, Any] = dict(main_domains)
+
+    domains_dir = domains_dir_for(config_file, global_config)
+    if domains_dir is not None:
+        if not domains_dir.is_dir():
+            raise ConfigError(f'{domains_dir} existiert nicht oder ist kein Verzeichnis')
+        files = sorted(domains_dir.glob('*.json'))
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files) or 1))) as executor:
+            reads = list(executor.map(lambda p: _read_domain_file(p, cache), files))
+        for read in reads:
+            file_domains, hit = _load_domain_file(read, cache)
+            cache_hits += hit
+            for d, entry in file_domains.items():
+                if d in owner:
+                    raise ConfigError(f'{d} ist mehrfach konfiguriert: {owner[d]} und {read.path}')
+                owner[d] = read.path
+                domains[d] = entry
+        sources.extend(files)
+
+    data = {**data, 'domains': domains}
+    model = DnsJinjaConfig.model_construct(
+        global_config=global_config,
+        domains={d: DomainConfig.model_construct(**entry) for d, entry in domains.items()},
+    )
+    return LoadedConfig(data, model, sources, cache_hits)
@@ -0,0 +1,61 @@
+import threading
+import time
+from .ratelimit import hcloud_base
+
+# Kürzeste Frist für einen einzelnen Aufruf, auch kurz vor Ablauf des Budgets
+MIN_CALL_TIMEOUT = 1.0
+
+
+class Deadline:
+    """Zeitbudget eines Laufs; ohne `seconds` (0) läuft es nur durch expire() ab.
+
+    Phasen fragen expired() ab, bevor sie eine weitere Domain beginnen.
+    cap() begrenzt die Frist einzelner Aufrufe (DNS, API) auf das verbleibende
+    Budget, so dass laufende Arbeit rechtzeitig endet.
+    """
+
+    def __init__(self, seconds: float = 0.0) -> None:
+        self.seconds = seconds
+        self._end = time.monotonic() + seconds if seconds > 0 else None
+        self._expired = threading.Event()
+        self.reason = ''
+
+    def remaining(self) -> float | None:
+        if self._expired.is_set():
+            return 0.0
+        if self._end is None:
+            return None
+        return max(0.0, self._end - time.monotonic())
+
+    def expired(self) -> bool:
+        if not self._expired.is_set() and self._end is not None and time.monotonic() >= self._end:
+            self.expire(f'Frist von {self.seconds:g} s abgelaufen')
+        return self._expired.is_set()
+
+    def expire(self, reason: str = 'Abbruch angefordert') -> None:
+        if not self._expired.is_set():
+            self.reason = reason
+            self._expired.set()
+
+    def cap(self, timeout: float) -> float:
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return max(MIN_CALL_TIMEOUT, min(timeout, remaining))
+
+
+def timeout_client(client, timeout: float, deadline: Deadline) -> None:
+    """Setzt für jede Anfrage eines hcloud.Client eine Frist, höchstens das verbleibende Budget.
+
+    Wie limit_client() über `client._client.request`, das alle Resource-Clients nutzen;
+    eine feste Frist ließe sich über Client(timeout=...) setzen, nicht aber das
+    mit der Zeit schrumpfende Restbudget.
+    """
+    base = hcloud_base(client)
+    request = base.request
+
+    def timed_request(*args, **kwargs):
+        kwargs.setdefault('timeout', deadline.cap(timeout))
+        return request(*args, **kwargs)
+
+    base.request = timed_request
@@ -1,26 +1,44 @@
-from jinja2 import Environment, FileSystemLoader
-from socket import gethostbyname
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Any, Required, TypedDict
+from typing import Any, Callable, Iterator, Required, TextIO, TypedDict
 import hcloud
 from hcloud import Client
-from hcloud.zones.domain import ZoneRecord
-import json
+import requests
+import fnmatch
 import logging
 import os
 import re
-import dns.name
-import dns.rdatatype
+import signal
 import dns.resolver
 import dns.exception
-import dns.zone
+import dns.tsig
 import click
+import platformdirs
 import sys
-import pydantic
 import tempfile
+import time
 from .myloadenv import load_env
-from .dnsjinja_config_schema import DnsJinjaConfig as _DnsJinjaConfigModel
+from .config_loader import ConfigError, load_config
+from .backends import (AxfrStateReader, BackendError, HetznerBackend, RemoteRRSet, Rfc2136Backend, RRSetChange,
+                       RRSetMap, WriteCost, ZoneBackend, plan_changes, rebind_changes, zone_file_rrsets)
+from .render import (FragmentCache, RenderJob, RenderResult, default_workers, make_environment, parse_zone,
+                     render_job, render_stream)
+from .verify import expectation_from_changes, verify_propagation
+from .report import RunReport, Shard
+from .locks import DEFAULT_LOCK_DIR, FileInUse, ZoneLockTimeout, zone_lock
+from .profiling import Profiler
+from .journal import PendingZone, UploadJournal, journal_path, load_journal
+from .zone_cache import ZoneListCache
+from .ratelimit import (CallEstimate, RateLimitStatus, TokenBucket, limit_client, track_rate_limit,
+                        within_budget)
+from .server import ControlService, serve as serve_http
+from .audit import AuditResult, SyncState, live_serials, remote_rrset_map
+from .schedule import DEFAULT_SECONDS_PER_RRSET, DurationHistory, longest_first, parallel_bound
+from .deadline import Deadline, timeout_client
+from .impact import ImpactIndex
+from .retry import RetryQueue
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +50,30 @@ class DomainConfigEntry(TypedDict, total=False):
     template: Required[str]   # aus config.json
     zone_file: str            # gesetzt von _prepare_zones() als 'zone-file'
     zone_id: str              # gesetzt von _prepare_zones() als 'zone-id'
+    project: str              # optional: Name aus global.projects
 
 
 class UploadError(Exception):
     pass
 
 
+class SerialError(Exception):
+    """SOA-Zähler einer Domain konnte nicht ermittelt oder erhöht werden."""
+    pass
+
+
+# Fehler, mit denen Upload bzw. Sicherung einer Domain scheitert (requests: Verbindung, Zeitüberschreitung)
+_UPLOAD_ERRORS = (hcloud.APIException, BackendError, ZoneLockTimeout, requests.exceptions.RequestException)
+_BACKUP_ERRORS = (hcloud.APIException, BackendError, OSError, SerialError)
+
+
+def _write_report(report: RunReport, path: str | Path) -> None:
+    try:
+        report.write(path)
+    except OSError as e:
+        click.echo(f'Bericht {path} konnte nicht geschrieben werden: {str(e)}')
+
+
 class DNSJinja:
 
     DEFAULT_API_BASE = "https://api.hetzner.cloud/v1"
@@ -55,257 +91,1180 @@ class DNSJinja:
         return p
 
     def _prepare_zones(self) -> None:
+        groups = self._domains_by_project()
+        # Die Zonenlisten der Projekte werden gleichzeitig abgefragt
         try:
-            all_zones = self.client.zones.get_all()
+            with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                listings = dict(zip(groups, executor.map(
+                    lambda p: self.backends[p].list_zones(sorted(groups[p])), groups)))
+        except (hcloud.HCloudException, BackendError, OSError) as e:
+            click.echo(f'Zonen konnten nicht ermittelt werden: {e}')
+            sys.exit(1)
+        for project, domains in groups.items():
+            self._prepare_project_zones(self.backends[project], set(domains), listings[project])
 
-            hetzner_zones = {z.name: z for z in all_zones}
-            config_domains = set(self.config['domains'].keys())
+    def _prepare_project_zones(self, backend: ZoneBackend, config_domains: set[str],
+                               hetzner_zones: dict[str, Any]) -> None:
+        label = backend.label
+        try:
             for d in sorted(config_domains - hetzner_zones.keys()):
                 if self._create_missing:
-                    try:
-                        response = self.client.zones.create(name=d, mode="primary")
-                        hetzner_zones[d] = response.zone
-                        click.echo(f'{d} wurde neu bei Hetzner angelegt')
-                    except hcloud.APIException as e:
-                        click.echo(f'{d} konnte bei Hetzner nicht angelegt werden: {e} - wird ignoriert')
-                        del self.config['domains'][d]
+                    # Angelegt wird gesammelt in _create_missing_zones()
+                    self._to_create.append(d)
                 else:
-                    click.echo(f'{d} ist konfiguriert aber nicht bei Hetzner eingerichtet - wird ignoriert')
+                    click.echo(f'{d} ist konfiguriert aber nicht bei {label} eingerichtet - wird ignoriert')
                     del self.config['domains'][d]
-            for d in (hetzner_zones.keys() - config_domains):
-                click.echo(f'{d} ist bei Hetzner eingerichtet aber nicht konfiguriert - bitte prüfen')
-            for d in self.config['domains'].keys():
-                self.config['domains'][d]['zone-id'] = hetzner_zones[d].id
+                    self.report.missing.append(d)
+            for d in sorted(hetzner_zones.keys() - config_domains):
+                # Bei Sharding meldet nur der zuständige Shard nicht konfigurierte Zonen
+                if self.shard is not None and not self.shard.contains(d):
+                    continue
+                if d in self._journal_done:
+                    continue
+                click.echo(f'{d} ist bei {label} eingerichtet aber nicht konfiguriert - bitte prüfen')
+                self.report.unconfigured.append(d)
+            for d in sorted(config_domains & self.config['domains'].keys() & hetzner_zones.keys()):
+                self.config['domains'][d]['zone-id'] = backend.zone_id(hetzner_zones[d])
                 self.config['domains'][d]['zone-file'] = d + '.zone'
                 self._hetzner_zones[d] = hetzner_zones[d]
-        except (hcloud.HCloudException, OSError) as e:
-            click.echo(f'Zonen bei Hetzner konnten nicht ermittelt werden: {e}')
+        except (hcloud.HCloudException, BackendError, OSError) as e:
+            click.echo(f'Zonen bei {label} konnten nicht ermittelt werden: {e}')
             sys.exit(1)
 
+    def _create_missing_zones(self) -> None:
+        """Legt die fehlenden Zonen gleichzeitig an.
+
+        Mit Upload wird jede Zone vorab gerendert und beim Anlegen gleich mit
+        ihrem Zone-File befüllt; der Upload einzelner RRSets entfällt dann.
+        Schlägt der Import fehl, wird die Zone leer angelegt und wie bisher
+        hochgeladen.
+        """
+        if not self._to_create:
+            return
+        texts: dict[str, str] = {}
+        if self.upload:
+            for d in self._to_create:
+                # Neue Zone: noch kein SOA-Zähler abfragbar
+                self._imported[d] = self.today + '01'
+            for d in self.render_domains(self._to_create):
+                texts[d] = self.zones[d]
+                self.release_zone(d)
+
+        def create(d: str) -> tuple[Any, float, bool]:
+            backend = self._backend_for(d)
+            start = time.monotonic()
+            zonefile = texts.get(d)
+            if zonefile is not None:
+                try:
+                    return backend.create_zone(d, zonefile + '\n'), time.monotonic() - start, True
+                except (hcloud.APIException, BackendError) as e:
+                    click.echo(f'{d}: Import des Zone-Files fehlgeschlagen ({e}) - lege leere Zone an')
+            return backend.create_zone(d), time.monotonic() - start, False
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(8, len(self._to_create))) as executor:
+            futures = {d: executor.submit(create, d) for d in self._to_create}
+        created = 0
+        for d, future in futures.items():
+            label = self._backend_for(d).label
+            try:
+                zone, seconds, imported = future.result()
+            except (hcloud.APIException, BackendError) as e:
+                click.echo(f'{d} konnte bei {label} nicht angelegt werden: {e} - wird ignoriert')
+                del self.config['domains'][d]
+                self._imported.pop(d, None)
+                self.report.missing.append(d)
+                continue
+            if not imported:
+                self._imported.pop(d, None)
+            created += 1
+            self._hetzner_zones[d] = zone
+            self.config['domains'][d]['zone-id'] = self._backend_for(d).zone_id(zone)
+            self.config['domains'][d]['zone-file'] = d + '.zone'
+            how = 'mit Zone-File' if imported else 'leer'
+            click.echo(f'{d} wurde neu bei {label} angelegt ({how}, {seconds:.1f} s)')
+        click.echo(f'Neu angelegt: {created} von {len(self._to_create)} Zone(n) in '
+                   f'{time.monotonic() - start:.1f} s, davon {len(self._imported)} mit Zone-File')
+        self._to_create = []
+
+    def _assign_projects(self) -> None:
+        """Ordnet jede Domain einem Projekt zu: Feld `project` der Domain, sonst das
+        erste Projekt, dessen `domains`-Muster passt, sonst das Standard-Projekt ''."""
+        projects = self.config_model.global_config.projects
+        self._project_of: dict[str, str] = {}
+        for domain, entry in self.config['domains'].items():
+            project = entry.get('project') or next(
+                (name for name, p in projects.items()
+                 if any(fnmatch.fnmatchcase(domain, pattern) for pattern in p.domains)), '')
+            if project and project not in projects:
+                click.echo(f'Projekt {project!r} von {domain} ist nicht unter global.projects konfiguriert.')
+                sys.exit(1)
+            self._project_of[domain] = project
+
+    def _domains_by_project(self) -> dict[str, list[str]]:
+        groups: dict[str, list[str]] = {p: [] for p in self.backends}
+        for domain in self.config['domains']:
+            groups[self._project_of[domain]].append(domain)
+        return groups
+
+    def _backend_for(self, domain: str) -> ZoneBackend:
+        return self.backends[self._project_of.get(domain, '')]
+
+    def _for_each_domain(self, fn: Callable[[str], None], only: set[str] | None = None, phase: str = '') -> None:
+        """Ruft fn(domain) für alle Domains (bzw. die in `only`) auf; mehrere Projekte
+        laufen gleichzeitig, innerhalb eines Projekts in Konfigurationsreihenfolge.
+
+        Mit workers > 1 bearbeitet jedes Projekt bis zu `workers` Domains
+        gleichzeitig, die nach früheren Läufen längsten zuerst. Mit `phase`
+        wird die Dauer je Domain für spätere Läufe festgehalten.
+        """
+        groups = [[d for d in domains if only is None or d in only]
+                  for domains in self._domains_by_project().values()]
+        groups = [domains for domains in groups if domains]
+        seconds: dict[str, float] = {}
+        if phase:
+            fn = self._unless_expired(self._timed(fn, phase, seconds), phase)
+        start = time.monotonic()
+        if len(groups) <= 1 and self.workers <= 1:
+            for domains in groups:
+                for domain in domains:
+                    fn(domain)
+        else:
+            with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                futures = [executor.submit(self._run_group, fn, domains, phase) for domains in groups]
+                for future in futures:
+                    future.result()
+        if not phase:
+            return
+        if self.durations is not None:
+            self.durations.save()
+        if self.workers > 1 and seconds:
+            bound = max(parallel_bound([seconds[d] for d in domains if d in seconds], self.workers)
+                        for domains in groups)
+            click.echo(f'{phase.capitalize()}: {len(seconds)} Domain(s) in {time.monotonic() - start:.1f} s '
+                       f'mit {self.workers} Thread(s) je Projekt (Untergrenze {bound:.1f} s)')
+
+    def _run_group(self, fn: Callable[[str], None], domains: list[str], phase: str) -> None:
+        if self.workers <= 1 or len(domains) <= 1:
+            for domain in domains:
+                fn(domain)
+            return
+        if phase:
+            domains = self.schedule(phase, domains)
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(domains))) as executor:
+            # Der Pool arbeitet die Warteschlange in dieser Reihenfolge ab
+            futures = [executor.submit(fn, domain) for domain in domains]
+            for future in futures:
+                future.result()
+
+    def schedule(self, phase: str, domains: list[str]) -> list[str]:
+        """Domains in der Reihenfolge, in der sie parallel bearbeitet werden: längste zuerst."""
+        if self.durations is None:
+            return longest_first(domains, self._rrset_count)
+        return longest_first(domains, lambda d: self.durations.estimate(phase, d, self._rrset_count(d)))
+
+    def _unless_expired(self, fn: Callable[[str], None], phase: str) -> Callable[[str], None]:
+        def guarded(domain: str) -> None:
+            if self.deadline.expired():
+                self._skip_expired(domain, phase)
+            else:
+                fn(domain)
+        return guarded
+
+    def _skip_expired(self, domain: str, *phases: str) -> None:
+        """Vermerkt eine wegen abgelaufener Frist nicht begonnene Domain (Exit-Code 251)."""
+        if not self._expired_domains:
+            click.echo(f'{self.deadline.reason} - weitere Domains werden nicht begonnen')
+        self._expired_domains.add(domain)
+        for phase in phases:
+            self.report.record(domain, phase, 'skipped', self.deadline.reason)
+        self._set_exit_status(251)
+
+    def report_deadline(self) -> None:
+        if self._expired_domains:
+            click.echo(f'{len(self._expired_domains)} Domain(s) wegen {self.deadline.reason} '
+                       f'nicht (vollständig) bearbeitet')
+
+    def _timed(self, fn: Callable[[str], None], phase: str, seconds: dict[str, float]) -> Callable[[str], None]:
+        def timed(domain: str) -> None:
+            start = time.monotonic()
+            fn(domain)
+            seconds[domain] = elapsed = time.monotonic() - start
+            if self.durations is not None:
+                self.durations.record(phase, domain, elapsed, self._rrset_count(domain))
+        return timed
+
+    def _rrset_count(self, domain: str) -> int:
+        """Anzahl RRSets der gerenderten Zone (0, wenn nicht gerendert oder fehlerhaft)."""
+        if domain not in self._rrsets:
+            if domain not in self.zones or domain in self._syntax_errors:
+                return 0
+            try:
+                self._parse_zone_rrsets(domain)
+            except dns.exception.DNSException:
+                return 0
+        return len(self._rrsets[domain])
+
+    def _create_backend(self, backend_config, tsig_secret: str, project: str = '') -> ZoneBackend:
+        if backend_config.type == 'rfc2136':
+            if project:
+                click.echo("Projekte werden nur vom Backend 'hetzner' unterstützt.")
+                sys.exit(1)
+            if not tsig_secret:
+                click.echo('Kein TSIG-Schlüssel angegeben. Bitte --tsig-secret oder DNSJINJA_TSIG_SECRET setzen.')
+                sys.exit(1)
+            return Rfc2136Backend(
+                backend_config.server, backend_config.port,
+                key_name=backend_config.tsig_key_name, secret=tsig_secret,
+                algorithm=backend_config.tsig_algorithm, timeout=backend_config.timeout,
+            )
+        global_config = self.config_model.global_config
+        if project:
+            project_config = global_config.projects[project]
+            token = os.environ.get(project_config.token_env, '')
+            if not token:
+                click.echo(f'Kein API-Token für Projekt {project}. Bitte {project_config.token_env} setzen.')
+                sys.exit(1)
+            api_base = (project_config.api_base or global_config.dns_api_base).rstrip('/')
+            label = f'Hetzner ({project})'
+        else:
+            if not self.auth_api_token:
+                click.echo('Kein API-Token angegeben. Bitte --auth-api-token oder DNSJINJA_AUTH_API_TOKEN setzen.')
+                sys.exit(1)
+            token = self.auth_api_token
+            api_base = self._api_base = global_config.dns_api_base.rstrip('/')
+            project_config = None
+            label = 'Hetzner'
+        # Je Projekt ein eigener Client (eigener Verbindungs-Pool) und ein eigenes Budget
+        client = Client(token=token, api_endpoint=api_base)
+        timeout_client(client, self.api_timeout, self.deadline)
+        self._rate_limits[project] = RateLimitStatus()
+        track_rate_limit(client, self._rate_limits[project])
+        if project_config is not None and project_config.rate is not None:
+            self._buckets[project] = TokenBucket(project_config.rate, project_config.burst)
+            limit_client(client, self._buckets[project])
+        if not project:
+            self.client = client
+        zone_cache = None
+        if self.cache_dir is not None and self.zone_cache_ttl > 0:
+            zone_cache = ZoneListCache(self.cache_dir, api_base, token, self.zone_cache_ttl)
+        backend = HetznerBackend(client, zone_cache, state_reader=self._state_reader(tsig_secret))
+        backend.label = label
+        return backend
+
+    def _state_reader(self, tsig_secret: str) -> AxfrStateReader | None:
+        """Gemeinsamer AXFR-Leser aller Projekte für `remote-state: {type: axfr}`."""
+        remote_state = self.config_model.global_config.remote_state
+        if remote_state.type != 'axfr':
+            return None
+        if self.state_reader is None:
+            key = None
+            if remote_state.tsig_key_name:
+                if not tsig_secret:
+                    click.echo('Kein TSIG-Schlüssel angegeben. Bitte --tsig-secret oder DNSJINJA_TSIG_SECRET setzen.')
+                    sys.exit(1)
+                key = dns.tsig.Key(remote_state.tsig_key_name, tsig_secret, remote_state.tsig_algorithm)
+            self.state_reader = AxfrStateReader(remote_state.server, remote_state.port, key,
+                                                remote_state.timeout, remote_state.concurrency)
+        return self.state_reader
+
+    def _prefetch_remote_state(self, domains: list[str]) -> None:
+        """Überträgt den aktuellen Stand der Zonen vorab und gleichzeitig (nur mit AXFR-Leser)."""
+        if self.state_reader is None or not domains:
+            return
+        self.state_reader.prefetch(domains)
+
     def __init__(self, upload: bool = False, backup: bool = False,
                  write_zone: bool = False, datadir: str = "",
                  config_file: str = "config/config.json",
-                 auth_api_token: str = "", create_missing: bool = False) -> None:
+                 auth_api_token: str = "", create_missing: bool = False,
+                 tsig_secret: str = "", jobs: int = 1, cache_dir: str = "",
+                 verify: bool = False, verify_timeout: float = 300.0,
+                 shard: Shard | None = None, report_file: str = "",
+                 lock_dir: str = "", lock_timeout: float = 60.0,
+                 profile_dir: str = "", profile_top: int = 10,
+                 resume: bool = False, journal_file: str = "", stream: bool = False,
+                 zone_cache_ttl: float = 300.0, fragment_cache: bool = True,
+                 offline: bool = False, workers: int = 1, deadline: float | Deadline = 0.0,
+                 dns_timeout: float = 5.0, api_timeout: float = 30.0,
+                 max_api_calls: int = 0, over_budget: str = 'reject',
+                 retries: int = 0, retry_delay: float = 2.0, report: RunReport | None = None) -> None:
+        # Das Budget umfasst den ganzen Lauf, einschließlich Zonenliste und Rendern
+        self.deadline = deadline if isinstance(deadline, Deadline) else Deadline(deadline)
+        self._expired_domains: set[str] = set()
+        self._retained: set[str] = set()       # --stream: Zonen, die für Wiederholungen im Speicher bleiben
+        self.dns_timeout = dns_timeout
+        self.api_timeout = api_timeout
+        self.max_api_calls = max_api_calls
+        self.over_budget = over_budget
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._rate_limits: dict[str, RateLimitStatus] = {}     # je Projekt mit Hetzner Cloud API
+        self._buckets: dict[str, TokenBucket] = {}
         self.datadir = DNSJinja._check_path(datadir, '.', 'Datenverzeichnis', expect='dir')
         self.config_file = DNSJinja._check_path(config_file, '.', 'Konfigurationsdatei', expect='file')
 
         self.exit_status_file = Path(tempfile.gettempdir()) / f"dnsjinja.{os.getpid()}.exit.txt"
         self.exit_status_file.unlink(missing_ok=True)
-        # Pointer-Datei aktualisieren, damit exit_on_error die aktuelle Exit-Code-Datei findet
-        (Path(tempfile.gettempdir()) / "dnsjinja.exit.ptr").write_text(
-            str(self.exit_status_file), encoding='utf-8'
-        )
+        self.report_file = Path(report_file) if report_file else None
+        if self.report_file is None:
+            # Ohne explizite Ergebnisdatei: Pointer-Datei aktualisieren, damit
+            # exit_on_error die aktuelle Exit-Code-Datei findet (nicht sicher
+            # bei parallelen Läufen)
+            (Path(tempfile.gettempdir()) / "dnsjinja.exit.ptr").write_text(
+                str(self.exit_status_file), encoding='utf-8'
+            )
+        else:
+            # Ein Ergebnis eines früheren Laufs darf nicht als aktuelles gelten
+            self.report_file.unlink(missing_ok=True)
+        self.lock_dir = Path(lock_dir) if lock_dir else DEFAULT_LOCK_DIR
+        self.lock_timeout = lock_timeout
+        self.shard = shard
+        self.report = report if report is not None else RunReport(shard)
 
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        # Hochgeladener Stand je Domain für `dnsjinja audit`
+        self.sync_state = SyncState(self.cache_dir, self.config_file) if self.cache_dir is not None else None
+        # Dauer je Domain und Phase für die Reihenfolge paralleler Läufe
+        self.durations = DurationHistory(self.cache_dir, self.config_file) if self.cache_dir is not None else None
+        self.workers = max(1, workers)
         try:
-            with open(self.config_file, encoding='utf-8') as cfg_fh:
-                self.config = json.load(cfg_fh)
-            _DnsJinjaConfigModel.model_validate(self.config)
-        except (json.JSONDecodeError, pydantic.ValidationError, OSError) as e:
+            loaded = load_config(self.config_file, self.cache_dir)
+        except (ConfigError, OSError) as e:
             click.echo(f'Konfigurationsdatei {self.config_file} konnte nicht korrekt gelesen werden: {str(e)}')
             sys.exit(1)
+        # Rohdaten werden als Template-Variablen genutzt, das validierte
+        # Modell für alle globalen Einstellungen.
+        self.config = loaded.data
+        self.config_model = loaded.model
+        global_config = self.config_model.global_config
+        # Verweise der gerenderten Zonen für `dnsjinja who-uses`
+        self.impact = ImpactIndex(self.cache_dir, self.config_file) if self.cache_dir is not None else None
+        if self.impact is not None:
+            self.impact.retain(set(self.config['domains']))
+        if self.shard is not None:
+            self.config['domains'] = {
+                d: entry for d, entry in self.config['domains'].items() if self.shard.contains(d)
+            }
+            click.echo(f'Shard {self.shard}: {len(self.config["domains"])} Domain(s)')
+        self._open_journal(upload, resume, journal_file)
 
-        # noinspection PyTypeChecker
-        self.templates_dir = DNSJinja._check_path(self.config['global']['templates'], self.datadir, 'Template-Verzeichnis', expect='dir')
-        # noinspection PyTypeChecker
-        self.zone_files_dir = DNSJinja._check_path(self.config['global']['zone-files'], self.datadir, 'Zone-File-Verzeichnis', expect='dir')
-        # noinspection PyTypeChecker
-        self.zone_backups_dir = DNSJinja._check_path(self.config['global']['zone-backups'], self.datadir, 'Zone-Backup-Verzeichnis', expect='dir')
+        self.templates_dir = DNSJinja._check_path(global_config.templates, self.datadir, 'Template-Verzeichnis', expect='dir')
+        self.zone_files_dir = DNSJinja._check_path(global_config.zone_files, self.datadir, 'Zone-File-Verzeichnis', expect='dir')
+        self.zone_backups_dir = DNSJinja._check_path(global_config.zone_backups, self.datadir, 'Zone-Backup-Verzeichnis', expect='dir')
 
         self.auth_api_token = auth_api_token
-        if not self.auth_api_token:
-            click.echo('Kein API-Token angegeben. Bitte --auth-api-token oder DNSJINJA_AUTH_API_TOKEN setzen.')
-            sys.exit(1)
-        self._api_base = self.config['global'].get('dns-api-base', self.DEFAULT_API_BASE).rstrip('/')
-        self.client = Client(token=self.auth_api_token, api_endpoint=self._api_base)
+        self.zone_cache_ttl = zone_cache_ttl
+        self.client = None
+        self.state_reader: AxfrStateReader | None = None
+        self._assign_projects()
         self._hetzner_zones: dict[str, Any] = {}
         self._create_missing: bool = create_missing
-
-        self._prepare_zones()
+        self._to_create: list[str] = []
+        self._imported: dict[str, str] = {}     # beim Anlegen befüllte Zonen → Serial
+        # Offline: kein Backend, verglichen wird mit dem neuesten Backup
+        self.offline = offline
+        self._backups: dict[str, tuple[int, Path]] | None = None
+        if offline:
+            self.backends: dict[str, ZoneBackend] = {}
+            self.backend = None
+            for d, entry in self.config['domains'].items():
+                entry['zone-file'] = d + '.zone'
+        else:
+            used = set(self._project_of.values()) or {''}
+            self.backends = {
+                project: self._create_backend(global_config.backend, tsig_secret, project)
+                for project in sorted(used)
+            }
+            # Standard-Backend (ohne Projekte das einzige)
+            self.backend = self.backends.get('') or next(iter(self.backends.values()))
+            self._prepare_zones()
 
         self._resolver = dns.resolver.Resolver(configure=False)
-        self._resolver.nameservers = self.config["global"]["name-servers"]
+        self._resolver.nameservers = global_config.name_servers
 
         self._today = datetime.now(timezone.utc).strftime('%Y%m%d')
         self.upload = upload
         self.backup = backup
         self.write_zone = write_zone
+        self.verify = verify
+        self.verify_timeout = verify_timeout
 
-        self.env = Environment(
-            loader=FileSystemLoader(self.templates_dir),
-            trim_blocks=True,
-            lstrip_blocks=True
-        )
-        self.env.filters['hostname'] = gethostbyname
+        self.profiler = Profiler(profile_dir, profile_top) if profile_dir else None
+        # --profile misst die Templates selbst, daher dann ohne Fragment-Cache
+        self.fragment_cache = fragment_cache and self.profiler is None
+        self._fragment_stats = [0, 0]       # Treffer/Fehlschläge der Render-Prozesse
+        self.env = make_environment(self.templates_dir, self.fragment_cache)
+        if self.profiler is not None:
+            self.profiler.instrument(self.env)
+        self.jobs = jobs if jobs > 0 else default_workers()
         self._serials: dict[str, str] = {}
-        self.zones = self._create_zone_data()
+        self._previous_serials: dict[str, str] = {}
+        self._changes: dict[str, list[RRSetChange]] = {}
+        self._rrsets: dict[str, RRSetMap] = {}
+        self._syntax_errors: dict[str, str] = {}
+        self._unrendered: set[str] = set()      # Render-Fehler, in den folgenden Phasen übergangen
+        self.zones: dict[str, str] = {}
+        self._create_missing_zones()
+        # Im Streaming-Betrieb wird erst in process_zones() bzw. dry_run() gerendert
+        self.stream = stream
+        if not stream:
+            with self.profile_phase('render'):
+                self.zones = self._create_zone_data()
+
+    def _open_journal(self, upload: bool, resume: bool, journal_file: str) -> None:
+        """Öffnet und sperrt das Journal für diesen Lauf und liest bei --resume das des abgebrochenen Laufs.
+
+        Abgeschlossene Domains werden aus der Konfiguration entfernt, für
+        unvollständige werden Serial und verbleibende Änderungen übernommen.
+        Verwendet ein anderer Lauf das Journal, wird abgebrochen.
+        """
+        self._journal_done: set[str] = set()
+        self._resume: dict[str, PendingZone] = {}
+        self.journal: UploadJournal | None = None
+        if journal_file:
+            path = Path(journal_file)
+        elif self.cache_dir is not None:
+            path = journal_path(self.cache_dir, self.config_file, self.shard)
+        elif resume:
+            click.echo('--resume benötigt ein Journal (--journal oder --cache-dir).')
+            sys.exit(1)
+        else:
+            return
+        exists = path.exists()
+        if upload:
+            # Zuerst sperren: ein gleichzeitiger Lauf darf das Journal weder leeren noch fortsetzen
+            try:
+                self.journal = UploadJournal(path, resume=resume and exists)
+            except FileInUse as e:
+                click.echo(f'Journal {path} wird bereits von einem anderen Lauf verwendet (PID {e.holder}). '
+                           f'Bitte dessen Ende abwarten oder mit --journal bzw. --shard ein eigenes Journal verwenden.')
+                sys.exit(1)
+            except OSError as e:
+                click.echo(f'Journal {path} konnte nicht geöffnet werden: {str(e)} - Lauf ohne Journal')
+        if resume and exists:
+            try:
+                state = load_journal(path)
+            except OSError as e:
+                click.echo(f'Journal {path} konnte nicht gelesen werden: {str(e)}')
+                sys.exit(1)
+            domains = self.config['domains']
+            self._journal_done = state.done & domains.keys()
+            for d in sorted(self._journal_done):
+                del domains[d]
+                self.report.record(d, 'upload', 'skipped', 'laut Journal bereits hochgeladen')
+            self._resume = {d: p for d, p in state.pending.items() if d in domains}
+            click.echo(f'Fortsetzung: {len(self._journal_done)} Domain(s) bereits hochgeladen, '
+                       f'{len(self._resume)} unvollständig, {len(domains)} verbleibend')
+        elif resume:
+            click.echo(f'Kein Journal {path} gefunden - vollständiger Lauf')
 
     @property
     def today(self) -> str:
         return self._today
 
+    def latest_backup(self, domain: str) -> Path | None:
+        """Neuestes Backup (höchster Serial) einer Domain in zone-backups."""
+        if self._backups is None:
+            # Verzeichnis nur einmal lesen: <zone-file>.<serial> → höchster Serial je Zone-File
+            self._backups = {}
+            for entry in os.scandir(self.zone_backups_dir):
+                stem, _, serial = entry.name.rpartition('.')
+                if stem and serial.isdigit() and entry.is_file():
+                    if stem not in self._backups or int(serial) > self._backups[stem][0]:
+                        self._backups[stem] = (int(serial), Path(entry.path))
+        found = self._backups.get(self.config['domains'][domain]['zone-file'])
+        return found[1] if found is not None else None
+
     def _get_zone_serial(self, domain: str) -> str:
+        if self.offline:
+            backup = self.latest_backup(domain)
+            return backup.suffix[1:] if backup is not None else '0'
         try:
-            r = self._resolver.resolve(domain, "SOA")
+            r = self._resolver.resolve(domain, "SOA", lifetime=self.deadline.cap(self.dns_timeout))
             return str(r[0].serial)
         except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer,
                 dns.resolver.NoNameservers, dns.exception.DNSException) as e:
-            click.echo(f"Fehler beim Ermitteln des SOA-Zählers: {str(e)}")
-            sys.exit(1)
+            raise SerialError(f'Fehler beim Ermitteln des SOA-Zählers: {str(e)}') from e
 
     def _new_zone_serial(self, domain: str) -> str:
         soa_serial = self._get_zone_serial(domain)
+        self._previous_serials[domain] = soa_serial
         serial_prefix = soa_serial[:-2]
         if self.today == serial_prefix:
             suffix_int = int(soa_serial[-2:]) + 1
             if suffix_int > 99:
-                click.echo(f'SOA-Zähler für {domain} hat 99 erreicht – kein weiterer Upload heute möglich.')
-                sys.exit(1)
+                raise SerialError(f'SOA-Zähler für {domain} hat 99 erreicht – kein weiterer Upload heute möglich.')
             serial_suffix = f'{suffix_int:02d}'
         else:
             serial_suffix = '01'
         return self.today + serial_suffix
 
-    def _create_zone_data(self) -> dict[str, str]:
-        zones: dict[str, str] = {}
-        for domain, d in self.config["domains"].items():
+    def _render_jobs(self, domains: list[str] | None = None) -> Iterator[RenderJob]:
+        """Erzeugt die Render-Aufträge; der SOA-Zähler wird erst bei Bedarf ermittelt."""
+        for domain in self.config["domains"] if domains is None else domains:
+            if self.deadline.expired():
+                self._skip_expired(domain, 'render')
+                continue
+            d = self.config["domains"][domain]
             template_name = d["template"]
             if not _TEMPLATE_NAME_RE.fullmatch(template_name):
-                click.echo(f'Ungültiger Template-Name: {template_name!r} – nur Buchstaben, Ziffern, . _ - erlaubt.')
-                sys.exit(1)
-            template = self.env.get_template(template_name)
-            soa_serial = self._new_zone_serial(domain)
+                self._render_failed(domain, f'Ungültiger Template-Name: {template_name!r} – '
+                                            f'nur Buchstaben, Ziffern, . _ - erlaubt.')
+                continue
+            if domain in self._resume:
+                # Unvollständiger Upload: gleicher Serial wie im abgebrochenen Lauf
+                soa_serial = self._resume[domain].serial
+            elif domain in self._imported:
+                soa_serial = self._imported[domain]
+            else:
+                try:
+                    soa_serial = self._new_zone_serial(domain)
+                except SerialError as e:
+                    self._render_failed(domain, str(e))
+                    continue
             self._serials[domain] = soa_serial
-            zones[domain] = template.render(domain=domain, soa_serial=soa_serial, **d)
+            yield RenderJob(domain, template_name, soa_serial, d)
+
+    def _iter_zone_data(self, domains: list[str] | None = None) -> Iterator[RenderResult]:
+        """Rendert Domain für Domain in Konfigurationsreihenfolge (bzw. nur `domains`).
+
+        Mit mehreren Prozessen werden Rendern, Parsen und Validieren im
+        Prozess-Pool erledigt; Syntaxfehler führen wie im sequentiellen Ablauf
+        erst in upload_zone() zum Abbruch.
+        """
+        jobs = self._render_jobs(domains)
+        count = len(self.config["domains"]) if domains is None else len(domains)
+        if self.profiler is not None:
+            # Messwerte je Domain gibt es nur im Hauptprozess
+            for job in jobs:
+                with self.profiler.domain(job.domain, job.template):
+                    result = render_job(self.env, job, parse=False)
+                yield result
+        elif self.jobs > 1 and count > 1:
+            workers = min(self.jobs, count)
+            for result in render_stream(self.templates_dir, jobs, workers, fragment_cache=self.fragment_cache):
+                self._fragment_stats[0] += result.cache_hits
+                self._fragment_stats[1] += result.cache_misses
+                yield result
+        else:
+            for job in jobs:
+                yield render_job(self.env, job, parse=False)
+        self._report_fragment_cache()
+        if self.impact is not None:
+            self.impact.save()
+
+    def fragment_cache_stats(self) -> tuple[int, int]:
+        """(Treffer, Fehlschläge) des Fragment-Caches über alle Render-Prozesse."""
+        hits, misses = self._fragment_stats
+        cache = self.env.fragment_cache
+        if cache is not None:
+            hits, misses = hits + cache.hits, misses + cache.misses
+        return hits, misses
+
+    def reset_fragment_cache(self) -> None:
+        """Verwirft zwischengespeicherte Fragmente (z.B. nach Änderung der Templates)."""
+        cache = self.env.fragment_cache
+        if cache is None:
+            return
+        self._fragment_stats[0] += cache.hits
+        self._fragment_stats[1] += cache.misses
+        self.env.fragment_cache = FragmentCache(cache.max_entries)
+
+    def _report_fragment_cache(self) -> None:
+        hits, misses = self.fragment_cache_stats()
+        if hits + misses:
+            click.echo(f'Fragment-Cache: {hits} von {hits + misses} Includes wiederverwendet '
+                       f'({100 * hits / (hits + misses):.0f} %)')
+
+    def _render_failed(self, domain: str, message: str) -> None:
+        """Vermerkt eine nicht gerenderte Domain; die übrigen werden weiter bearbeitet."""
+        click.echo(f'Domäne {domain} konnte nicht gerendert werden: {message}')
+        self.report.record(domain, 'render', 'failed', message)
+        self._unrendered.add(domain)
+        self._set_exit_status(1)
+
+    def _accept_rendered(self, result: RenderResult) -> bool:
+        if result.error is not None:
+            self._render_failed(result.domain, result.error)
+            return False
+        self._unrendered.discard(result.domain)
+        if result.syntax_error is not None:
+            self._syntax_errors[result.domain] = result.syntax_error
+        elif result.rrsets is not None:
+            self._rrsets[result.domain] = result.rrsets
+        if self.impact is not None and result.syntax_error is None:
+            self._index_zone(result.domain, result.text)
+        return True
+
+    def _index_zone(self, domain: str, text: str) -> None:
+        """Trägt die Verweise einer gerenderten Zone in den Impact-Index ein."""
+        if domain not in self._rrsets:
+            try:
+                self._rrsets[domain] = parse_zone(text, domain)
+            except dns.exception.DNSException:
+                return          # der Syntaxfehler wird beim Upload gemeldet
+        self.impact.update(domain, self._rrsets[domain], self.config['domains'][domain])
+
+    def _create_zone_data(self) -> dict[str, str]:
+        """Rendert alle Domains vorab; nicht gerenderte Domains fehlen im Ergebnis
+        und werden in den folgenden Phasen übergangen (Exit-Code 1)."""
+        zones: dict[str, str] = {}
+        for result in self._iter_zone_data():
+            if self._accept_rendered(result):
+                zones[result.domain] = result.text
         return zones
 
+    def render_domains(self, domains: list[str]) -> list[str]:
+        """Rendert nur die angegebenen Domains (erneut) und liefert die erfolgreich gerenderten."""
+        rendered: list[str] = []
+        for domain in domains:
+            self.release_zone(domain)
+        for result in self._iter_zone_data(domains):
+            if self._accept_rendered(result):
+                self.zones[result.domain] = result.text
+                rendered.append(result.domain)
+        return rendered
+
+    def release_zone(self, domain: str) -> None:
+        """Gibt gerenderte Daten einer Domain frei."""
+        self.zones.pop(domain, None)
+        self._rrsets.pop(domain, None)
+        self._syntax_errors.pop(domain, None)
+
+    def _stream_zones(self) -> Iterator[str]:
+        """Liefert Domain für Domain, sobald sie gerendert ist, und gibt sie danach wieder frei."""
+        for result in self._iter_zone_data():
+            if not self._accept_rendered(result):
+                continue
+            domain = result.domain
+            self.zones[domain] = result.text
+            try:
+                yield domain
+            finally:
+                if domain not in self._retained:
+                    self.release_zone(domain)
+
+    def _release_retained(self, domain: str) -> None:
+        self._retained.discard(domain)
+        if self.stream:
+            self.release_zone(domain)
+
+    def process_zones(self) -> None:
+        """Streaming-Pipeline: jede Domain wird gerendert, gesichert, geschrieben
+        und hochgeladen, bevor die nächste an der Reihe ist.
+
+        Der Speicherbedarf hängt nicht von der Anzahl der Domains ab. Ohne
+        stream=True sind die Zonen bereits vorab gerendert und werden hier
+        ebenfalls Domain für Domain bearbeitet. Wird eine Domain nach einem
+        vorübergehenden Fehler wiederholt (--retries), bleibt ihre Zone bis
+        dahin im Speicher; Schreiben und Upload folgen erst auf die Sicherung.
+        """
+        backups = self._retry_queue(_BACKUP_ERRORS)
+        uploads = self._retry_queue(_UPLOAD_ERRORS)
+
+        def upload_done(domain: str, error: BaseException | None, attempts: int) -> None:
+            self._upload_done(domain, error, attempts)
+            self._release_retained(domain)
+
+        def backed_up(domain: str, error: BaseException | None = None, attempts: int = 1) -> None:
+            if self.backup:
+                self._backup_done(domain, error, attempts)
+            if self.write_zone:
+                self.write_zone_file(domain)
+            if self.upload:
+                uploads.run(domain, self._upload_zone, upload_done)
+            else:
+                self._release_retained(domain)
+
+        domains = self._stream_zones() if self.stream else list(self.zones)
+        for domain in domains:
+            if self.deadline.expired():
+                # Bereits vorab gerendert, aber nicht mehr begonnen
+                self._skip_expired(domain, *(phase for phase, on in (
+                    ('backup', self.backup), ('write', self.write_zone), ('upload', self.upload)) if on))
+                continue
+            self._retained.add(domain)
+            if self.backup:
+                backups.run(domain, self._backup_zone, backed_up)
+            else:
+                backed_up(domain)
+        backups.join()
+        uploads.join()
+        if self.upload:
+            self._report_write_cost()
+        if self.journal is not None:
+            self.journal.close()
+
+    def write_zone_file(self, domain: str) -> None:
+        d = self.config["domains"][domain]
+        zonefile = self.zone_files_dir / Path(d['zone-file'] + f'.{self._serials[domain]}')
+        try:
+            zonefile.write_text(self.zones[domain] + '\n', encoding='utf-8')
+            click.echo(f'Domäne {domain} wurde erfolgreich geschrieben')
+            self.report.record(domain, 'write', 'ok')
+        except OSError as e:
+            click.echo(f'Domäne {domain} konnte nicht geschrieben werden: {str(e)}')
+            self.report.record(domain, 'write', 'failed', str(e))
+
     def write_zone_files(self) -> None:
         if not self.write_zone:
             return
-        for domain, d in self.config["domains"].items():
-            zonefile = self.zone_files_dir / Path(d['zone-file'] + f'.{self._serials[domain]}')
-            try:
-                zonefile.write_text(self.zones[domain] + '\n', encoding='utf-8')
-                click.echo(f'Domäne {domain} wurde erfolgreich geschrieben')
-            except OSError as e:
-                click.echo(f'Domäne {domain} konnte nicht geschrieben werden: {str(e)}')
+        for domain in self.config["domains"]:
+            if domain in self._unrendered:
+                continue
+            if self.deadline.expired():
+                self._skip_expired(domain, 'write')
+            else:
+                self.write_zone_file(domain)
 
     def _validate_zone_syntax(self, domain: str) -> None:
-        try:
-            dns.zone.from_text(self.zones[domain], origin=domain)
-        except (dns.zone.UnknownOrigin, dns.exception.DNSException, Exception) as e:
-            click.echo(f'Syntaxfehler im Zone-File für {domain}: {e}')
+        if domain in self._rrsets:
+            return
+        error = self._syntax_errors.get(domain)
+        if error is None:
+            try:
+                self._rrsets[domain] = parse_zone(self.zones[domain], domain)
+            except dns.exception.DNSException as e:
+                error = str(e)
+        if error is not None:
+            click.echo(f'Syntaxfehler im Zone-File für {domain}: {error}')
             sys.exit(1)
 
-    def _parse_zone_rrsets(self, domain: str) -> dict[tuple[str, str], tuple[int, list[str]]]:
+    def _parse_zone_rrsets(self, domain: str) -> RRSetMap:
         """Parse gerenderten Zonentext in {(name, rdtype): (ttl, [rdata_values])}.
 
         SOA-Records werden ausgeschlossen (von Hetzner verwaltet).
         Hostnamen innerhalb der Zone werden relativ ausgegeben (wie Hetzner
         sie erwartet), externe FQDNs behalten den abschließenden Punkt.
         """
-        origin = dns.name.from_text(domain)
-        parsed = dns.zone.from_text(self.zones[domain], origin=origin)
-        result: dict[tuple[str, str], tuple[int, list[str]]] = {}
-        for name, node in parsed.nodes.items():
-            rel_name = '@' if name == dns.name.empty else str(name)
-            for rdataset in node.rdatasets:
-                rdtype = dns.rdatatype.to_text(rdataset.rdtype)
-                if rdtype == 'SOA':
-                    continue
-                ttl = int(rdataset.ttl)
-                records = sorted(
-                    r.to_text(origin=origin, relativize=True) for r in rdataset
-                )
-                result[(rel_name, rdtype)] = (ttl, records)
-        return result
-
-    def _sync_zone_rrsets(self, domain: str) -> None:
-        """Synchronisiert gerenderte Zone-RRSets mit Hetzner über die Record-Level-API."""
+        if domain not in self._rrsets:
+            self._rrsets[domain] = parse_zone(self.zones[domain], domain)
+        return self._rrsets[domain]
+
+    def _sync_zone_rrsets(self, domain: str) -> list[RRSetChange]:
+        """Synchronisiert gerenderte Zone-RRSets über das konfigurierte Backend.
+
+        Mit Journal wird der Plan und jede angekommene Änderung protokolliert;
+        bei --resume werden für unvollständige Zonen nur die verbleibenden
+        Änderungen des abgebrochenen Laufs angewandt.
+        """
         zone = self._hetzner_zones[domain]
-        desired = self._parse_zone_rrsets(domain)
+        backend = self._backend_for(domain)
+        journal = self.journal
+        if journal is None:
+            return backend.sync_zone(zone, self._parse_zone_rrsets(domain))
 
-        current_rrsets = self.client.zones.get_rrset_all(zone)
-        current_map: dict[tuple[str, str], Any] = {}
-        for rrset in current_rrsets:
-            if rrset.type == 'SOA':
-                continue
-            current_map[(rrset.name, rrset.type)] = rrset
+        serial = self._serials[domain]
+        on_applied = lambda i: journal.applied(domain, i)
+        # Ein erneuter Versuch nach einem Fehler synchronisiert vollständig
+        pending = self._resume.pop(domain, None)
+        if pending is not None:
+            changes = rebind_changes(pending.changes, backend.get_rrsets(zone))
+            journal.plan(domain, serial, changes)
+            if changes:
+                backend.apply_changes(zone, changes, on_applied)
+        else:
+            changes = backend.sync_zone(
+                zone, self._parse_zone_rrsets(domain),
+                on_planned=lambda planned: journal.plan(domain, serial, planned),
+                on_applied=on_applied,
+            )
+        journal.done(domain)
+        return changes
 
-        # Create / Update
-        for (name, rdtype), (ttl, records) in desired.items():
-            hetzner_records = [ZoneRecord(value=v) for v in records]
-            key = (name, rdtype)
+    def plan_zone(self, domain: str) -> list[RRSetChange]:
+        """Ermittelt die Änderungen für eine gerenderte Zone, ohne sie anzuwenden.
 
-            if key in current_map:
-                existing = current_map[key]
-                if existing.protection and existing.protection.get('change'):
-                    logger.warning('RRSet %s/%s ist geschützt, wird übersprungen', name, rdtype)
-                    continue
-                existing_values = sorted(r.value for r in (existing.records or []))
-                if existing_values != records or existing.ttl != ttl:
-                    self.client.zones.set_rrset_records(existing, hetzner_records)
-                    if existing.ttl != ttl:
-                        self.client.zones.change_rrset_ttl(existing, ttl)
+        Offline wird statt mit dem Backend mit dem neuesten Backup verglichen.
+        """
+        self._validate_zone_syntax(domain)
+        try:
+            if self.offline:
+                backup = self.latest_backup(domain)
+                if backup is None:
+                    raise BackendError(f'kein Backup in {self.zone_backups_dir}')
+                current = zone_file_rrsets(str(backup), domain)
             else:
-                self.client.zones.create_rrset(
-                    zone, name=name, type=rdtype, ttl=ttl, records=hetzner_records,
-                )
+                current = self._backend_for(domain).get_rrsets(self._hetzner_zones[domain])
+            return plan_changes(self._parse_zone_rrsets(domain), current)
+        except (hcloud.APIException, BackendError, OSError, dns.exception.DNSException) as e:
+            raise UploadError(f'\nDomain: {domain}\nError Message: {e}')
 
-        # Delete stale RRSets
-        for (name, rdtype), rrset in current_map.items():
-            if (name, rdtype) in desired:
-                continue
-            if rrset.protection and rrset.protection.get('change'):
-                logger.warning('RRSet %s/%s ist geschützt, Löschung übersprungen', name, rdtype)
+    def plan_zones(self, domains: list[str] | None = None) -> dict[str, list[RRSetChange]]:
+        """Gibt für jede Domain die Änderungen aus, die ein Upload anwenden würde."""
+        if domains:
+            unknown = [d for d in domains if d not in self.config['domains']]
+            if unknown:
+                click.echo(f'Nicht konfiguriert: {", ".join(unknown)}')
+                sys.exit(1)
+        plans: dict[str, list[RRSetChange]] = {}
+        for result in self._iter_zone_data(domains or None):
+            if not self._accept_rendered(result):
                 continue
+            domain = result.domain
+            self.zones[domain] = result.text
             try:
-                self.client.zones.delete_rrset(rrset)
-            except hcloud.APIException as e:
-                logger.warning('RRSet %s/%s konnte nicht gelöscht werden: %s', name, rdtype, e)
+                plans[domain] = changes = self.plan_zone(domain)
+            except UploadError as e:
+                click.echo(f'Domäne {domain} konnte nicht verglichen werden: {str(e)}')
+                self.report.record(domain, 'plan', 'failed', str(e).strip())
+                self._set_exit_status(1)
+                continue
+            finally:
+                self.release_zone(domain)
+            source = f' (gegen {self.latest_backup(domain).name})' if self.offline else ''
+            click.echo(f'Domäne {domain}: {len(changes)} Änderung(en){source}')
+            self._echo_changes(changes)
+            self.report.record(domain, 'plan', 'ok', changes=len(changes))
+        click.echo(f'Plan: {sum(1 for c in plans.values() if c)} von {len(plans)} Zone(n) mit Änderungen')
+        return plans
+
+    @staticmethod
+    def _echo_changes(changes: list[RRSetChange]) -> None:
+        for ch in changes:
+            click.echo(f'  {ch.action} {ch.name} {ch.rdtype} {ch.ttl} {" ".join(ch.records)}')
 
     def upload_zone(self, domain: str) -> None:
-        self._validate_zone_syntax(domain)
         try:
-            self._sync_zone_rrsets(domain)
-            click.echo(f'Domäne {domain} wurde bei Hetzner erfolgreich aktualisiert')
-        except hcloud.APIException as e:
-            self.exit_status_file.write_text("254", encoding='utf-8')
-            raise UploadError(f'\nDomain: {domain}\nError Message: {e}')
+            self._upload_zone(domain)
+        except _UPLOAD_ERRORS as e:
+            raise self._upload_failed(domain, e) from e
+
+    def _upload_failed(self, domain: str, error: BaseException, **extra: Any) -> UploadError:
+        self._set_exit_status(254)
+        self.report.record(domain, 'upload', 'failed', str(error), **extra)
+        return UploadError(f'\nDomain: {domain}\nError Message: {error}')
+
+    def _upload_zone(self, domain: str) -> None:
+        self._validate_zone_syntax(domain)
+        if domain in self._imported:
+            # Beim Anlegen bereits mit dem Zone-File befüllt
+            self._changes[domain] = []
+            if self.journal is not None:
+                self.journal.done(domain)
+            self._save_sync_state(domain, changed=True)
+            click.echo(f'Domäne {domain} wurde beim Anlegen mit dem Zone-File befüllt')
+            self.report.record(domain, 'upload', 'ok', changes=0, imported=True)
+            return
+        with zone_lock(self.lock_dir, domain, self.lock_timeout):
+            self._changes[domain] = self._sync_zone_rrsets(domain)
+        self._save_sync_state(domain, changed=bool(self._changes[domain]))
+        backend = self._backend_for(domain)
+        cost = backend.write_cost(self._changes[domain])
+        click.echo(f'Domäne {domain} wurde bei {backend.label} erfolgreich aktualisiert')
+        self.report.record(domain, 'upload', 'ok', changes=len(self._changes[domain]),
+                           requests=cost.requests, saved_requests=cost.full_requests - cost.requests)
+
+    def _save_sync_state(self, domain: str, changed: bool) -> None:
+        """Legt den hochgeladenen Stand für `dnsjinja audit` ab.
+
+        Nach Änderungen gilt der gerenderte SOA-Zähler als Vergleichswert,
+        ohne Änderungen bleibt der zuletzt bestätigte erhalten – sonst müsste
+        das nächste Audit jede hochgeladene Zone vollständig vergleichen.
+        """
+        if self.sync_state is None:
+            return
+        if changed:
+            serial = int(self._serials[domain])
+        else:
+            state = self.sync_state.load(domain)
+            serial = state[1] if state is not None else None
+        self.sync_state.save(domain, self._parse_zone_rrsets(domain), serial)
+
+    def _retry_queue(self, errors: tuple[type[BaseException], ...]) -> RetryQueue:
+        """Warteschlange für Domains, deren Bearbeitung vorübergehend fehlgeschlagen ist (--retries)."""
+        def on_retry(domain: str, error: BaseException, attempt: int, delay: float) -> None:
+            click.echo(f'Domäne {domain}: vorübergehender Fehler ({str(error).strip()}), '
+                       f'Versuch {attempt}/{self.retries + 1} in {delay:.1f} s')
+        return RetryQueue(errors, attempts=self.retries + 1, base=self.retry_delay, deadline=self.deadline,
+                          workers=self.workers, on_retry=on_retry)
 
     def upload_zones(self) -> None:
         if not self.upload:
             return
-        for domain in self.config["domains"]:
-            try:
-                self.upload_zone(domain)
-            except UploadError as e:
-                click.echo(f'Domäne {domain} konnte bei Hetzner nicht aktualisiert werden: {str(e)}')
+        queue = self._retry_queue(_UPLOAD_ERRORS)
+        selected = self.preflight_upload()
+        self._prefetch_remote_state([d for d in self.config['domains'] if d in self.zones
+                                     and d not in self._imported and d not in self._syntax_errors
+                                     and (selected is None or d in selected)])
+        only = {d for d in self.config['domains'] if d not in self._unrendered and (selected is None or d in selected)}
+        self._for_each_domain(lambda domain: queue.run(domain, self._upload_zone, self._upload_done), only, phase='upload')
+        queue.join()
+        self._report_write_cost()
+        if self.journal is not None:
+            self.journal.close()
+
+    def _upload_done(self, domain: str, error: BaseException | None, attempts: int) -> None:
+        """Endgültiges Ergebnis eines Uploads aus der RetryQueue."""
+        if error is None:
+            if attempts > 1:
+                self.report.update(domain, 'upload', attempts=attempts)
+            return
+        e = self._upload_failed(domain, error, attempts=attempts)
+        click.echo(f'Domäne {domain} konnte bei {self._backend_for(domain).label} nicht aktualisiert werden: {str(e)}')
+
+    def estimate_api_calls(self, domain: str) -> CallEstimate:
+        """Anfragen für den Upload einer Domain, ohne die API zu fragen.
+
+        Die Schreibanfragen werden gegen den zuletzt hochgeladenen Stand
+        geplant; ohne ihn wird je RRSet eine Anfrage angenommen.
+        """
+        if domain in self._imported:
+            return CallEstimate(domain, 0, 0, True)
+        backend = self._backend_for(domain)
+        try:
+            desired = self._parse_zone_rrsets(domain)
+        except (ValueError, dns.exception.DNSException):
+            return CallEstimate(domain, 0, 0, False)    # der Fehler wird beim Upload gemeldet
+        reads = backend.read_cost(len(desired) + 1)    # mit SOA
+        state = self.sync_state.load(domain) if self.sync_state is not None else None
+        if state is None:
+            return CallEstimate(domain, reads, len(desired), False)
+        current = {key: RemoteRRSet(ttl, records) for key, (ttl, records) in state[0].items()}
+        return CallEstimate(domain, reads, backend.write_cost(plan_changes(desired, current)).requests, True)
+
+    def _predict_upload_seconds(self, estimates: list[CallEstimate]) -> float:
+        """Dauer des Uploads: je Projekt die längere aus Laufzeit (frühere Läufe) und Wartezeit auf das Rate-Limit."""
+        seconds = 0.0
+        for project in self.backends:
+            own = [e for e in estimates if self._project_of.get(e.domain, '') == project]
+            if not own:
                 continue
+            durations = [self.durations.estimate('upload', e.domain, self._rrset_count(e.domain))
+                         if self.durations is not None else DEFAULT_SECONDS_PER_RRSET * self._rrset_count(e.domain)
+                         for e in own]
+            calls = sum(e.calls for e in own)
+            waits = [parallel_bound(durations, self.workers)]
+            if project in self._rate_limits:
+                waits.append(self._rate_limits[project].wait_for(calls))
+            if project in self._buckets:
+                waits.append(self._buckets[project].wait_for(calls))
+            seconds = max(seconds, *waits)
+        return seconds
+
+    def preflight_upload(self) -> set[str] | None:
+        """Schätzt vor dem Upload die API-Anfragen und die Dauer und setzt --max-api-calls durch.
+
+        Gibt die hochzuladenden Domains zurück, None für alle. Überschreitet
+        die Schätzung das Budget, wird der Upload abgelehnt (`reject`) oder
+        auf die Domains mit der höchsten Priorität beschränkt (`priority`);
+        zurückgestellte Domains setzen Exit-Code 250.
+        """
+        if not self._rate_limits:
+            return None                     # kein Backend mit API-Budget
+        estimates = [self.estimate_api_calls(d) for d in self.config['domains']
+                     if d in self.zones and d not in self._syntax_errors]
+        spent = sum(status.calls for status in self._rate_limits.values())
+        reads = sum(e.reads for e in estimates)
+        writes = sum(e.writes for e in estimates)
+        total = spent + reads + writes
+        inexact = sum(1 for e in estimates if not e.exact)
+        click.echo(f'API-Anfragen: {spent} bisher, geschätzt {reads} Abruf(e) und {writes} Schreibanfrage(n), '
+                   f'zusammen {total}' + (f' ({inexact} Domain(s) ohne gespeicherten Stand)' if inexact else '') +
+                   f'; Dauer ca. {self._predict_upload_seconds(estimates):.0f} s')
+        for project, status in self._rate_limits.items():
+            calls = sum(e.calls for e in estimates if self._project_of.get(e.domain, '') == project)
+            if status.remaining is not None and calls > status.remaining:
+                click.echo(f'{self.backends[project].label}: {calls} Anfrage(n) bei verbleibendem Rate-Limit '
+                           f'von {status.remaining}, Wartezeit ca. {status.wait_for(calls):.0f} s')
+        if not self.max_api_calls or total <= self.max_api_calls:
+            return None
+        reason = f'geschätzt {total} API-Anfragen, --max-api-calls {self.max_api_calls}'
+        if self.over_budget == 'priority':
+            selected, deferred = within_budget(
+                estimates, self.max_api_calls - spent,
+                lambda d: int(self.config['domains'][d].get('priority', 0)))
+            click.echo(f'{reason}: nur {len(selected)} Domain(s) mit der höchsten Priorität werden hochgeladen')
+        else:
+            selected, deferred = [], [e.domain for e in estimates]
+            click.echo(f'{reason}: Upload wird nicht begonnen')
+        for domain in deferred:
+            self.report.record(domain, 'upload', 'skipped', reason)
+        if deferred:
+            self._set_exit_status(250)
+        return set(selected)
+
+    def _report_write_cost(self) -> None:
+        """Gibt die Schreibanfragen aller Uploads aus, verglichen mit vollständigem Ersetzen."""
+        cost = WriteCost()
+        for domain, changes in self._changes.items():
+            cost += self._backend_for(domain).write_cost(changes)
+        if cost.requests:
+            click.echo(f'Upload: {cost.requests} Schreibanfrage(n) mit {cost.records} Record(s), '
+                       f'eingespart: {cost.full_requests - cost.requests} Anfrage(n), '
+                       f'{cost.full_records - cost.records} Record(s)')
+
+    def verify_zones(self) -> None:
+        """Prüft, ob alle Nameserver die hochgeladenen Änderungen ausliefern.
+
+        Geprüft werden nur geänderte RRSets und ein gegenüber dem Stand vor
+        dem Upload erhöhter SOA-Zähler.
+        """
+        if not (self.upload and self.verify):
+            return
+        expectations = [
+            expectation_from_changes(domain, self._previous_serials.get(domain), changes)
+            for domain, changes in self._changes.items() if changes
+        ]
+        if not expectations:
+            return
+        if self.deadline.expired():
+            for expectation in expectations:
+                self._skip_expired(expectation.domain, 'verify')
+            return
+        click.echo(f'Prüfe Verteilung von {len(expectations)} Zone(n) auf '
+                   f'{len(self._resolver.nameservers)} Nameserver(n) ...')
+        timeout = self.deadline.cap(self.verify_timeout)
+        results = verify_propagation(expectations, list(self._resolver.nameservers), timeout=timeout)
+        for result in results:
+            if result.seconds is not None:
+                click.echo(f'Domäne {result.domain} ist nach {result.seconds:.1f} s auf allen Nameservern sichtbar')
+                self.report.record(result.domain, 'verify', 'ok', seconds=round(result.seconds, 1))
+            else:
+                click.echo(f'Domäne {result.domain} ist nach {timeout:.0f} s noch nicht sichtbar auf: '
+                           f'{", ".join(result.pending)}')
+                self.report.record(result.domain, 'verify', 'failed', pending=result.pending)
+                self._set_exit_status(253)
+
+    def audit_zones(self, timeout: float = 5.0, concurrency: int = 200, port: int = 53) -> list[AuditResult]:
+        """Sucht Zonen, die außerhalb von dnsjinja geändert wurden.
+
+        Zuerst werden die SOA-Zähler aller Zonen gleichzeitig bei allen
+        Nameservern abgefragt. Nur wenn der Zähler nicht dem beim letzten
+        Audit bestätigten entspricht, werden die RRSets beim Backend mit dem
+        zuletzt hochgeladenen Stand verglichen (ohne gespeicherten Stand mit
+        der gerenderten Zone). Stimmen sie überein, gilt der aktuelle Zähler
+        als neuer Vergleichswert. Abweichungen führen zu Exit-Code 252.
+        """
+        start = time.monotonic()
+        domains = list(self.config['domains'])
+        serials = live_serials(domains, list(self._resolver.nameservers), port, timeout, concurrency)
+        results: dict[str, AuditResult] = {}
+        desired: dict[str, RRSetMap] = {}
+        for domain in domains:
+            state = self.sync_state.load(domain) if self.sync_state is not None else None
+            if state is None:
+                continue
+            if state[1] is not None and serials[domain] == state[1]:
+                results[domain] = AuditResult(domain, 'ok', 'serial', [])
+            else:
+                desired[domain] = state[0]
+        # Ohne gespeicherten Stand wird mit der gerenderten Zone verglichen
+        unsynced = [d for d in domains if d not in results and d not in desired]
+        rendered = set(self.render_domains(unsynced)) if unsynced else set()
+        for domain in unsynced:
+            if domain in self._expired_domains:
+                self._skip_expired(domain, 'audit')
+                continue
+            try:
+                if domain not in rendered:
+                    raise ValueError('Rendern fehlgeschlagen')
+                desired[domain] = self._parse_zone_rrsets(domain)
+            except (ValueError, dns.exception.DNSException) as e:
+                results[domain] = AuditResult(domain, 'failed', 'full', [], str(e))
+            finally:
+                self.release_zone(domain)
+
+        def compare(domain: str) -> None:
+            try:
+                current = self._backend_for(domain).get_rrsets(self._hetzner_zones[domain])
+            except (hcloud.APIException, BackendError) as e:
+                results[domain] = AuditResult(domain, 'failed', 'full', [], str(e))
+                return
+            changes = plan_changes(desired[domain], current)
+            results[domain] = AuditResult(domain, 'drift' if changes else 'ok', 'full', changes)
+            if not changes and self.sync_state is not None:
+                self.sync_state.save(domain, desired[domain], serials[domain])
+
+        self._prefetch_remote_state(list(desired))
+        self._for_each_domain(compare, set(desired), phase='audit')
+        ordered = [results[d] for d in domains if d in results]
+        for result in ordered:
+            if result.status == 'drift':
+                click.echo(f'Domäne {result.domain} wurde außerhalb von dnsjinja geändert:')
+                self._echo_changes(result.changes)
+                self._set_exit_status(252)
+            elif result.status == 'failed':
+                click.echo(f'Domäne {result.domain} konnte nicht geprüft werden: {result.message}')
+                self._set_exit_status(1)
+            self.report.record(result.domain, 'audit', result.status, result.message,
+                               check=result.check, changes=len(result.changes))
+        drift = sum(r.status == 'drift' for r in ordered)
+        by_serial = sum(r.check == 'serial' for r in ordered)
+        click.echo(f'Audit: {len(ordered)} Zone(n), {by_serial} per SOA-Zähler bestätigt, '
+                   f'{len(desired)} vollständig verglichen, {drift} mit Abweichungen '
+                   f'({time.monotonic() - start:.1f} s)')
+        return ordered
 
     def backup_zone(self, domain: str) -> None:
         try:
-            zone = self._hetzner_zones[domain]
-            response = self.client.zones.export_zonefile(zone)
-            backupfile = self.zone_backups_dir / Path(self.config['domains'][domain]['zone-file'] + f'.{self._get_zone_serial(domain)}')
-            backupfile.write_text(response.zonefile + '\n', encoding='utf-8')
-            click.echo(f'Domäne {domain} wurde erfolgreich gesichert')
-        except (hcloud.APIException, OSError) as e:
-            click.echo(f'Domäne {domain} konnte nicht gesichert werden: {str(e)}')
+            self._backup_zone(domain)
+        except _BACKUP_ERRORS as e:
+            self._backup_failed(domain, e)
+
+    def _backup_failed(self, domain: str, error: BaseException, **extra: Any) -> None:
+        click.echo(f'Domäne {domain} konnte nicht gesichert werden: {str(error)}')
+        self.report.record(domain, 'backup', 'failed', str(error), **extra)
+
+    def _backup_zone(self, domain: str) -> None:
+        zone = self._hetzner_zones[domain]
+        zonefile = self._backend_for(domain).export_zone(zone)
+        backupfile = self.zone_backups_dir / Path(self.config['domains'][domain]['zone-file'] + f'.{self._get_zone_serial(domain)}')
+        backupfile.write_text(zonefile + '\n', encoding='utf-8')
+        click.echo(f'Domäne {domain} wurde erfolgreich gesichert')
+        self.report.record(domain, 'backup', 'ok')
 
     def backup_zones(self) -> None:
         if not self.backup:
             return
-        for domain in self.config["domains"]:
-            self.backup_zone(domain)
+        queue = self._retry_queue(_BACKUP_ERRORS)
+        self._for_each_domain(lambda domain: queue.run(domain, self._backup_zone, self._backup_done), phase='backup')
+        queue.join()
+
+    def _backup_done(self, domain: str, error: BaseException | None, attempts: int) -> None:
+        """Endgültiges Ergebnis einer Sicherung aus der RetryQueue."""
+        if error is None:
+            if attempts > 1:
+                self.report.update(domain, 'backup', attempts=attempts)
+            return
+        self._backup_failed(domain, error, attempts=attempts)
+
+    def _set_exit_status(self, code: int) -> None:
+        self.exit_status_file.write_text(str(code), encoding='utf-8')
+        self.report.exit_code = code
+
+    def profile_phase(self, name: str):
+        """Kontext für eine mit --profile zu messende Phase."""
+        return self.profiler.phase(name) if self.profiler is not None else nullcontext()
+
+    def write_profile(self) -> None:
+        if self.profiler is None:
+            return
+        try:
+            self.profiler.write()
+        except OSError as e:
+            click.echo(f'Profil konnte nicht geschrieben werden: {str(e)}')
+        for line in self.profiler.summary():
+            click.echo(line)
+
+    def write_report(self, path: str | Path | None = None) -> None:
+        path = path or self.report_file
+        if path is not None:
+            _write_report(self.report, path)
 
-    def dry_run(self) -> None:
-        """Gibt alle gerenderten Zone-Files auf stdout aus, ohne zu schreiben oder hochzuladen."""
-        for domain, content in self.zones.items():
-            click.echo(f'=== {domain} (Serial: {self._serials[domain]}) ===')
-            click.echo(content)
+    def dry_run(self, output: TextIO | None = None) -> None:
+        """Gibt alle gerenderten Zone-Files aus (Standard: stdout), ohne zu schreiben oder hochzuladen.
+
+        Im Streaming-Betrieb wird jede Zone ausgegeben, sobald sie gerendert ist.
+        """
+        domains = self._stream_zones() if self.stream else list(self.zones)
+        for domain in domains:
+            click.echo(f'=== {domain} (Serial: {self._serials[domain]}) ===', file=output)
+            click.echo(self.zones[domain], file=output)
 
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option('-d', '--datadir', default='.', envvar='DNSJINJA_DATADIR', show_default=True, help="Basisverzeichnis für Templates und Konfiguration (DNSJINJA_DATADIR)")
 @click.option('-c', '--config', default='config/config.json', envvar='DNSJINJA_CONFIG', show_default=True, help="Konfigurationsdatei (DNSJINJA_CONFIG)")
 @click.option('-u', '--upload', is_flag=True, default=False, help="Upload der Zonen")
@@ -313,17 +1272,160 @@ class DNSJinja:
 @click.option('-w', '--write', is_flag=True, default=False, help="Zone-Files schreiben")
 @click.option('-C', '--create-missing', is_flag=True, default=False, help="Konfigurierte Domains, die bei Hetzner nicht existieren, neu anlegen")
 @click.option('--auth-api-token', default="", envvar='DNSJINJA_AUTH_API_TOKEN', help="API-Token (Bearer) für Hetzner Cloud API (DNSJINJA_AUTH_API_TOKEN)")
+@click.option('--tsig-secret', default="", envvar='DNSJINJA_TSIG_SECRET', help="TSIG-Schlüssel (Base64) für das Backend 'rfc2136' (DNSJINJA_TSIG_SECRET)")
+@click.option('-j', '--jobs', default=1, type=click.IntRange(min=0), envvar='DNSJINJA_JOBS', show_default=True, help="Anzahl Prozesse zum Rendern und Validieren, 0 = alle Kerne (DNSJINJA_JOBS)")
+@click.option('--workers', default=1, type=click.IntRange(min=1), envvar='DNSJINJA_WORKERS', show_default=True, help="Domains je Projekt, die beim Sichern und Hochladen gleichzeitig bearbeitet werden, die nach früheren Läufen längsten zuerst (DNSJINJA_WORKERS)")
+@click.option('--cache-dir', default=lambda: platformdirs.user_cache_dir('dnsjinja', ''), envvar='DNSJINJA_CACHE_DIR', help="Verzeichnis für Cache und lokalen Zustand, leer = kein Cache (DNSJINJA_CACHE_DIR)")
+@click.option('--zone-cache-ttl', default=300.0, type=click.FloatRange(min=0), envvar='DNSJINJA_ZONE_CACHE_TTL', show_default=True, help="Gültigkeit der zwischengespeicherten Zonenliste in Sekunden, 0 = immer neu laden (DNSJINJA_ZONE_CACHE_TTL)")
+@click.option('--deadline', default=0.0, type=click.FloatRange(min=0), envvar='DNSJINJA_DEADLINE', show_default=True, help="Zeitbudget des Laufs in Sekunden, danach werden keine weiteren Domains begonnen, 0 = unbegrenzt (DNSJINJA_DEADLINE)")
+@click.option('--dns-timeout', default=5.0, type=click.FloatRange(min=0.1), show_default=True, help="Frist je DNS-Abfrage des SOA-Zählers in Sekunden")
+@click.option('--api-timeout', default=30.0, type=click.FloatRange(min=0.1), show_default=True, help="Frist je Anfrage an die Hetzner Cloud API in Sekunden")
+@click.option('--max-api-calls', default=0, type=click.IntRange(min=0), envvar='DNSJINJA_MAX_API_CALLS', show_default=True, help="Höchstzahl der API-Anfragen eines Laufs; vor dem Upload geschätzt, 0 = unbegrenzt (DNSJINJA_MAX_API_CALLS)")
+@click.option('--over-budget', type=click.Choice(['reject', 'priority']), default='reject', envvar='DNSJINJA_OVER_BUDGET', show_default=True, help="Bei Überschreitung von --max-api-calls den Upload ablehnen oder nur Domains mit der höchsten Priorität hochladen (DNSJINJA_OVER_BUDGET)")
+@click.option('--retries', default=0, type=click.IntRange(min=0), envvar='DNSJINJA_RETRIES', show_default=True, help="Weitere Versuche je Domain bei vorübergehenden Fehlern (Rate-Limit, 5xx, Zeitüberschreitung) beim Sichern und Hochladen (DNSJINJA_RETRIES)")
+@click.option('--retry-delay', default=2.0, type=click.FloatRange(min=0), show_default=True, help="Grundwartezeit in Sekunden vor einem weiteren Versuch; verdoppelt sich je Versuch, zufällig gestreut")
+@click.option('--verify', is_flag=True, default=False, help="Nach dem Upload prüfen, ob alle Nameserver die Änderungen ausliefern")
+@click.option('--verify-timeout', default=300.0, type=click.FloatRange(min=0), show_default=True, help="Frist für --verify in Sekunden")
+@click.option('--shard', default=None, envvar='DNSJINJA_SHARD', help="Nur den Anteil i von N Domains bearbeiten, z.B. 2/4 (DNSJINJA_SHARD)")
+@click.option('--report', 'report_file', type=click.Path(dir_okay=False), default=None, envvar='DNSJINJA_REPORT', help="Ergebnisbericht als JSON in diese Datei schreiben; wird von exit_on_error ausgewertet (DNSJINJA_REPORT)")
+@click.option('--lock-dir', default='', envvar='DNSJINJA_LOCK_DIR', help="Verzeichnis für Zonen-Sperren paralleler Läufe (DNSJINJA_LOCK_DIR)")
+@click.option('--lock-timeout', default=60.0, type=click.FloatRange(min=0), show_default=True, help="Wartezeit in Sekunden auf eine von einem anderen Lauf gesperrte Zone")
+@click.option('--profile', 'profile_dir', type=click.Path(file_okay=False), default='', help="Profildaten (cProfile je Phase, Messwerte je Domain) in dieses Verzeichnis schreiben")
+@click.option('--profile-top', default=10, type=click.IntRange(min=1), show_default=True, help="Anzahl der langsamsten Domains und Templates in der Profil-Zusammenfassung")
+@click.option('--resume', is_flag=True, default=False, help="Abgebrochenen Upload anhand des Journals fortsetzen")
+@click.option('--journal', 'journal_file', type=click.Path(dir_okay=False), default='', envvar='DNSJINJA_JOURNAL', help="Journal-Datei für Upload und --resume, Standard im Cache-Verzeichnis (DNSJINJA_JOURNAL)")
+@click.option('--no-fragment-cache', 'fragment_cache', is_flag=True, flag_value=False, default=True, help="Eingebundene Templates nicht zwischenspeichern, sondern für jede Domain neu rendern")
+@click.option('--stream', is_flag=True, default=False, envvar='DNSJINJA_STREAM', help="Domains einzeln nacheinander rendern, sichern, schreiben und hochladen (konstanter Speicherbedarf, DNSJINJA_STREAM)")
+@click.option('-o', '--output', type=click.File('w'), default='-', help="Ausgabe für --dry-run (Standard: stdout)")
 @click.option('--dry-run', 'dry_run', is_flag=True, default=False, help="Zone-Files rendern und ausgeben, ohne zu schreiben oder hochzuladen")
-def run(upload, backup, write, datadir, config, auth_api_token, create_missing, dry_run):
+@click.pass_context
+def run(ctx, upload, backup, write, datadir, config, auth_api_token, create_missing, tsig_secret, jobs, workers, cache_dir,
+        zone_cache_ttl, deadline, dns_timeout, api_timeout, max_api_calls, over_budget, retries, retry_delay, verify, verify_timeout, shard, report_file, lock_dir, lock_timeout, profile_dir, profile_top,
+        resume, journal_file, fragment_cache, stream, output, dry_run):
     """Modulare Verwaltung von DNS-Zonen (Hetzner Cloud API)"""
+    try:
+        shard = Shard.parse(shard) if shard else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--shard')
+    if stream and max_api_calls and ctx.invoked_subcommand is None:
+        # Die Schätzung braucht alle gerenderten Zonen, die es mit --stream nie gleichzeitig gibt
+        raise click.UsageError('--max-api-calls ist mit --stream nicht möglich: '
+                               'die API-Anfragen werden vor dem Upload aller Zonen geschätzt')
+    options = dict(datadir=datadir, config_file=config, auth_api_token=auth_api_token,
+                   create_missing=create_missing, tsig_secret=tsig_secret, jobs=jobs,
+                   cache_dir=cache_dir, shard=shard, lock_dir=lock_dir, lock_timeout=lock_timeout,
+                   profile_dir=profile_dir, profile_top=profile_top, stream=stream,
+                   zone_cache_ttl=zone_cache_ttl, fragment_cache=fragment_cache, workers=workers,
+                   deadline=deadline, dns_timeout=dns_timeout, api_timeout=api_timeout,
+                   retries=retries, retry_delay=retry_delay)
+    if ctx.invoked_subcommand is not None:
+        # Unterbefehle (serve, plan, audit) verwenden dieselben Einstellungen
+        ctx.obj = dict(options, report_file=report_file or "")
+        return
     if dry_run:
-        dnsjinja = DNSJinja(False, False, False, datadir, config, auth_api_token, create_missing)
-        dnsjinja.dry_run()
+        dnsjinja = DNSJinja(**options)
+        with dnsjinja.profile_phase('dry-run'):
+            dnsjinja.dry_run(output)
+        dnsjinja.write_profile()
     else:
-        dnsjinja = DNSJinja(upload, backup, write, datadir, config, auth_api_token, create_missing)
-        dnsjinja.backup_zones()
-        dnsjinja.write_zone_files()
-        dnsjinja.upload_zones()
+        # Frist und Bericht bestehen schon vor dem Rendern im Konstruktor, damit
+        # SIGTERM (z.B. vom Scheduler) wie eine abgelaufene Frist wirkt und
+        # jeder Abbruch einen Teilbericht hinterlässt
+        run_deadline = Deadline(deadline)
+        report = RunReport(shard)
+        signal.signal(signal.SIGTERM, lambda signum, frame: run_deadline.expire('Abbruch durch SIGTERM'))
+        dnsjinja = None
+        try:
+            dnsjinja = DNSJinja(upload, backup, write, verify=verify, verify_timeout=verify_timeout,
+                                report_file=report_file or "", resume=resume, journal_file=journal_file,
+                                max_api_calls=max_api_calls, over_budget=over_budget, report=report,
+                                **dict(options, deadline=run_deadline))
+            if stream:
+                with dnsjinja.profile_phase('pipeline'):
+                    dnsjinja.process_zones()
+            else:
+                with dnsjinja.profile_phase('backup'):
+                    dnsjinja.backup_zones()
+                with dnsjinja.profile_phase('write'):
+                    dnsjinja.write_zone_files()
+                with dnsjinja.profile_phase('upload'):
+                    dnsjinja.upload_zones()
+            with dnsjinja.profile_phase('verify'):
+                dnsjinja.verify_zones()
+        except SystemExit as e:
+            # Auch ein abgebrochener Lauf hinterlässt seinen Teilbericht
+            report.exit_code = e.code if isinstance(e.code, int) and e.code else 1
+            if dnsjinja is not None:
+                dnsjinja.write_report()
+            elif report_file:
+                _write_report(report, report_file)
+            raise
+        dnsjinja.report_deadline()
+        dnsjinja.write_report()
+        dnsjinja.write_profile()
+
+
+@run.command()
+@click.option('--host', default='127.0.0.1', envvar='DNSJINJA_SERVE_HOST', show_default=True, help="Adresse der HTTP-API (DNSJINJA_SERVE_HOST)")
+@click.option('--port', default=8053, type=click.IntRange(0, 65535), envvar='DNSJINJA_SERVE_PORT', show_default=True, help="Port der HTTP-API (DNSJINJA_SERVE_PORT)")
+@click.option('--token', 'serve_token', default='', envvar='DNSJINJA_SERVE_TOKEN', help="Bearer-Token, das Aufrufer der HTTP-API angeben müssen (DNSJINJA_SERVE_TOKEN)")
+@click.pass_obj
+def serve(options, host, port, serve_token):
+    """Pipeline bereithalten und Aufträge über eine lokale HTTP-API annehmen"""
+    # Gerendert wird erst je Auftrag und nur für die angefragten Domains
+    service = ControlService(lambda: DNSJinja(**dict(options, stream=True, report_file="", deadline=0.0)))
+    serve_http(service, host, port, serve_token)
+
+
+@run.command()
+@click.option('--offline', is_flag=True, default=False, help="Mit dem neuesten Backup in zone-backups statt mit dem Backend vergleichen (ohne Token und Netzwerk)")
+@click.argument('domains', nargs=-1)
+@click.pass_obj
+def plan(options, offline, domains):
+    """Änderungen anzeigen, die ein Upload anwenden würde"""
+    dnsjinja = DNSJinja(**dict(options, stream=True, offline=offline))
+    dnsjinja.plan_zones(list(domains))
+    dnsjinja.report_deadline()
+    dnsjinja.write_report()
+
+
+@run.command()
+@click.option('--timeout', default=5.0, type=click.FloatRange(min=0.1), show_default=True, help="Frist je SOA-Abfrage in Sekunden")
+@click.option('--concurrency', default=200, type=click.IntRange(min=1), show_default=True, help="Höchstzahl gleichzeitiger SOA-Abfragen")
+@click.pass_obj
+def audit(options, timeout, concurrency):
+    """Außerhalb von dnsjinja geänderte Zonen finden (zuerst per SOA-Zähler)"""
+    dnsjinja = DNSJinja(**dict(options, stream=True))
+    dnsjinja.audit_zones(timeout, concurrency)
+    dnsjinja.report_deadline()
+    dnsjinja.write_report()
+
+
+@run.command('who-uses')
+@click.option('--domains-only', is_flag=True, default=False, help="Nur die Domains ausgeben, je Zeile eine (z.B. für dnsjinja plan)")
+@click.argument('targets', nargs=-1, required=True)
+@click.pass_obj
+def who_uses(options, domains_only, targets):
+    """Domains und RRSets, die auf einen Host (auch *.suffix), eine IP bzw. ein Netz, einen Provider (mail:<name>, www:<name>, xmpp:<name>) oder eine Gruppe (group:<name>) verweisen"""
+    # Nur der beim Rendern geschriebene Index wird gelesen, ohne API und Templates
+    config_file = DNSJinja._check_path(options['config_file'], '.', 'Konfigurationsdatei', expect='file')
+    if not options['cache_dir']:
+        click.echo('Ohne Cache-Verzeichnis gibt es keinen Impact-Index.')
+        sys.exit(1)
+    index = ImpactIndex(Path(options['cache_dir']), config_file)
+    if not index.entries:
+        click.echo('Impact-Index ist leer - bitte zuerst rendern (z.B. dnsjinja --dry-run -o /dev/null).')
+        sys.exit(1)
+    matches = [match for target in targets for match in index.query(target)]
+    if not matches:
+        click.echo(f'Keine Domain verweist auf {", ".join(targets)}', err=True)
+        sys.exit(1)
+    if domains_only:
+        for domain in dict.fromkeys(m.domain for m in matches):
+            click.echo(domain)
+        return
+    for m in matches:
+        click.echo(f'{m.domain}\t{m.name or "-"}\t{m.rdtype or "Konfiguration"}\t{m.target}')
 
 
 def main():
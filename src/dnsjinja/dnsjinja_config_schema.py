@@ -1,10 +1,57 @@
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Literal
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 
 
 class DomainConfig(BaseModel):
     """Konfiguration für eine einzelne Domain (Validierungs-Modell)."""
     model_config = ConfigDict(extra='allow', populate_by_name=True)
     template: str
+    priority: int = 0           # Reihenfolge bei --over-budget priority, höchste zuerst
+
+
+class BackendConfig(BaseModel):
+    """Backend für die Übertragung der Zonen (Standard: Hetzner Cloud API)."""
+    model_config = ConfigDict(extra='forbid', populate_by_name=True)
+    type: Literal['hetzner', 'rfc2136'] = 'hetzner'
+    server: str | None = None
+    port: int = 53
+    tsig_key_name: str | None = Field(default=None, alias='tsig-key-name')
+    tsig_algorithm: str = Field(default='hmac-sha256', alias='tsig-algorithm')
+    timeout: float = Field(default=10.0, gt=0)
+
+    @model_validator(mode='after')
+    def _check_rfc2136(self):
+        if self.type == 'rfc2136' and not (self.server and self.tsig_key_name):
+            raise ValueError("Backend 'rfc2136' benötigt 'server' und 'tsig-key-name'")
+        return self
+
+
+class RemoteStateConfig(BaseModel):
+    """Quelle für den aktuellen Stand der Zonen (Standard: REST-API des Backends)."""
+    model_config = ConfigDict(extra='forbid', populate_by_name=True)
+    type: Literal['api', 'axfr'] = 'api'
+    server: str | None = None
+    port: int = 53
+    tsig_key_name: str | None = Field(default=None, alias='tsig-key-name')
+    tsig_algorithm: str = Field(default='hmac-sha256', alias='tsig-algorithm')
+    timeout: float = Field(default=10.0, gt=0)
+    concurrency: int = Field(default=16, ge=1)
+
+    @model_validator(mode='after')
+    def _check_axfr(self):
+        if self.type == 'axfr' and not self.server:
+            raise ValueError("remote-state 'axfr' benötigt 'server'")
+        return self
+
+
+class ProjectConfig(BaseModel):
+    """Hetzner-Projekt mit eigenem Token und eigenem Anfrage-Budget."""
+    model_config = ConfigDict(extra='forbid', populate_by_name=True)
+    token_env: str = Field(alias='token-env')
+    api_base: str | None = Field(default=None, alias='api-base', pattern=r'^https://')
+    domains: list[str] = Field(default_factory=list)
+    rate: float | None = Field(default=None, gt=0)
+    burst: int = Field(default=10, ge=1)
 
 
 class GlobalConfig(BaseModel):
@@ -19,10 +66,14 @@ class GlobalConfig(BaseModel):
         alias='dns-api-base',
         pattern=r'^https://',
     )
+    backend: BackendConfig = Field(default_factory=BackendConfig)
+    remote_state: RemoteStateConfig = Field(default_factory=RemoteStateConfig, alias='remote-state')
+    domains_dir: str | None = Field(default=None, alias='domains-dir')
+    projects: dict[str, ProjectConfig] = Field(default_factory=dict)
 
 
 class DnsJinjaConfig(BaseModel):
     """Wurzel-Modell zur Validierung von config.json."""
     model_config = ConfigDict(extra='allow', populate_by_name=True)
     global_config: GlobalConfig = Field(alias='global')
-    domains: dict[str, DomainConfig]
+    domains: dict[str, DomainConfig] = Field(default_factory=dict)
@@ -2,17 +2,39 @@ from pathlib import Path
 import tempfile
 import click
 import sys
+from .report import load_report, merge_reports
 
 _POINTER_FILE = Path(tempfile.gettempdir()) / "dnsjinja.exit.ptr"
 
 
+def _exit_from_reports(report_files: tuple[str, ...]) -> None:
+    """Exit-Code aus einem oder mehreren Ergebnisberichten (z.B. aller Shards).
+
+    Fehlt ein Bericht, ist der Lauf nicht bis zum Ende gekommen: Exit-Code 1.
+    """
+    try:
+        merged = merge_reports(load_report(f) for f in report_files)
+    except (OSError, ValueError) as e:
+        print(f'Ergebnisbericht nicht lesbar: {e}', file=sys.stderr)
+        sys.exit(1)
+    sys.exit(int(merged['exit_code']))
+
+
 @click.command()
 @click.option(
     '--exit-file', envvar='DNSJINJA_EXIT_FILE', default='',
     help="Pfad zur Exit-Code-Datei (DNSJINJA_EXIT_FILE). "
          "Wird nicht angegeben, liest exit_on_error den Pfad aus der Pointer-Datei."
 )
-def run(exit_file):
+@click.option(
+    '--report', 'report_files', multiple=True, envvar='DNSJINJA_REPORT',
+    help="Ergebnisbericht(e) von dnsjinja --report (DNSJINJA_REPORT). "
+         "Mehrfach angebbar; hat Vorrang vor Exit-Code- und Pointer-Datei."
+)
+def run(exit_file, report_files):
+    if report_files:
+        _exit_from_reports(report_files)
+
     if exit_file:
         exit_code_file = Path(exit_file)
     elif _POINTER_FILE.exists():
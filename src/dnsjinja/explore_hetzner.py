@@ -1,12 +1,18 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
 import click
 import getpass
 import json
+import sys
 import hcloud
 from hcloud import Client
 from .myloadenv import load_env
+from .zone_cache import fetch_all_zones
 
 DEFAULT_API_BASE = "https://api.hetzner.cloud/v1"
 
+EXPORT_FORMATS = ('zonefile', 'rrsets')
+
 
 class ExploreHetzner:
 
@@ -19,7 +25,7 @@ class ExploreHetzner:
 
     def explore(self):
         try:
-            all_zones = self.client.zones.get_all()
+            all_zones = fetch_all_zones(self.client)
             for z in all_zones:
                 self.out['domains'][z.name] = {
                     'template': "",
@@ -32,15 +38,87 @@ class ExploreHetzner:
         except OSError as e:
             click.echo(f'Fehler beim Schreiben von {self.output}: {str(e)}', err=True)
 
+    def _export_zone(self, zone, export_dir: Path, fmt: str) -> Path:
+        if fmt == 'rrsets':
+            target = export_dir / f'{zone.name}.rrsets.json'
+            rrsets = [
+                {
+                    'name': r.name,
+                    'type': r.type,
+                    'ttl': r.ttl,
+                    'records': [rec.value for rec in (r.records or [])],
+                }
+                for r in self.client.zones.get_rrset_all(zone)
+            ]
+            target.write_text(json.dumps(rrsets, indent=2) + '\n', encoding='utf-8')
+        else:
+            target = export_dir / f'{zone.name}.zone'
+            target.write_text(self.client.zones.export_zonefile(zone).zonefile + '\n', encoding='utf-8')
+        return target
+
+    def export(self, export_dir: Path, workers: int = 8, fmt: str = 'zonefile') -> int:
+        """Exportiert alle Zonen parallel nach `export_dir`.
+
+        Die Zonenliste wird wie beim Upload mit fetch_all_zones() gelesen.
+        Höchstens 2 × `workers` Zonen sind gleichzeitig in Arbeit. Jede fertige
+        Zone wird sofort geschrieben und ihr Config-Eintrag ausgegeben, nur die
+        Zonenliste selbst wird vorgehalten.
+        Rückgabe ist die Anzahl fehlgeschlagener Zonen.
+        """
+        export_dir.mkdir(parents=True, exist_ok=True)
+        failed = 0
+        written = 0
+
+        def emit(name):
+            nonlocal written
+            sep = ',\n' if written else '\n'
+            self.output.write(f'{sep}    {json.dumps(name)}: {json.dumps({"template": ""})}')
+            self.output.flush()
+            written += 1
+
+        def collect(done):
+            nonlocal failed
+            for future in done:
+                zone = pending.pop(future)
+                try:
+                    future.result()
+                    emit(zone.name)
+                except (hcloud.APIException, OSError) as e:
+                    click.echo(f'Zone {zone.name} konnte nicht exportiert werden: {e}', err=True)
+                    failed += 1
+
+        self.output.write('{\n  "domains": {')
+        pending = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for zone in fetch_all_zones(self.client, workers):
+                    if len(pending) >= 2 * workers:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending[executor.submit(self._export_zone, zone, export_dir, fmt)] = zone
+            except hcloud.APIException as e:
+                click.echo(f'Fehler beim Abfragen der Zonen: {e}', err=True)
+                failed += 1
+            collect(wait(pending).done)
+        self.output.write('\n  }\n}\n' if written else '}\n}\n')
+        self.output.flush()
+        return failed
+
 
 @click.command()
 @click.option('-o', '--output', type=click.File('w'), default='-', help="Ausgabedatei für die Ergebnisse")
 @click.option('--auth-api-token', default="", envvar='DNSJINJA_AUTH_API_TOKEN', help="API-Token (Bearer) für Hetzner Cloud API (DNSJINJA_AUTH_API_TOKEN)")
 @click.option('--api-base', default="", envvar='DNSJINJA_API_BASE', help="Basis-URL der Hetzner Cloud API (DNSJINJA_API_BASE)")
-def run(output, auth_api_token, api_base):
+@click.option('--export-dir', type=click.Path(file_okay=False, path_type=Path), default=None, help="Alle Zonen parallel in dieses Verzeichnis exportieren")
+@click.option('--export-format', type=click.Choice(EXPORT_FORMATS), default='zonefile', show_default=True, help="Zone-File-Export oder RRSets als JSON")
+@click.option('--workers', type=click.IntRange(min=1), default=8, show_default=True, help="Anzahl gleichzeitiger Exporte")
+def run(output, auth_api_token, api_base, export_dir, export_format, workers):
     """Explore Hetzner DNS Zones (Cloud API)"""
     ex = ExploreHetzner(output, auth_api_token, api_base)
-    ex.explore()
+    if export_dir is None:
+        ex.explore()
+    elif ex.export(export_dir, workers, export_format):
+        sys.exit(1)
 
 
 def main():
@@ -0,0 +1,200 @@
+from pathlib import Path
+from typing import Any, NamedTuple
+import hashlib
+import ipaddress
+import json
+import os
+import threading
+from .backends import RRSetMap
+
+# Konfigurationsfelder, deren Wert einen Provider auswählt (include/<feld>/<feld>_<wert>.inc)
+PROVIDER_FIELDS = ('mail', 'www', 'xmpp')
+
+# Position des Zielnamens in den Records (Token-Index)
+_HOST_FIELD = {'CNAME': 0, 'DNAME': 0, 'NS': 0, 'PTR': 0, 'ALIAS': 0, 'ANAME': 0,
+               'MX': 1, 'SRV': 3, 'SVCB': 1, 'HTTPS': 1}
+
+_SPF_HOSTS = ('include:', 'redirect=', 'a:', 'mx:', 'exists:', 'ptr:')
+
+
+class ImpactMatch(NamedTuple):
+    domain: str
+    target: str                 # Schlüssel im Index (Host, IP/Netz, mail:<provider>, group:<name>)
+    name: str                   # RRSet, leer bei Verweisen aus der Konfiguration
+    rdtype: str
+
+
+def _host(value: str, domain: str) -> str:
+    if value.endswith('.'):
+        return value[:-1].lower()
+    if value == '@':
+        return domain.lower()
+    return f'{value}.{domain}'.lower()
+
+
+def _address(value: str) -> str | None:
+    """Normalisierte IP-Adresse oder Netz (ein Netz mit voller Präfixlänge als Adresse)."""
+    try:
+        network = ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        return None
+    if network.prefixlen == network.max_prefixlen:
+        return str(network.network_address)
+    return str(network)
+
+
+def _txt(record: str) -> str:
+    # "v=spf1 include:a" "ip4:b -all" → zusammenhängender Text
+    return ''.join(part for i, part in enumerate(record.split('"')) if i % 2)
+
+
+def record_targets(rdtype: str, record: str, domain: str) -> list[str]:
+    """Ziele, auf die ein Record verweist: Adressen und Hostnamen (absolut, ohne Punkt)."""
+    if rdtype in ('A', 'AAAA'):
+        address = _address(record)
+        return [address] if address else []
+    if rdtype in _HOST_FIELD:
+        tokens = record.split()
+        index = _HOST_FIELD[rdtype]
+        if len(tokens) <= index or tokens[index] == '.':
+            return []
+        return [_host(tokens[index], domain)]
+    if rdtype == 'CAA':
+        tokens = record.split(None, 2)
+        if len(tokens) == 3 and tokens[1] in ('issue', 'issuewild'):
+            issuer = tokens[2].strip('"').split(';')[0].strip()
+            return [issuer.lower()] if issuer else []
+        return []
+    if rdtype == 'TXT':
+        text = _txt(record)
+        if not text.startswith('v=spf1'):
+            return []
+        targets: list[str] = []
+        for term in text.split()[1:]:
+            term = term.lstrip('+-~?')
+            if term.startswith(('ip4:', 'ip6:')):
+                address = _address(term[4:])
+                if address:
+                    targets.append(address)
+            else:
+                for prefix in _SPF_HOSTS:
+                    if term.startswith(prefix) and '%' not in term:
+                        targets.append(term[len(prefix):].split('/')[0].rstrip('.').lower())
+        return targets
+    return []
+
+
+def zone_references(domain: str, rrsets: RRSetMap, variables: dict[str, Any]) -> dict[str, list[list[str]]]:
+    """Alle Verweise einer gerenderten Zone: {ziel: [[name, rdtype], ...]}.
+
+    Zusätzlich zu den Records zählen die gewählten Provider (`mail:<wert>`
+    usw.) und Gruppen (`group:<name>`) der Konfiguration.
+    """
+    refs: dict[str, list[list[str]]] = {}
+    for (name, rdtype), (_, records) in rrsets.items():
+        for record in records:
+            for target in record_targets(rdtype, record, domain):
+                entry = refs.setdefault(target, [])
+                if [name, rdtype] not in entry:
+                    entry.append([name, rdtype])
+    for field in PROVIDER_FIELDS:
+        value = variables.get(field)
+        if isinstance(value, str) and value:
+            refs.setdefault(f'{field}:{value}', [])
+    for group in variables.get('custom_groups') or []:
+        if isinstance(group, str):
+            refs.setdefault(f'group:{group}', [])
+    return refs
+
+
+def _matches(query: str, network: Any, target: str) -> bool:
+    if query == target:
+        return True
+    if query.startswith('*.'):
+        return target.endswith(query[1:])
+    if network is None or _address(target) is None:
+        return False
+    # Adresse im Netz bzw. überlappende Netze (SPF ip4:/ip6:)
+    found = ipaddress.ip_network(target, strict=False)
+    return network.version == found.version and network.overlaps(found)
+
+
+def normalize_query(query: str) -> str:
+    """Abfrage in der Schreibweise des Index (Adressen normalisiert, Hosts klein, ohne Punkt)."""
+    query = query.strip()
+    address = _address(query)
+    if address:
+        return address
+    prefix, sep, value = query.partition(':')
+    if sep and (prefix in PROVIDER_FIELDS or prefix == 'group'):
+        return query
+    return query.rstrip('.').lower()
+
+
+class ImpactIndex:
+    """Rückwärtsindex der gerenderten Zonen: welche Domains und RRSets auf
+    einen Host, eine Adresse, einen Provider oder eine Gruppe verweisen.
+
+    Beim Rendern wird der Eintrag jeder Domain ersetzt; save() schreibt nur
+    die Einträge dieses Laufs, so dass Shards und Teilläufe sich ergänzen.
+    """
+
+    def __init__(self, cache_dir: Path, config_file: Path) -> None:
+        key = hashlib.sha1(str(config_file.resolve()).encode('utf-8')).hexdigest()
+        self.path = cache_dir / 'impact' / f'{key}.json'
+        self._lock = threading.Lock()
+        self._changed: set[str] = set()
+        self.entries: dict[str, dict[str, list[list[str]]]] = self._read()
+
+    def _read(self) -> dict[str, dict[str, list[list[str]]]]:
+        try:
+            entries = json.loads(self.path.read_text(encoding='utf-8'))
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def update(self, domain: str, rrsets: RRSetMap, variables: dict[str, Any]) -> None:
+        refs = zone_references(domain, rrsets, variables)
+        with self._lock:
+            if self.entries.get(domain) != refs:
+                self.entries[domain] = refs
+                self._changed.add(domain)
+
+    def retain(self, domains: set[str]) -> None:
+        """Entfernt Domains, die nicht mehr konfiguriert sind."""
+        with self._lock:
+            for domain in self.entries.keys() - domains:
+                del self.entries[domain]
+                self._changed.add(domain)
+
+    def query(self, query: str) -> list[ImpactMatch]:
+        query = normalize_query(query)
+        network = ipaddress.ip_network(query, strict=False) if _address(query) else None
+        matches: list[ImpactMatch] = []
+        for domain in sorted(self.entries):
+            for target, rrsets in self.entries[domain].items():
+                if not _matches(query, network, target):
+                    continue
+                if not rrsets:
+                    matches.append(ImpactMatch(domain, target, '', ''))
+                matches.extend(ImpactMatch(domain, target, name, rdtype) for name, rdtype in rrsets)
+        return matches
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._changed:
+                return
+            entries = self._read()
+            for domain in self._changed:
+                if domain in self.entries:
+                    entries[domain] = self.entries[domain]
+                else:
+                    entries.pop(domain, None)
+            self._changed.clear()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+            tmp.write_text(json.dumps(entries), encoding='utf-8')
+            tmp.replace(self.path)
+        except OSError:
+            pass                  # der Index wird beim nächsten Rendern erneut geschrieben
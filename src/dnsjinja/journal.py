@@ -0,0 +1,107 @@
+from pathlib import Path
+from typing import Any, NamedTuple, TextIO
+import hashlib
+import json
+import os
+import threading
+from .backends import RRSetChange
+from .locks import hold_lock, release_lock
+
+JOURNAL_VERSION = 1
+
+
+class PendingZone(NamedTuple):
+    """Eine Zone, deren Upload begonnen, aber nicht abgeschlossen wurde."""
+    serial: str
+    changes: list[RRSetChange]      # noch nicht bestätigte Änderungen (ohne Handles)
+
+
+class JournalState(NamedTuple):
+    done: set[str]
+    pending: dict[str, PendingZone]
+
+
+def journal_path(cache_dir: Path, config_file: Path, shard: Any = None) -> Path:
+    """Ein Journal je Konfigurationsdatei und Shard."""
+    key = hashlib.sha1(f'{config_file.resolve()}|{shard or ""}'.encode('utf-8')).hexdigest()
+    return cache_dir / 'journal' / f'{key}.jsonl'
+
+
+def _change_to_json(ch: RRSetChange) -> list[Any]:
+    return [ch.action, ch.name, ch.rdtype, ch.ttl, ch.records]
+
+
+def load_journal(path: Path) -> JournalState:
+    """Liest das Journal eines abgebrochenen Laufs.
+
+    Eine unvollständige letzte Zeile (Abbruch beim Schreiben) wird ignoriert.
+    Für jede Domain zählt der letzte Plan und die danach bestätigten Änderungen.
+    """
+    done: set[str] = set()
+    plans: dict[str, tuple[str, list[RRSetChange]]] = {}
+    applied: dict[str, set[int]] = {}
+    with path.open(encoding='utf-8') as fh:
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            event, domain = entry.get('event'), entry.get('domain')
+            if event == 'plan':
+                plans[domain] = (entry['serial'], [RRSetChange(*c) for c in entry['changes']])
+                applied[domain] = set()
+                done.discard(domain)
+            elif event == 'applied' and domain in applied:
+                applied[domain].add(entry['index'])
+            elif event == 'done':
+                done.add(domain)
+    pending = {
+        domain: PendingZone(serial, [ch for i, ch in enumerate(changes) if i not in applied[domain]])
+        for domain, (serial, changes) in plans.items() if domain not in done
+    }
+    return JournalState(done, pending)
+
+
+class UploadJournal:
+    """Fortlaufendes Protokoll (JSON Lines) der Uploads eines Laufs.
+
+    Je Domain wird der Plan (Serial und Änderungen), jede angekommene
+    Änderung und der Abschluss angehängt, so dass `--resume` nach einem
+    Abbruch nur die verbleibende Arbeit erledigt.
+    """
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Ein zweiter Lauf mit demselben Journal würde es leeren (FileInUse)
+        self._lock_fh = hold_lock(path.with_name(path.name + '.lock'))
+        try:
+            self._fh: TextIO = path.open('a' if resume else 'w', encoding='utf-8')
+        except OSError:
+            release_lock(self._lock_fh)
+            raise
+        self._lock = threading.Lock()      # Projekte laden gleichzeitig hoch
+        self._write({'event': 'start', 'version': JOURNAL_VERSION, 'pid': os.getpid(), 'resume': resume})
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        # Jede Zeile sofort ausschreiben: ein abgebrochener Prozess verliert nichts
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+
+    def plan(self, domain: str, serial: str, changes: list[RRSetChange]) -> None:
+        self._write({'event': 'plan', 'domain': domain, 'serial': serial,
+                     'changes': [_change_to_json(ch) for ch in changes]})
+
+    def applied(self, domain: str, index: int) -> None:
+        self._write({'event': 'applied', 'domain': domain, 'index': index})
+
+    def done(self, domain: str) -> None:
+        self._write({'event': 'done', 'domain': domain})
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        self._fh.close()
+        release_lock(self._lock_fh)
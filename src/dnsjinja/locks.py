@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, TextIO
+import os
+import sys
+import tempfile
+import time
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+DEFAULT_LOCK_DIR = Path(tempfile.gettempdir()) / 'dnsjinja-locks'
+
+
+class ZoneLockTimeout(Exception):
+    """Die Zone wird von einem anderen Lauf bearbeitet."""
+    pass
+
+
+class FileInUse(Exception):
+    """Die Datei wird von einem anderen Lauf verwendet."""
+
+    def __init__(self, path: Path, holder: str) -> None:
+        super().__init__(f'{path} wird von einem anderen Lauf verwendet (PID {holder})')
+        self.path = path
+        self.holder = holder
+
+
+def _try_lock(fh) -> bool:
+    try:
+        if sys.platform == 'win32':
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fh) -> None:
+    if sys.platform == 'win32':
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _holder(fh) -> str:
+    """PID des Laufs, der die Sperre hält (laut Lock-Datei)."""
+    try:
+        fh.seek(0)
+        return fh.read().strip() or 'unbekannt'
+    except OSError:
+        return 'unbekannt'
+
+
+def _claim(fh) -> None:
+    fh.seek(0)
+    fh.truncate()
+    fh.write(str(os.getpid()))
+    fh.flush()
+
+
+@contextmanager
+def zone_lock(lock_dir: str | Path, zone: str, timeout: float = 0.0) -> Iterator[None]:
+    """Exklusive, prozessübergreifende Sperre für eine Zone (advisory lock).
+
+    Wartet bis zu `timeout` Sekunden auf die Sperre und wirft sonst
+    ZoneLockTimeout. Die Sperre endet spätestens mit dem Prozess, verwaiste
+    Lock-Dateien blockieren daher nicht.
+    """
+    lock_dir = Path(lock_dir)
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    with open(lock_dir / f'{zone}.lock', 'a+', encoding='utf-8') as fh:
+        while not _try_lock(fh):
+            if time.monotonic() >= deadline:
+                raise ZoneLockTimeout(f'{zone} ist durch einen anderen Lauf gesperrt (PID {_holder(fh)})')
+            time.sleep(0.1)
+        try:
+            _claim(fh)
+            yield
+        finally:
+            _unlock(fh)
+
+
+def hold_lock(path: Path) -> TextIO:
+    """Sperrt `path` ohne zu warten für diesen Lauf, bis release_lock() oder zum Prozessende.
+
+    Wirft FileInUse, wenn ein anderer Lauf die Sperre hält.
+    """
+    fh = open(path, 'a+', encoding='utf-8')
+    if not _try_lock(fh):
+        holder = _holder(fh)
+        fh.close()
+        raise FileInUse(path, holder)
+    _claim(fh)
+    return fh
+
+
+def release_lock(fh: TextIO) -> None:
+    try:
+        _unlock(fh)
+    finally:
+        fh.close()
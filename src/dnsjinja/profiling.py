@@ -0,0 +1,121 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, NamedTuple
+import cProfile
+import json
+import time
+import tracemalloc
+from jinja2 import Environment
+
+
+class DomainProfile(NamedTuple):
+    """Messwerte für das Rendern einer Domain."""
+    domain: str
+    template: str
+    seconds: float
+    includes: int           # nachgeladene Templates (include/import/extends)
+    hostname_calls: int     # Aufrufe des Filters `hostname` (DNS-Abfrage)
+    peak_bytes: int         # tracemalloc-Spitze während des Renderns
+
+
+class Profiler:
+    """Profiling eines Laufs für --profile.
+
+    Je Phase (render, backup, write, upload, verify) wird eine cProfile-Datei
+    `<phase>.prof` geschrieben (auswertbar mit `python -m pstats` oder
+    snakeviz). Für jede Domain werden Renderzeit, Anzahl nachgeladener
+    Templates, `hostname`-Aufrufe und Speicherspitze erfasst.
+    """
+
+    def __init__(self, out_dir: str | Path, top: int = 10) -> None:
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.top = top
+        self.phases: dict[str, float] = {}
+        self.domains: list[DomainProfile] = []
+        self._includes = 0
+        self._hostname_calls = 0
+
+    def instrument(self, env: Environment) -> None:
+        """Zählt nachgeladene Templates und `hostname`-Aufrufe von `env`.
+
+        Muss vor dem ersten Rendern aufgerufen werden, da kompilierte
+        Templates die Filter-Funktion festhalten.
+        """
+        get_template = env.get_template
+        hostname = env.filters['hostname']
+
+        def counting_get_template(name, parent=None, globals=None):
+            if parent is not None:
+                self._includes += 1
+            return get_template(name, parent, globals)
+
+        def counting_hostname(value):
+            self._hostname_calls += 1
+            return hostname(value)
+
+        env.get_template = counting_get_template
+        env.filters['hostname'] = counting_hostname
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+            profile.dump_stats(str(self.out_dir / f'{name}.prof'))
+
+    @contextmanager
+    def domain(self, domain: str, template: str) -> Iterator[None]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        self._includes = self._hostname_calls = 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            self.domains.append(DomainProfile(domain, template, seconds, self._includes,
+                                              self._hostname_calls, max(0, peak - base)))
+
+    def templates(self) -> list[tuple[str, float, int]]:
+        """(template, Sekunden gesamt, Anzahl Domains), langsamste zuerst."""
+        totals: dict[str, list] = {}
+        for p in self.domains:
+            entry = totals.setdefault(p.template, [0.0, 0])
+            entry[0] += p.seconds
+            entry[1] += 1
+        return sorted(((t, s, n) for t, (s, n) in totals.items()), key=lambda x: -x[1])
+
+    def summary(self) -> list[str]:
+        lines = ['Profil (Phasen): ' + ', '.join(f'{n} {s:.2f} s' for n, s in self.phases.items())]
+        if self.domains:
+            lines.append(f'Langsamste Domains (Top {self.top}):')
+            for p in sorted(self.domains, key=lambda p: -p.seconds)[:self.top]:
+                lines.append(f'  {p.domain}: {p.seconds * 1000:.1f} ms, {p.template}, '
+                             f'{p.includes} Includes, {p.hostname_calls} hostname-Aufrufe, '
+                             f'{p.peak_bytes / 1024:.0f} KiB')
+            lines.append(f'Langsamste Templates (Top {self.top}):')
+            for template, seconds, count in self.templates()[:self.top]:
+                lines.append(f'  {template}: {seconds * 1000:.1f} ms für {count} Domain(s)')
+        lines.append(f'Profildaten in {self.out_dir}')
+        return lines
+
+    def write(self) -> None:
+        """Schreibt Phasen und Domain-Messwerte nach `profile.json`."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        data = {
+            'phases': {n: round(s, 4) for n, s in self.phases.items()},
+            'domains': [p._asdict() for p in sorted(self.domains, key=lambda p: -p.seconds)],
+            'templates': [{'template': t, 'seconds': round(s, 4), 'domains': n}
+                          for t, s, n in self.templates()],
+        }
+        (self.out_dir / 'profile.json').write_text(json.dumps(data, indent=2) + '\n', encoding='utf-8')
@@ -0,0 +1,132 @@
+from typing import Any, Callable, NamedTuple
+import threading
+import time
+import hcloud
+
+
+def hcloud_base(client) -> Any:
+    """`client._client` (hcloud.ClientBase), über das alle Resource-Clients senden.
+
+    hcloud bietet keine öffentliche Stelle, um jede Anfrage zu begleiten; die
+    internen Attribute sind mit der in pyproject.toml festgelegten
+    Versionsspanne getestet. Fehlen sie, wird klar gemeldet statt später
+    mit einem AttributeError abgebrochen.
+    """
+    base = getattr(client, '_client', None)
+    if not callable(getattr(base, 'request', None)):
+        raise RuntimeError(f'hcloud {hcloud.__version__} wird nicht unterstützt: Client._client.request fehlt')
+    return base
+
+
+class TokenBucket:
+    """Anfrage-Budget: im Mittel `rate` Anfragen je Sekunde, kurzzeitig bis zu `burst`."""
+
+    def __init__(self, rate: float, burst: int = 10) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0           # Summe der Wartezeiten in Sekunden
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+        if wait:
+            # Das Token ist bereits reserviert; nachfolgende Aufrufer warten entsprechend länger
+            time.sleep(wait)
+
+    def wait_for(self, calls: int) -> float:
+        """Sekunden, die `calls` weitere Anfragen mindestens auf Zuteilung warten."""
+        return max(0.0, (calls - self.burst) / self.rate)
+
+
+class RateLimitStatus:
+    """Zahl der Anfragen eines Clients und das zuletzt gemeldete Rate-Limit (Header RateLimit-*)."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self._lock = threading.Lock()
+
+    def observe(self, headers: Any) -> None:
+        with self._lock:
+            self.calls += 1
+            try:
+                if 'RateLimit-Limit' in headers:
+                    self.limit = int(headers['RateLimit-Limit'])
+                if 'RateLimit-Remaining' in headers:
+                    self.remaining = int(headers['RateLimit-Remaining'])
+            except ValueError:
+                pass
+
+    def wait_for(self, calls: int) -> float:
+        """Sekunden, bis das Limit `calls` weitere Anfragen zulässt (0 ohne Angaben der API).
+
+        Hetzner füllt das Stundenlimit stetig auf, bei 3600 Anfragen eine je Sekunde.
+        """
+        if self.remaining is None or calls <= self.remaining:
+            return 0.0
+        return (calls - self.remaining) * 3600 / (self.limit or 3600)
+
+
+def track_rate_limit(client, status: RateLimitStatus) -> None:
+    """Meldet jede Antwort eines hcloud.Client an `status`, auch wiederholte Anfragen.
+
+    Über einen Hook der requests-Session, da `request()` nur den JSON-Inhalt liefert.
+    """
+    try:
+        hooks = hcloud_base(client)._session.hooks['response']
+    except (AttributeError, KeyError, TypeError):
+        raise RuntimeError(f'hcloud {hcloud.__version__} wird nicht unterstützt: Client._client._session fehlt')
+    hooks.append(lambda response, *args, **kwargs: status.observe(response.headers))
+
+
+class CallEstimate(NamedTuple):
+    """Geschätzte API-Anfragen für den Upload einer Domain."""
+    domain: str
+    reads: int                  # Abruf des aktuellen Stands
+    writes: int                 # Schreibanfragen
+    exact: bool                 # aus dem zuletzt hochgeladenen Stand geplant, sonst je RRSet eine Anfrage
+
+    @property
+    def calls(self) -> int:
+        return self.reads + self.writes
+
+
+def within_budget(estimates: list[CallEstimate], budget: int,
+                  priority: Callable[[str], int]) -> tuple[list[str], list[str]]:
+    """Teilt die Domains in (hochladen, zurückstellen): nach Priorität, höchste zuerst,
+    bei gleicher Priorität in der gegebenen Reihenfolge, solange die Anfragen in `budget` passen.
+    """
+    selected: list[str] = []
+    deferred: list[str] = []
+    used = 0
+    for estimate in sorted(estimates, key=lambda e: -priority(e.domain)):
+        if not deferred and used + estimate.calls <= budget:
+            selected.append(estimate.domain)
+            used += estimate.calls
+        else:
+            deferred.append(estimate.domain)
+    return selected, deferred
+
+
+def limit_client(client, bucket: TokenBucket) -> None:
+    """Lässt jede Anfrage eines hcloud.Client erst nach Zuteilung aus `bucket` zu.
+
+    Alle Resource-Clients (zones, ...) senden über `client._client.request`.
+    """
+    base = hcloud_base(client)
+    request = base.request
+
+    def limited_request(*args, **kwargs):
+        bucket.acquire()
+        return request(*args, **kwargs)
+
+    base.request = limited_request
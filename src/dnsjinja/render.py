@@ -0,0 +1,252 @@
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from socket import gethostbyname
+from typing import Any, Iterable, Iterator, NamedTuple
+import json
+import os
+from jinja2 import Environment, FileSystemLoader, Template, meta, nodes
+from jinja2.runtime import Context
+import dns.exception
+from .backends import RRSetMap, text_to_rrsets
+
+
+class RenderJob(NamedTuple):
+    """Eingabe für das Rendern einer Domain im Worker-Prozess."""
+    domain: str
+    template: str
+    soa_serial: str
+    variables: dict[str, Any]
+
+
+class RenderResult(NamedTuple):
+    """Ergebnis eines Workers in kompakter Form (keine dnspython-Zone).
+
+    `error` ist ein Render-Fehler (Template), `syntax_error` ein Fehler beim
+    Parsen des gerenderten Zone-Files. `rrsets` ist nur ohne Fehler gesetzt.
+    """
+    domain: str
+    text: str
+    rrsets: RRSetMap | None
+    error: str | None = None
+    syntax_error: str | None = None
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+# Platzhalter für die Domain in zwischengespeicherten Fragmenten
+_ORIGIN = '\x00origin\x00'
+
+
+def _origin_only(node: nodes.Node, parent: nodes.Node | None = None) -> bool:
+    """True, wenn `domain` nur unverändert ausgegeben wird ({{ domain }})."""
+    if isinstance(node, nodes.Name) and node.name == 'domain':
+        return node.ctx == 'load' and isinstance(parent, nodes.Output)
+    return all(_origin_only(child, node) for child in node.iter_child_nodes())
+
+
+class _FragmentInfo(NamedTuple):
+    reads: frozenset[str]       # gelesene Variablen, einschließlich statischer Includes
+    origin_only: bool           # Domain kann nachträglich eingesetzt werden
+
+
+class FragmentCache:
+    """Zwischenspeicher für gerenderte Include-Fragmente.
+
+    Schlüssel sind der Template-Name und die Werte aller Variablen, die das
+    Fragment (samt statisch eingebundener Templates) liest. Gibt ein Fragment
+    `domain` nur unverändert aus, wird es ohne Domain gespeichert und die
+    Domain beim Abruf eingesetzt – so teilen sich alle Domains mit gleichen
+    Einstellungen ein Fragment. Fragmente mit dynamischen Includes werden
+    nicht gespeichert (ihre eingebundenen Templates aber schon), ebenso
+    wenig Templates mit Blöcken oder `extends`: Ein Eltern-Template wird
+    mit den Blöcken des erbenden Templates gerendert, die nicht zum
+    Schlüssel gehören.
+    """
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._info: dict[str, _FragmentInfo | None] = {}
+
+    def info(self, env: Environment, name: str) -> _FragmentInfo | None:
+        if name not in self._info:
+            self._info[name] = None          # schützt vor zyklischen Includes
+            self._info[name] = self._analyse(env, name)
+        return self._info[name]
+
+    def _analyse(self, env: Environment, name: str) -> _FragmentInfo | None:
+        source, _, _ = env.loader.get_source(env, name)
+        ast = env.parse(source)
+        if ast.find(nodes.Extends) is not None or ast.find(nodes.Block) is not None:
+            return None
+        reads = set(meta.find_undeclared_variables(ast))
+        origin_only = _origin_only(ast)
+        for ref in meta.find_referenced_templates(ast):
+            child = self.info(env, ref) if ref is not None else None
+            if child is None:
+                return None
+            reads |= child.reads
+            origin_only = origin_only and child.origin_only
+        return _FragmentInfo(frozenset(reads), origin_only)
+
+    def render(self, template: Template, info: _FragmentInfo, context: Context) -> str:
+        domain = context.resolve_or_missing('domain')
+        substitute = info.origin_only and isinstance(domain, str)
+        values = {v: context.resolve_or_missing(v) for v in sorted(info.reads)
+                  if not (substitute and v == 'domain')}
+        key = (template.name, json.dumps(values, sort_keys=True, default=repr))
+        text = self.entries.get(key)
+        if text is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+            if substitute:
+                context = template.new_context(dict(context.get_all(), domain=_ORIGIN), shared=True)
+            text = ''.join(template.root_render_func(context))
+            self.entries[key] = text
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return text.replace(_ORIGIN, domain) if substitute else text
+
+
+class _CachedFragment:
+    """Stellvertreter für ein eingebundenes Template, rendert über den FragmentCache."""
+
+    def __init__(self, template: Template, cache: FragmentCache, info: _FragmentInfo) -> None:
+        self._template = template
+        self._cache = cache
+        self._info = info
+
+    def root_render_func(self, context: Context) -> Iterator[str]:
+        yield self._cache.render(self._template, self._info, context)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._template, name)
+
+
+class CachingEnvironment(Environment):
+    """Environment, dessen Includes über `fragment_cache` gerendert werden."""
+
+    fragment_cache: FragmentCache | None = None
+
+    def get_template(self, name, parent=None, globals=None):
+        template = super().get_template(name, parent, globals)
+        if parent is None or self.fragment_cache is None:
+            return template
+        info = self.fragment_cache.info(self, template.name)
+        if info is None:
+            return template
+        return _CachedFragment(template, self.fragment_cache, info)
+
+
+def make_environment(templates_dir: str | Path, fragment_cache: bool = True) -> Environment:
+    env = CachingEnvironment(
+        loader=FileSystemLoader(templates_dir),
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+    env.filters['hostname'] = gethostbyname
+    if fragment_cache:
+        env.fragment_cache = FragmentCache()
+    return env
+
+
+def render_zone(env: Environment, job: RenderJob) -> str:
+    return env.get_template(job.template).render(
+        domain=job.domain, soa_serial=job.soa_serial, **job.variables
+    )
+
+
+def parse_zone(text: str, domain: str) -> RRSetMap:
+    return text_to_rrsets(text, domain)
+
+
+def render_error(e: Exception) -> str:
+    """Meldung zu einem Render-Fehler, gleich im Hauptprozess und im Worker."""
+    return f'{type(e).__name__}: {e}'
+
+
+def render_job(env: Environment, job: RenderJob, parse: bool = True) -> RenderResult:
+    """Rendert `job` und parst das Ergebnis (mit `parse`); Fehler stehen im Ergebnis.
+
+    Nur Fehler von dnspython gelten als Syntaxfehler des Zone-Files, alle
+    anderen als Render-Fehler.
+    """
+    try:
+        text = render_zone(env, job)
+        if not parse:
+            return RenderResult(job.domain, text, None)
+        try:
+            return RenderResult(job.domain, text, parse_zone(text, job.domain))
+        except dns.exception.DNSException as e:
+            return RenderResult(job.domain, text, None, syntax_error=str(e))
+    except Exception as e:
+        return RenderResult(job.domain, '', None, error=render_error(e))
+
+
+# Je Worker-Prozess einmalig angelegt (siehe _init_worker), damit kompilierte
+# Templates über alle Domains des Workers hinweg wiederverwendet werden.
+_worker_env: Environment | None = None
+
+
+def _init_worker(templates_dir: str, fragment_cache: bool = True) -> None:
+    global _worker_env
+    _worker_env = make_environment(templates_dir, fragment_cache)
+
+
+def _render_job(job: RenderJob) -> RenderResult:
+    cache = _worker_env.fragment_cache
+    if cache is None:
+        return render_job(_worker_env, job)
+    hits, misses = cache.hits, cache.misses
+    result = render_job(_worker_env, job)
+    return result._replace(cache_hits=cache.hits - hits, cache_misses=cache.misses - misses)
+
+
+def _render_batch(jobs: list[RenderJob]) -> list[RenderResult]:
+    return [_render_job(job) for job in jobs]
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def render_parallel(templates_dir: str | Path, jobs: list[RenderJob],
+                    workers: int, fragment_cache: bool = True) -> list[RenderResult]:
+    """Rendert, parst und validiert `jobs` in einem Prozess-Pool.
+
+    Die Ergebnisse werden in der Reihenfolge von `jobs` zurückgegeben,
+    unabhängig davon, welcher Worker wann fertig wird.
+    """
+    if not jobs:
+        return []
+    workers = max(1, min(workers, len(jobs)))
+    chunksize = max(1, len(jobs) // (workers * 4))
+    return list(render_stream(templates_dir, jobs, workers, chunksize, fragment_cache))
+
+
+def render_stream(templates_dir: str | Path, jobs: Iterable[RenderJob], workers: int,
+                  chunksize: int = 1, fragment_cache: bool = True) -> Iterator[RenderResult]:
+    """Wie render_parallel, aber als Generator mit begrenztem Speicherbedarf.
+
+    `jobs` wird erst bei Bedarf gelesen; höchstens 2 × `workers` Pakete zu
+    `chunksize` Domains sind gleichzeitig in Arbeit oder warten auf Abholung.
+    """
+    jobs = iter(jobs)
+    pending: deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(templates_dir), fragment_cache)) as executor:
+        while True:
+            while len(pending) < 2 * workers:
+                batch = list(islice(jobs, chunksize))
+                if not batch:
+                    break
+                pending.append(executor.submit(_render_batch, batch))
+            if not pending:
+                return
+            yield from pending.popleft().result()
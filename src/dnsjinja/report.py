@@ -0,0 +1,124 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple
+import hashlib
+import json
+import os
+
+REPORT_VERSION = 1
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class Shard(NamedTuple):
+    """Anteil `index` (1..count) einer auf `count` Läufe verteilten Ausführung."""
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, text: str) -> 'Shard':
+        try:
+            index, count = (int(p) for p in text.split('/'))
+        except ValueError:
+            raise ValueError(f'Ungültige Shard-Angabe {text!r}, erwartet i/N') from None
+        if not 1 <= index <= count:
+            raise ValueError(f'Ungültige Shard-Angabe {text!r}, erwartet 1 <= i <= N')
+        return cls(index, count)
+
+    def __str__(self) -> str:
+        return f'{self.index}/{self.count}'
+
+    def contains(self, domain: str) -> bool:
+        """Stabile Zuordnung über SHA-256 des Domain-Namens (unabhängig von Reihenfolge und Hash-Seed)."""
+        digest = hashlib.sha256(domain.lower().rstrip('.').encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') % self.count == self.index - 1
+
+
+class RunReport:
+    """Strukturierter Ergebnisbericht eines Laufs.
+
+    Je Domain und Phase (backup, write, upload, verify, ...) wird ein Status
+    ('ok', 'failed', 'skipped') mit optionaler Meldung festgehalten. Berichte
+    mehrerer Shards lassen sich mit merge_reports() zusammenführen.
+    """
+
+    def __init__(self, shard: Shard | None = None) -> None:
+        self.shard = shard
+        self.started = _now()
+        self.finished: str | None = None
+        self.exit_code = 0
+        self.domains: dict[str, dict[str, dict[str, Any]]] = {}
+        self.missing: list[str] = []         # konfiguriert, aber beim Backend nicht vorhanden
+        self.unconfigured: list[str] = []    # beim Backend vorhanden, aber nicht konfiguriert
+
+    def record(self, domain: str, phase: str, status: str, message: str = '', **extra: Any) -> None:
+        entry: dict[str, Any] = {'status': status}
+        if message:
+            entry['message'] = message
+        entry.update(extra)
+        self.domains.setdefault(domain, {})[phase] = entry
+
+    def update(self, domain: str, phase: str, **extra: Any) -> None:
+        """Ergänzt den Eintrag einer Domain und Phase um weitere Angaben."""
+        self.domains.setdefault(domain, {}).setdefault(phase, {'status': 'ok'}).update(extra)
+
+    def failed_domains(self) -> list[str]:
+        return sorted(d for d, phases in self.domains.items()
+                      if any(p['status'] == 'failed' for p in phases.values()))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'version': REPORT_VERSION,
+            'shards': [str(self.shard)] if self.shard else [],
+            'started': self.started,
+            'finished': self.finished,
+            'pid': os.getpid(),
+            'exit_code': self.exit_code,
+            'domains': {d: self.domains[d] for d in sorted(self.domains)},
+            'missing': sorted(self.missing),
+            'unconfigured': sorted(self.unconfigured),
+        }
+
+    def write(self, path: str | Path) -> None:
+        """Schreibt den Bericht atomar (temporäre Datei + rename)."""
+        self.finished = _now()
+        path = Path(path)
+        tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(self.to_dict(), indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        tmp.replace(path)
+
+
+def load_report(path: str | Path) -> dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+
+def merge_reports(reports: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Führt Berichte mehrerer Läufe (z.B. Shards) zu einem zusammen.
+
+    Domains dürfen nur in einem Bericht vorkommen. Exit-Code ist der erste
+    von 0 verschiedene.
+    """
+    merged: dict[str, Any] = {
+        'version': REPORT_VERSION, 'shards': [], 'started': None, 'finished': None,
+        'exit_code': 0, 'domains': {}, 'missing': [], 'unconfigured': [],
+    }
+    for report in reports:
+        merged['shards'].extend(report.get('shards', []))
+        for key, pick in (('started', min), ('finished', max)):
+            values = [v for v in (merged[key], report.get(key)) if v]
+            merged[key] = pick(values) if values else None
+        if not merged['exit_code']:
+            merged['exit_code'] = report.get('exit_code', 0)
+        for domain, phases in report.get('domains', {}).items():
+            if domain in merged['domains']:
+                raise ValueError(f'{domain} ist in mehreren Berichten enthalten')
+            merged['domains'][domain] = phases
+        merged['missing'].extend(report.get('missing', []))
+        merged['unconfigured'].extend(report.get('unconfigured', []))
+    merged['shards'].sort()
+    merged['domains'] = {d: merged['domains'][d] for d in sorted(merged['domains'])}
+    merged['missing'] = sorted(set(merged['missing']))
+    merged['unconfigured'] = sorted(set(merged['unconfigured']))
+    return merged
@@ -0,0 +1,156 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+import heapq
+import itertools
+import random
+import threading
+import time
+import hcloud
+import requests
+import dns.exception
+from .backends import BackendError
+from .deadline import Deadline
+from .locks import ZoneLockTimeout
+
+# Längste Wartezeit vor einem weiteren Versuch in Sekunden
+RETRY_MAX_DELAY = 60.0
+
+# hcloud-Fehlercodes, die bei einem späteren Versuch verschwinden können
+TRANSIENT_CODES = frozenset({
+    'rate_limit_exceeded', 'conflict', 'locked', 'timeout', 'bad_gateway',
+    'unavailable', 'server_error', 'maintenance',
+})
+
+
+def is_transient(error: BaseException) -> bool:
+    """Vorübergehender Fehler (Rate-Limit, 5xx, Zeitüberschreitung, Verbindung, gesperrte Zone)?"""
+    if isinstance(error, hcloud.APIException):
+        if isinstance(error.code, int):
+            return error.code in (408, 429) or error.code >= 500
+        return error.code in TRANSIENT_CODES
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ZoneLockTimeout)):
+        return True
+    if isinstance(error, BackendError):
+        # Netzwerkfehler und Zeitüberschreitungen, nicht aber abgelehnte Anfragen
+        return isinstance(error.__cause__, (OSError, dns.exception.Timeout))
+    return False
+
+
+def backoff_delay(attempt: int, base: float, cap: float = RETRY_MAX_DELAY,
+                  rng: random.Random | None = None) -> float:
+    """Wartezeit vor dem Versuch nach `attempt` (1, 2, ...): zufällig zwischen 0 und base · 2^(attempt-1), höchstens `cap`."""
+    return (rng or random).uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class RetryQueue:
+    """Wiederholt Domains, deren Bearbeitung vorübergehend fehlgeschlagen ist.
+
+    Die Wartezeit wächst je Versuch exponentiell und wird zufällig gestreut
+    (Full Jitter), damit nach einer Störung nicht alle Domains gleichzeitig
+    erneut anfragen. Die Versuche laufen in eigenen Threads, während die
+    Phase mit den übrigen Domains weitergeht; join() wartet auf alle.
+
+    Die Versuche kommen zu denen von hcloud hinzu: Jede Anfrage wird dort
+    bei Rate-Limit, 502/504, `conflict` und Zeitüberschreitung bereits bis
+    zu 5 Mal wiederholt (Wartezeit bis 60 s). Im ungünstigsten Fall stellt
+    ein Versuch hier also bis zu 6 Anfragen je API-Aufruf der Domain.
+    """
+
+    def __init__(self, errors: tuple[type[BaseException], ...], attempts: int = 3, base: float = 2.0,
+                 cap: float = RETRY_MAX_DELAY, deadline: Deadline | None = None, workers: int = 4,
+                 on_retry: Callable[[str, BaseException, int, float], None] | None = None) -> None:
+        self.errors = errors
+        self.attempts = max(1, attempts)        # Versuche insgesamt, einschließlich des ersten
+        self.base = base
+        self.cap = cap
+        self.deadline = deadline
+        self.workers = workers
+        self.on_retry = on_retry                # (domain, fehler, nächster versuch, wartezeit)
+        self._due: list[tuple[float, int, Callable[[], None]]] = []
+        self._ids = itertools.count()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._executor: ThreadPoolExecutor | None = None
+        self._scheduler: threading.Thread | None = None
+        self._scheduling = False                # _schedule_loop läuft
+        self._futures: list[Future] = []
+
+    def run(self, domain: str, fn: Callable[[str], None],
+            on_done: Callable[[str, BaseException | None, int], None], attempt: int = 1) -> None:
+        """Ruft fn(domain) auf; bei vorübergehendem Fehler folgt später ein weiterer Versuch.
+
+        on_done(domain, fehler, versuche) meldet das endgültige Ergebnis
+        (fehler None bei Erfolg). Andere als die in `errors` genannten
+        Ausnahmen werden nicht abgefangen.
+        """
+        try:
+            fn(domain)
+        except self.errors as e:
+            if attempt < self.attempts and is_transient(e) and self._schedule(domain, fn, on_done, attempt, e):
+                return
+            on_done(domain, e, attempt)
+            return
+        on_done(domain, None, attempt)
+
+    def _schedule(self, domain: str, fn: Callable[[str], None],
+                  on_done: Callable[[str, BaseException | None, int], None], attempt: int,
+                  error: BaseException) -> bool:
+        delay = backoff_delay(attempt, self.base, self.cap)
+        if self.deadline is not None:
+            remaining = self.deadline.remaining()
+            if remaining is not None and remaining <= delay:
+                return False            # innerhalb der Frist kein weiterer Versuch möglich
+        if self.on_retry is not None:
+            self.on_retry(domain, error, attempt + 1, delay)
+        with self._cond:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='dnsjinja-retry')
+            if not self._scheduling:
+                # Der vorige Scheduler endet, sobald nichts mehr aussteht
+                self._scheduling = True
+                self._scheduler = threading.Thread(target=self._schedule_loop, name='dnsjinja-retry', daemon=True)
+                self._scheduler.start()
+            self._pending += 1
+            heapq.heappush(self._due, (time.monotonic() + delay, next(self._ids),
+                                       lambda: self.run(domain, fn, on_done, attempt + 1)))
+            self._cond.notify_all()
+        return True
+
+    def _schedule_loop(self) -> None:
+        with self._cond:
+            while True:
+                if not self._due:
+                    if self._pending == 0:
+                        self._scheduling = False
+                        return
+                    self._cond.wait()
+                    continue
+                wait = self._due[0][0] - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                _, _, job = heapq.heappop(self._due)
+                self._futures.append(self._executor.submit(self._attempt, job))
+
+    def _attempt(self, job: Callable[[], None]) -> None:
+        try:
+            job()
+        finally:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify_all()
+
+    def join(self) -> None:
+        """Wartet, bis alle Domains erfolgreich oder endgültig fehlgeschlagen sind."""
+        with self._cond:
+            while self._pending:
+                self._cond.wait()
+            executor, self._executor = self._executor, None
+            self._cond.notify_all()
+        if executor is None:
+            return
+        executor.shutdown()
+        self._scheduler.join()
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()             # unerwartete Ausnahmen aus den Versuchen
@@ -0,0 +1,84 @@
+from pathlib import Path
+from typing import Callable
+import hashlib
+import json
+import os
+import threading
+
+# Annahme ohne jede Messung einer Phase: Sekunden je RRSet
+DEFAULT_SECONDS_PER_RRSET = 0.01
+
+
+class DurationHistory:
+    """Dauer je Domain und Phase (backup, upload, ...) aus früheren Läufen.
+
+    Gespeichert werden je Domain die gleitend gemittelte Dauer und die Zahl
+    der RRSets. Domains ohne Messung werden über die RRSet-Zahl geschätzt,
+    mit dem Verhältnis Sekunden/RRSet der gemessenen Domains der Phase.
+    """
+
+    def __init__(self, cache_dir: Path, config_file: Path) -> None:
+        key = hashlib.sha1(str(config_file.resolve()).encode('utf-8')).hexdigest()
+        self.path = cache_dir / 'durations' / f'{key}.json'
+        self._lock = threading.Lock()
+        self._changed: set[tuple[str, str]] = set()
+        self.entries: dict[str, dict[str, list[float]]] = self._read()
+
+    def _read(self) -> dict[str, dict[str, list[float]]]:
+        try:
+            entries = json.loads(self.path.read_text(encoding='utf-8'))
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, phase: str, domain: str, seconds: float, rrsets: int) -> None:
+        with self._lock:
+            entries = self.entries.setdefault(phase, {})
+            previous = entries.get(domain)
+            if previous is not None:
+                # Ausreißer einzelner Läufe nur zur Hälfte übernehmen
+                seconds = (previous[0] + seconds) / 2
+            entries[domain] = [round(seconds, 4), rrsets]
+            self._changed.add((phase, domain))
+
+    def estimate(self, phase: str, domain: str, rrsets: int) -> float:
+        entries = self.entries.get(phase, {})
+        if domain in entries:
+            return entries[domain][0]
+        total_rrsets = sum(r for _, r in entries.values())
+        rate = (sum(s for s, _ in entries.values()) / total_rrsets
+                if total_rrsets else DEFAULT_SECONDS_PER_RRSET)
+        return rate * rrsets
+
+    def save(self) -> None:
+        """Schreibt die Messungen dieses Laufs; Einträge anderer Läufe (Shards) bleiben erhalten."""
+        with self._lock:
+            if not self._changed:
+                return
+            entries = self._read()
+            for phase, domain in self._changed:
+                entries.setdefault(phase, {})[domain] = self.entries[phase][domain]
+            self._changed.clear()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+            tmp.write_text(json.dumps(entries), encoding='utf-8')
+            tmp.replace(self.path)
+        except OSError:
+            pass                  # ohne Messwerte wird nur nach RRSet-Zahl sortiert
+
+
+def longest_first(domains: list[str], estimate: Callable[[str], float]) -> list[str]:
+    """Reihenfolge für parallele Abarbeitung: die längsten Aufgaben zuerst (LPT).
+
+    Bei gleicher Schätzung bleibt die Konfigurationsreihenfolge erhalten.
+    """
+    estimates = {d: estimate(d) for d in domains}
+    return sorted(domains, key=lambda d: -estimates[d])
+
+
+def parallel_bound(seconds: list[float], workers: int) -> float:
+    """Untergrenze der Laufzeit mit `workers` Threads: Gesamtdauer verteilt oder längste Aufgabe."""
+    if not seconds:
+        return 0.0
+    return max(sum(seconds) / max(1, workers), max(seconds))
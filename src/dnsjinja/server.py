@@ -0,0 +1,302 @@
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+import hmac
+import itertools
+import json
+import threading
+import time
+import click
+from .report import RunReport
+
+ACTIONS = ('render', 'plan', 'upload', 'backup')
+
+# Längste Wartezeit für ?wait= in Sekunden
+MAX_WAIT = 600.0
+
+
+class Job:
+    """Ein Auftrag an den Dienst: eine Aktion für eine Liste von Domains."""
+
+    def __init__(self, job_id: int, action: str, domains: list[str]) -> None:
+        self.id = job_id
+        self.action = action
+        self.domains = domains
+        self.status = 'queued'          # queued, running, ok, failed
+        self.error = ''
+        self.created = time.time()
+        self.started: float | None = None
+        self.finished: float | None = None
+        self.result: dict[str, Any] = {}
+        self.done = threading.Event()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'id': self.id, 'action': self.action, 'domains': self.domains, 'status': self.status,
+            'error': self.error, 'created': self.created, 'started': self.started,
+            'finished': self.finished, 'result': self.result,
+        }
+
+
+class ControlService:
+    """Hält eine DNSJinja-Pipeline bereit und arbeitet Aufträge nacheinander ab.
+
+    Templates, API-Clients, Zonenliste und Caches bleiben zwischen den
+    Aufträgen erhalten. Ein Auftrag, der noch wartet, nimmt weitere Domains
+    derselben Aktion auf, statt einen neuen Auftrag anzulegen. `reload`
+    baut die Pipeline mit `factory` neu auf (neue Konfiguration, Zonenliste).
+    """
+
+    def __init__(self, factory: Callable[[], Any], history: int = 1000) -> None:
+        self._factory = factory
+        self.pipeline = factory()
+        self.history = history
+        self.jobs: OrderedDict[int, Job] = OrderedDict()
+        self._queue: list[Job] = []
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+        self.started = time.time()
+        self.stats: dict[str, dict[str, float]] = {}
+
+    def submit(self, action: str, domains: list[str] | None = None) -> Job:
+        if action != 'reload' and action not in ACTIONS:
+            raise ValueError(f'Unbekannte Aktion {action!r}, erlaubt: {", ".join(ACTIONS)}, reload')
+        domains = list(dict.fromkeys(domains or []))
+        if action != 'reload':
+            if not domains:
+                raise ValueError('Keine Domains angegeben')
+            unknown = [d for d in domains if d not in self.pipeline.config['domains']]
+            if unknown:
+                raise ValueError(f'Nicht konfiguriert: {", ".join(unknown)}')
+        with self._cond:
+            for job in self._queue:
+                if job.action == action:
+                    job.domains.extend(d for d in domains if d not in job.domains)
+                    return job
+            job = Job(next(self._ids), action, domains)
+            self.jobs[job.id] = job
+            self._queue.append(job)
+            self._prune()
+            self._cond.notify()
+        return job
+
+    def _prune(self) -> None:
+        finished = [j for j in self.jobs.values() if j.done.is_set()]
+        for job in finished[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id: int) -> Job | None:
+        with self._cond:
+            return self.jobs.get(job_id)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._worker, name='dnsjinja-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job = self._queue.pop(0)
+                job.status = 'running'
+                job.started = time.time()
+            self.run_job(job)
+
+    def run_job(self, job: Job) -> None:
+        try:
+            if job.action == 'reload':
+                self.pipeline = self._factory()
+                ok = True
+            else:
+                ok = self._run_action(job)
+            status, error = ('ok' if ok else 'failed'), ''
+        except SystemExit:
+            status, error = 'failed', 'Abbruch, Details in der Ausgabe des Dienstes'
+        except Exception as e:
+            status, error = 'failed', f'{type(e).__name__}: {e}'
+        with self._cond:
+            job.status, job.error = status, error
+            job.finished = time.time()
+            entry = self.stats.setdefault(job.action, {'jobs': 0, 'failed': 0, 'domains': 0, 'seconds': 0.0})
+            entry['jobs'] += 1
+            entry['failed'] += status == 'failed'
+            entry['domains'] += len(job.domains)
+            entry['seconds'] += job.finished - job.started
+        job.done.set()
+
+    def _run_action(self, job: Job) -> bool:
+        dj = self.pipeline
+        dj.report = report = RunReport(dj.shard)
+        dj.reset_fragment_cache()        # Templates können sich geändert haben
+        try:
+            if job.action == 'backup':
+                domains = job.domains
+            else:
+                domains = dj.render_domains(job.domains)
+            for domain in domains:
+                try:
+                    self._run_domain(dj, job.action, domain)
+                except SystemExit:
+                    report.record(domain, job.action, 'failed', 'Abbruch, Details in der Ausgabe des Dienstes')
+                except Exception as e:
+                    report.record(domain, job.action, 'failed', str(e).strip())
+        finally:
+            for domain in job.domains:
+                dj.release_zone(domain)
+        job.result = report.domains
+        return not report.failed_domains()
+
+    @staticmethod
+    def _run_domain(dj, action: str, domain: str) -> None:
+        if action == 'render':
+            dj.report.record(domain, 'render', 'ok', serial=dj._serials[domain], zone=dj.zones[domain])
+        elif action == 'plan':
+            changes = dj.plan_zone(domain)
+            dj.report.record(domain, 'plan', 'ok', serial=dj._serials[domain],
+                             changes=[[ch.action, ch.name, ch.rdtype, ch.ttl, ch.records] for ch in changes])
+        elif action == 'upload':
+            dj.upload_zone(domain)
+        elif action == 'backup':
+            dj.backup_zone(domain)
+
+    def metrics(self) -> dict[str, Any]:
+        hits, misses = self.pipeline.fragment_cache_stats()
+        with self._cond:
+            counts: dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                'uptime': round(time.time() - self.started, 1),
+                'queued': len(self._queue),
+                'jobs': counts,
+                'actions': {a: dict(s, seconds=round(s['seconds'], 3)) for a, s in self.stats.items()},
+                'domains': len(self.pipeline.config['domains']),
+                'fragment-cache': {'hits': hits, 'misses': misses},
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: '_ControlHTTPServer'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: Any) -> None:
+        data = (json.dumps(body, ensure_ascii=False) + '\n').encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if not token:
+            return True
+        given = self.headers.get('Authorization', '')
+        if hmac.compare_digest(given.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+            return True
+        self._send(401, {'error': 'Nicht autorisiert'})
+        return False
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        service = self.server.service
+        path = urlsplit(self.path).path.rstrip('/')
+        if path == '/health':
+            self._send(200, {'status': 'ok'})
+        elif path == '/metrics':
+            self._send(200, service.metrics())
+        elif path == '/jobs':
+            with service._cond:
+                jobs = [job.to_dict() for job in service.jobs.values()]
+            self._send(200, jobs)
+        elif path.startswith('/jobs/') and path[6:].isdigit():
+            job = service.get(int(path[6:]))
+            if job is None:
+                self._send(404, {'error': f'Auftrag {path[6:]} nicht gefunden'})
+            else:
+                self._send(200, job.to_dict())
+        else:
+            self._send(404, {'error': f'Unbekannter Pfad {path}'})
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/')
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+            wait = float(parse_qs(url.query).get('wait', ['0'])[0])
+            if not 0 <= wait <= MAX_WAIT:          # auch nan und inf
+                raise ValueError(f'wait muss zwischen 0 und {MAX_WAIT:g} Sekunden liegen')
+        except ValueError as e:
+            self._send(400, {'error': f'Ungültige Anfrage: {e}'})
+            return
+        if path == '/reload':
+            action, domains = 'reload', []
+        elif path == '/jobs' and isinstance(body, dict):
+            action, domains = body.get('action', ''), body.get('domains', [])
+            if isinstance(domains, str):
+                domains = [domains]
+            if (not isinstance(action, str) or not isinstance(domains, list)
+                    or not all(isinstance(d, str) for d in domains)):
+                self._send(400, {'error': 'Ungültige Anfrage: action muss ein String, '
+                                          'domains eine Liste von Strings sein'})
+                return
+        else:
+            self._send(404, {'error': f'Unbekannter Pfad {path}'})
+            return
+        try:
+            job = self.server.service.submit(action, domains)
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+            return
+        if wait > 0 and job.done.wait(wait):
+            self._send(200, job.to_dict())
+        else:
+            self._send(202, job.to_dict())
+
+
+class _ControlHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: ControlService, token: str = '') -> None:
+        super().__init__(address, _Handler)
+        self.service = service
+        self.token = token
+
+
+def make_server(service: ControlService, host: str = '127.0.0.1', port: int = 8053,
+                token: str = '') -> _ControlHTTPServer:
+    return _ControlHTTPServer((host, port), service, token)
+
+
+def serve(service: ControlService, host: str = '127.0.0.1', port: int = 8053, token: str = '') -> None:
+    """Startet die HTTP-API und arbeitet Aufträge ab, bis der Prozess beendet wird."""
+    httpd = make_server(service, host, port, token)
+    service.start()
+    click.echo(f'dnsjinja serve: http://{httpd.server_address[0]}:{httpd.server_address[1]} '
+               f'({len(service.pipeline.config["domains"])} Domain(s))')
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.stop()
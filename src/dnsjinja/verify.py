@@ -0,0 +1,128 @@
+from typing import NamedTuple
+import asyncio
+import time
+import dns.asyncresolver
+import dns.exception
+import dns.name
+import dns.resolver
+from .backends import RRSetChange
+
+
+class ZoneExpectation(NamedTuple):
+    """Erwarteter Stand einer Zone nach dem Upload.
+
+    `rrsets` enthält (name, rdtype, records); records None heißt gelöscht.
+    Ist `previous_serial` gesetzt, muss der SOA-Zähler darüber liegen.
+    """
+    domain: str
+    previous_serial: int | None
+    rrsets: list[tuple[str, str, list[str] | None]]
+
+
+class VerifyResult(NamedTuple):
+    domain: str
+    seconds: float | None     # None: bis zur Frist nicht überall sichtbar
+    pending: list[str]        # Nameserver ohne den erwarteten Stand
+
+
+def expectation_from_changes(domain: str, previous_serial: str | None,
+                             changes: list[RRSetChange]) -> ZoneExpectation:
+    return ZoneExpectation(
+        domain,
+        int(previous_serial) if previous_serial else None,
+        [(c.name, c.rdtype, None if c.action == 'delete' else c.records) for c in changes],
+    )
+
+
+def serial_newer(serial: int, previous: int) -> bool:
+    """Vergleich nach RFC 1982 (Serial-Arithmetik)."""
+    return 0 < (serial - previous) % 2**32 < 2**31
+
+
+class _Checker:
+
+    def __init__(self, nameserver: str, port: int, semaphore: asyncio.Semaphore) -> None:
+        self.resolver = dns.asyncresolver.Resolver(configure=False)
+        self.resolver.nameservers = [nameserver]
+        self.resolver.port = port
+        self.semaphore = semaphore
+
+    async def _lookup(self, qname: dns.name.Name, rdtype: str, origin: dns.name.Name,
+                      lifetime: float) -> list[str] | None:
+        """Liefert die rdata-Werte (relativ zu origin), [] wenn nicht vorhanden,
+        None bei Zeitüberschreitung oder anderen Fehlern."""
+        async with self.semaphore:
+            try:
+                answer = await self.resolver.resolve(qname, rdtype, lifetime=lifetime,
+                                                     raise_on_no_answer=False)
+            except dns.resolver.NXDOMAIN:
+                return []
+            except dns.exception.DNSException:
+                return None
+        if answer.rrset is None:
+            return []
+        return sorted(r.to_text(origin=origin, relativize=True) for r in answer.rrset)
+
+    async def matches(self, exp: ZoneExpectation, lifetime: float) -> bool:
+        origin = dns.name.from_text(exp.domain)
+        if exp.previous_serial is not None:
+            soa = await self._lookup(origin, 'SOA', origin, lifetime)
+            if not soa or not serial_newer(int(soa[0].split()[2]), exp.previous_serial):
+                return False
+        for name, rdtype, records in exp.rrsets:
+            qname = origin if name == '@' else dns.name.from_text(name, origin)
+            values = await self._lookup(qname, rdtype, origin, lifetime)
+            if values is None or values != (records or []):
+                return False
+        return True
+
+
+async def _wait_for(checker: _Checker, exp: ZoneExpectation, start: float, deadline: float,
+                    initial_delay: float, max_delay: float) -> float | None:
+    delay = initial_delay
+    while True:
+        now = time.monotonic()
+        remaining = deadline - now
+        if remaining <= 0:
+            return None
+        if await checker.matches(exp, min(5.0, remaining)):
+            return time.monotonic() - start
+        await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, max_delay)
+
+
+async def _verify_all(expectations: list[ZoneExpectation], name_servers: list[str],
+                      timeout: float, port: int, concurrency: int,
+                      initial_delay: float, max_delay: float) -> list[VerifyResult]:
+    semaphore = asyncio.Semaphore(concurrency)
+    checkers = [_Checker(ns, port, semaphore) for ns in name_servers]
+    start = time.monotonic()
+    deadline = start + timeout
+    tasks = [
+        [_wait_for(c, exp, start, deadline, initial_delay, max_delay) for c in checkers]
+        for exp in expectations
+    ]
+    flat = await asyncio.gather(*(t for zone_tasks in tasks for t in zone_tasks))
+    results: list[VerifyResult] = []
+    for i, exp in enumerate(expectations):
+        times = flat[i * len(checkers):(i + 1) * len(checkers)]
+        pending = [ns for ns, t in zip(name_servers, times) if t is None]
+        seconds = None if pending else max(times, default=0.0)
+        results.append(VerifyResult(exp.domain, seconds, pending))
+    return results
+
+
+def verify_propagation(expectations: list[ZoneExpectation], name_servers: list[str],
+                       timeout: float = 300.0, port: int = 53, concurrency: int = 200,
+                       initial_delay: float = 1.0, max_delay: float = 30.0) -> list[VerifyResult]:
+    """Fragt alle Nameserver parallel ab, bis jede Zone überall den erwarteten
+    Stand ausliefert oder `timeout` Sekunden vergangen sind.
+
+    Zwischen zwei Versuchen je Zone und Nameserver wird exponentiell länger
+    gewartet (`initial_delay` bis `max_delay`). Höchstens `concurrency`
+    Abfragen laufen gleichzeitig. Ergebnisse in Reihenfolge von `expectations`.
+    """
+    if not expectations:
+        return []
+    return asyncio.run(_verify_all(expectations, name_servers, timeout, port,
+                                   concurrency, initial_delay, max_delay))
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+import hashlib
+import json
+import os
+import time
+from hcloud.zones import BoundZone
+
+# Größte von der Hetzner Cloud API akzeptierte Seitengröße
+MAX_PER_PAGE = 50
+
+
+def fetch_all_zones(client, workers: int = 8, per_page: int = MAX_PER_PAGE) -> list[Any]:
+    """Liest alle Zonen eines Projekts.
+
+    Die erste Seite liefert die Gesamtzahl der Seiten; alle weiteren Seiten
+    werden dann parallel abgefragt. Fehlt die Angabe, wird wie bisher Seite
+    für Seite weitergeblättert.
+    """
+    first = client.zones.get_list(page=1, per_page=per_page)
+    zones = list(first.zones)
+    pagination = first.meta.pagination if first.meta else None
+    if pagination is None or not pagination.next_page:
+        return zones
+    last_page = pagination.last_page
+    if not isinstance(last_page, int):
+        page = pagination.next_page
+        while page:
+            result = client.zones.get_list(page=page, per_page=per_page)
+            zones.extend(result.zones)
+            pagination = result.meta.pagination if result.meta else None
+            page = pagination.next_page if pagination else None
+        return zones
+    pages = range(2, last_page + 1)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pages)))) as executor:
+        for result in executor.map(lambda p: client.zones.get_list(page=p, per_page=per_page), pages):
+            zones.extend(result.zones)
+    return zones
+
+
+class ZoneListCache:
+    """Zuordnung Zonenname → ID eines Hetzner-Projekts auf der Platte.
+
+    Ein Eintrag gilt `ttl` Sekunden. Der Schlüssel wird aus API-Basis und
+    Token abgeleitet (nur als Hash), damit Projekte sich nicht vermischen.
+    """
+
+    def __init__(self, cache_dir: str | Path, api_base: str, token: str, ttl: float) -> None:
+        key = hashlib.sha256(f'{api_base}|{token}'.encode('utf-8')).hexdigest()[:32]
+        self.path = Path(cache_dir) / 'zones' / f'{key}.json'
+        self.ttl = ttl
+
+    def get(self) -> dict[str, int] | None:
+        if self.ttl <= 0:
+            return None
+        try:
+            entry = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('fetched', 0) > self.ttl:
+            return None
+        return entry.get('zones')
+
+    def put(self, zones: dict[str, int]) -> None:
+        if self.ttl <= 0:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp.write_text(json.dumps({'fetched': time.time(), 'zones': zones}), encoding='utf-8')
+            tmp.replace(self.path)
+        except OSError:
+            pass                  # ohne Cache geht es auch, nur langsamer
+
+    def invalidate(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def bound_zone(zones_client, name: str, zone_id: int) -> BoundZone:
+    """Handle für eine Zone aus dem Cache; weitere Daten lädt hcloud bei Bedarf nach."""
+    return BoundZone(zones_client, {'id': zone_id, 'name': name}, complete=False)
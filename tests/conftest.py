@@ -129,6 +129,20 @@ def mock_zone():
     return zone
 
 
+def paged_zones(zones: list, page: int, per_page: int):
+    """Seite `page` von `zones` wie ZonesClient.get_list() (für gemockte Clients)."""
+    from hcloud.core import Meta, Pagination
+    from hcloud.zones import ZonesPageResult
+    last_page = max(1, -(-len(zones) // per_page))
+    return ZonesPageResult(
+        zones=zones[(page - 1) * per_page:page * per_page],
+        meta=Meta(pagination=Pagination(
+            page=page, per_page=per_page, next_page=page + 1 if page < last_page else None,
+            last_page=last_page, total_entries=len(zones),
+        )),
+    )
+
+
 @pytest.fixture
 def mock_client(mock_zone):
     """Vollständig gemockter hcloud.Client."""
@@ -143,6 +157,8 @@ def mock_client(mock_zone):
         client.zones.get_all.return_value = [mock_zone]
         client.zones.export_zonefile.return_value = export_resp
         client.zones.get_rrset_all.return_value = []
+        client.zones.get_list.side_effect = lambda page=1, per_page=50, **kw: paged_zones(
+            client.zones.get_all.return_value, page, per_page)
         yield client
 
 
@@ -158,3 +174,130 @@ def mock_dns_resolver():
         soa.serial = 2026020101
         resolver.resolve.return_value = [soa]
         yield resolver
+
+
+# ---------------------------------------------------------------------------
+# Lokaler DNS-Server (dnspython) als Gegenstelle für AXFR und RFC 2136
+# ---------------------------------------------------------------------------
+
+TSIG_KEY_NAME = 'dnsjinja-test.'
+TSIG_SECRET = 'c2VjcmV0LXNjaGx1ZXNzZWwtZnVlci10ZXN0cw=='
+
+
+class StandInDnsServer:
+    """Minimaler autoritativer TCP-Server: SOA, AXFR und UPDATE mit TSIG.
+
+    Zonen liegen als dns.zone.Zone in `zones`; `updates` zählt die
+    empfangenen UPDATE-Nachrichten je Zone, `queries` die AXFR-Anfragen.
+    """
+
+    def __init__(self, zones: dict[str, str]):
+        import socketserver
+        import threading
+        import dns.tsig
+        import dns.zone
+
+        self.key = dns.tsig.Key(TSIG_KEY_NAME, TSIG_SECRET)
+        self.zones = {
+            name: dns.zone.from_text(text, origin=name, relativize=False)
+            for name, text in zones.items()
+        }
+        self.updates: dict[str, int] = {}
+        self.transfers: dict[str, int] = {}
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while True:
+                    head = self.request.recv(2)
+                    if len(head) < 2:
+                        return
+                    length = int.from_bytes(head, 'big')
+                    wire = b''
+                    while len(wire) < length:
+                        wire += self.request.recv(length - len(wire))
+                    response = server.answer(wire)
+                    self.request.sendall(len(response).to_bytes(2, 'big') + response)
+
+        class UdpHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                wire, sock = self.request
+                sock.sendto(server.answer(wire), self.client_address)
+
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._udp_server = socketserver.ThreadingUDPServer(('127.0.0.1', self.port), UdpHandler)
+        self._udp_server.daemon_threads = True
+        for srv in (self._server, self._udp_server):
+            threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True).start()
+
+    def answer(self, wire: bytes) -> bytes:
+        import dns.message
+        import dns.name
+        import dns.opcode
+        import dns.rcode
+        import dns.rdataclass
+        import dns.rdatatype
+
+        query = dns.message.from_wire(wire, keyring=self.key)
+        response = dns.message.make_response(query)
+        if query.opcode() == dns.opcode.UPDATE:
+            zone = self.zones.get(str(query.zone[0].name).rstrip('.'))
+            if zone is None:
+                response.set_rcode(dns.rcode.NOTAUTH)
+                return response.to_wire()
+            self.updates[zone.origin.to_text(True)] = self.updates.get(zone.origin.to_text(True), 0) + 1
+            with zone.writer() as txn:
+                for rrset in query.update:
+                    if rrset.deleting == dns.rdataclass.ANY:
+                        txn.delete(rrset.name, rrset.rdtype)
+                    else:
+                        txn.add(rrset)
+            return response.to_wire()
+
+        question = query.question[0]
+        zone = next((z for z in self.zones.values() if question.name.is_subdomain(z.origin)), None)
+        if zone is None:
+            response.set_rcode(dns.rcode.REFUSED)
+        elif question.rdtype == dns.rdatatype.AXFR:
+            name = zone.origin.to_text(True)
+            self.transfers[name] = self.transfers.get(name, 0) + 1
+            soa = zone.find_rrset(zone.origin, 'SOA')
+            response.answer.append(soa)
+            for rname, rdtype, rdataset in ((n, r.rdtype, r) for n, node in zone.nodes.items() for r in node):
+                if rdtype == dns.rdatatype.SOA:
+                    continue
+                rrset = response.find_rrset(response.answer, rname, rdataset.rdclass, rdtype, create=True)
+                rrset.update(rdataset)
+            response.answer.append(soa)
+        elif zone.get_node(question.name) is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        else:
+            rrset = zone.get_rrset(question.name, question.rdtype)
+            if rrset is not None:
+                response.answer.append(rrset)
+        return response.to_wire()
+
+    def close(self):
+        for srv in (self._server, self._udp_server):
+            srv.shutdown()
+            srv.server_close()
+
+
+@pytest.fixture
+def dns_server():
+    """Startet einen StandInDnsServer mit der Zone example.com."""
+    server = StandInDnsServer({'example.com': STAND_IN_ZONE})
+    yield server
+    server.close()
+
+
+STAND_IN_ZONE = """\
+$ORIGIN example.com.
+$TTL 3600
+@ IN SOA hydrogen.ns.hetzner.com. dns.hetzner.com. 2026020101 86400 10800 3600000 3600
+@ IN NS hydrogen.ns.hetzner.com.
+@ IN A 192.0.2.1
+old IN A 192.0.2.50
+"""
@@ -8,8 +8,8 @@ import hcloud
 from unittest.mock import MagicMock, call
 from pathlib import Path
 
-from dnsjinja.dnsjinja import DNSJinja, UploadError
-from tests.conftest import write_config
+from dnsjinja.dnsjinja import DNSJinja, SerialError, UploadError
+from tests.conftest import TEST_TEMPLATE, write_config
 
 
 # ---------------------------------------------------------------------------
@@ -72,6 +72,37 @@ class TestPrepareZones:
         assert dj._hetzner_zones['neu-anlegen.de'] is new_zone
         assert 'angelegt' in capsys.readouterr().out
 
+    def test_create_missing_mit_upload_importiert_zone_file(
+        self, data_dir, mock_client, mock_dns_resolver, capsys
+    ):
+        """Mit Upload werden neue Zonen gleichzeitig angelegt und sofort befüllt."""
+        config_path = write_config(data_dir, ['neu-a.de', 'neu-b.de'])
+        mock_client.zones.get_all.return_value = []
+
+        def create(name, mode, zonefile=None):
+            if name == 'neu-b.de' and zonefile is not None:
+                raise hcloud.APIException(code=422, message='invalid zonefile', details={})
+            zone = MagicMock(); zone.name = name; zone.id = f'id-{name}'
+            return MagicMock(zone=zone)
+        mock_client.zones.create.side_effect = create
+
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver,
+                           create_missing=True, upload=True)
+        dj.upload_zones()
+
+        calls = {(c.kwargs['name'], 'zonefile' in c.kwargs) for c in mock_client.zones.create.call_args_list}
+        assert calls == {('neu-a.de', True), ('neu-b.de', True), ('neu-b.de', False)}
+        zonefile = next(c.kwargs['zonefile'] for c in mock_client.zones.create.call_args_list
+                        if c.kwargs['name'] == 'neu-a.de')
+        assert '$ORIGIN neu-a.de.' in zonefile and f'{dj.today}01' in zonefile
+        # neu-a.de braucht keinen Upload mehr, neu-b.de wird wie bisher befüllt
+        assert {c.args[0].name for c in mock_client.zones.get_rrset_all.call_args_list} == {'neu-b.de'}
+        assert dj.report.domains['neu-a.de']['upload'] == {'status': 'ok', 'changes': 0, 'imported': True}
+        mock_dns_resolver.resolve.assert_called_once()
+        out = capsys.readouterr().out
+        assert 'neu-a.de wurde neu bei Hetzner angelegt (mit Zone-File' in out
+        assert 'Neu angelegt: 2 von 2 Zone(n)' in out and 'davon 1 mit Zone-File' in out
+
     def test_create_missing_api_fehler_wird_ignoriert(
         self, data_dir, mock_client, mock_dns_resolver, capsys
     ):
@@ -319,10 +350,10 @@ class TestZoneSerial:
         assert len(serial) == 10
         assert serial.isdigit()
 
-    def test_serial_ueberlauf_bei_suffix_99_bricht_ab(
+    def test_serial_ueberlauf_bei_suffix_99_wird_abgelehnt(
         self, data_dir, config_file, mock_client, mock_dns_resolver
     ):
-        """Bei Suffix 99 wird sys.exit(1) ausgelöst statt einer 11-stelligen Serial."""
+        """Bei Suffix 99 wird SerialError ausgelöst statt einer 11-stelligen Serial."""
         dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver)
 
         # Mock überschreiben: aktueller Zähler endet auf 99
@@ -332,9 +363,35 @@ class TestZoneSerial:
 
         dj._today = '20260201'  # gleicher Tag wie Serial-Präfix → Inkrement wird versucht
 
-        with pytest.raises(SystemExit) as exc_info:
+        with pytest.raises(SerialError, match='99 erreicht'):
             dj._new_zone_serial('example.com')
-        assert exc_info.value.code == 1
+
+    def test_soa_fehler_betrifft_nur_die_domain(
+        self, data_dir, mock_client, mock_dns_resolver, capsys
+    ):
+        """Ohne SOA-Zähler wird eine Domain als nicht gerendert gemeldet, die übrigen laufen weiter."""
+        import dns.exception
+        TestParallelRendering._zones(mock_client, ['a.de', 'b.de'])
+        config_path = write_config(data_dir, ['a.de', 'b.de'])
+        soa = mock_dns_resolver.resolve.return_value
+
+        def resolve(domain, *args, **kwargs):
+            if domain == 'a.de':
+                raise dns.exception.Timeout()
+            return soa
+        mock_dns_resolver.resolve.side_effect = resolve
+
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, upload=True, write_zone=True)
+        dj.write_zone_files()
+        dj.upload_zones()
+
+        assert list(dj.zones) == ['b.de']
+        assert list(dj.report.domains['a.de']) == ['render']
+        assert dj.report.domains['a.de']['render']['status'] == 'failed'
+        assert 'SOA-Zählers' in dj.report.domains['a.de']['render']['message']
+        assert dj.report.domains['b.de']['upload']['status'] == 'ok'
+        assert dj.exit_status_file.read_text(encoding='utf-8') == '1'
+        assert 'Domäne a.de konnte nicht gerendert werden' in capsys.readouterr().out
 
     def test_serial_wird_in_serials_gecacht(
         self, data_dir, config_file, mock_client, mock_dns_resolver
@@ -436,3 +493,1980 @@ class TestZoneRendering:
         zone = dj.zones['example.com']
         assert '$ORIGIN example.com.' in zone
         assert dj._serials['example.com'] in zone
+
+
+# ---------------------------------------------------------------------------
+# Backend 'rfc2136' gegen lokalen dnspython-Server
+# ---------------------------------------------------------------------------
+
+class TestRfc2136Backend:
+
+    ZONE_TEMPLATE = """\
+$ORIGIN {{ domain }}.
+$TTL 3600
+@ IN SOA hydrogen.ns.hetzner.com. dns.hetzner.com. {{ soa_serial }} 86400 10800 3600000 3600
+@ IN NS hydrogen.ns.hetzner.com.
+@ IN A 192.0.2.99
+@ IN MX 10 mail
+mail IN A 192.0.2.2
+www 300 IN A 192.0.2.1
+"""
+
+    @staticmethod
+    def _write_rfc2136_config(data_dir, port, domains=('example.com',)):
+        import json
+        from tests.conftest import make_config, TSIG_KEY_NAME
+        cfg = make_config(list(domains))
+        cfg['global']['backend'] = {
+            'type': 'rfc2136', 'server': '127.0.0.1', 'port': port,
+            'tsig-key-name': TSIG_KEY_NAME, 'timeout': 5,
+        }
+        path = data_dir / 'config' / 'config.json'
+        path.write_text(json.dumps(cfg), encoding='utf-8')
+        return path
+
+    def _make(self, data_dir, dns_server, **kwargs):
+        from tests.conftest import TSIG_SECRET
+        (data_dir / 'templates' / 'test.tpl').write_text(self.ZONE_TEMPLATE, encoding='utf-8')
+        config_path = self._write_rfc2136_config(data_dir, dns_server.port, **kwargs)
+        return DNSJinja(datadir=str(data_dir), config_file=str(config_path), tsig_secret=TSIG_SECRET)
+
+    def test_upload_sendet_eine_update_nachricht(self, data_dir, dns_server, mock_dns_resolver, capsys):
+        """Alle Änderungen einer Zone werden in genau einer UPDATE-Nachricht übertragen."""
+        import dns.rdatatype
+        dj = self._make(data_dir, dns_server)
+
+        changes = dj._sync_zone_rrsets('example.com')
+
+        assert dns_server.updates == {'example.com': 1}
+        assert {(c.action, c.name, c.rdtype) for c in changes} == {
+            ('update', '@', 'A'), ('create', '@', 'MX'), ('create', 'mail', 'A'),
+            ('create', 'www', 'A'), ('delete', 'old', 'A'),
+        }
+        zone = dns_server.zones['example.com']
+        assert zone.get_rdataset('old.example.com.', 'A') is None
+        assert [r.to_text() for r in zone.get_rdataset('example.com.', 'A')] == ['192.0.2.99']
+        assert zone.get_rdataset('www.example.com.', dns.rdatatype.A).ttl == 300
+
+    def test_upload_ohne_aenderungen_sendet_nichts(self, data_dir, dns_server, mock_dns_resolver):
+        """Ist die Zone bereits aktuell, wird keine UPDATE-Nachricht gesendet."""
+        dj = self._make(data_dir, dns_server)
+        dj.upload_zone('example.com')
+
+        dj.upload_zone('example.com')
+
+        assert dns_server.updates == {'example.com': 1}
+
+    def test_backup_per_axfr(self, data_dir, dns_server, mock_dns_resolver):
+        """Backups werden per Zonentransfer gelesen."""
+        dj = self._make(data_dir, dns_server)
+
+        dj.backup_zone('example.com')
+
+        backups = list((data_dir / 'zone-backups').iterdir())
+        assert len(backups) == 1
+        content = backups[0].read_text(encoding='utf-8')
+        assert 'old 3600 IN A 192.0.2.50' in content
+        assert dns_server.transfers['example.com'] == 1
+
+    def test_unbekannte_zone_wird_ignoriert(self, data_dir, dns_server, mock_dns_resolver, capsys):
+        """Zonen, für die der Server nicht autoritativ ist, werden übersprungen."""
+        dj = self._make(data_dir, dns_server, domains=('example.com', 'fremd.de'))
+
+        assert list(dj.config['domains']) == ['example.com']
+        assert 'fremd.de ist konfiguriert aber nicht bei 127.0.0.1 eingerichtet' in capsys.readouterr().out
+
+    def test_ohne_tsig_schluessel_bricht_ab(self, data_dir, dns_server, mock_dns_resolver, capsys):
+        """Ohne TSIG-Schlüssel bricht __init__ mit sys.exit(1) ab."""
+        config_path = self._write_rfc2136_config(data_dir, dns_server.port)
+
+        with pytest.raises(SystemExit) as exc_info:
+            DNSJinja(datadir=str(data_dir), config_file=str(config_path))
+        assert exc_info.value.code == 1
+        assert 'TSIG' in capsys.readouterr().out
+
+
+# ---------------------------------------------------------------------------
+# Paralleles Rendern (--jobs)
+# ---------------------------------------------------------------------------
+
+class TestParallelRendering:
+
+    DOMAINS = ['c.de', 'a.de', 'b.de', 'd.de']
+
+    @staticmethod
+    def _zones(mock_client, domains):
+        zones = []
+        for name in domains:
+            z = MagicMock(); z.name = name; z.id = f'id-{name}'
+            zones.append(z)
+        mock_client.zones.get_all.return_value = zones
+
+    def test_ergebnis_gleich_sequentiell_und_in_konfigurationsreihenfolge(
+        self, data_dir, mock_client, mock_dns_resolver
+    ):
+        """Parallel gerenderte Zonen stimmen mit dem sequentiellen Ergebnis überein."""
+        self._zones(mock_client, self.DOMAINS)
+        config_path = write_config(data_dir, self.DOMAINS)
+
+        seq = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver)
+        par = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, jobs=2)
+
+        assert list(par.zones) == self.DOMAINS
+        assert par.zones == seq.zones
+        assert par._rrsets['a.de'] == seq._parse_zone_rrsets('a.de')
+
+    def test_syntaxfehler_wird_beim_upload_gemeldet(
+        self, data_dir, mock_client, mock_dns_resolver, capsys
+    ):
+        """Syntaxfehler aus dem Worker führen beim Upload der Domain zum Abbruch."""
+        self._zones(mock_client, self.DOMAINS)
+        (data_dir / 'templates' / 'test.tpl').write_text(
+            TEST_TEMPLATE + "{% if domain == 'b.de' %}@ IN A kein-ip\n{% endif %}", encoding='utf-8')
+        config_path = write_config(data_dir, self.DOMAINS)
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, jobs=2, upload=True)
+
+        assert 'a.de' in dj._rrsets and 'b.de' in dj._syntax_errors
+        with pytest.raises(SystemExit):
+            dj.upload_zone('b.de')
+        assert 'Syntaxfehler im Zone-File für b.de' in capsys.readouterr().out
+
+    @pytest.mark.parametrize('jobs', [1, 2])
+    def test_renderfehler_werden_gesammelt_gemeldet(
+        self, data_dir, mock_client, mock_dns_resolver, capsys, jobs
+    ):
+        """Renderfehler aller Domains werden in Konfigurationsreihenfolge gemeldet,
+        mit und ohne Prozess-Pool gleich."""
+        self._zones(mock_client, self.DOMAINS)
+        (data_dir / 'templates' / 'test.tpl').write_text(
+            "{% if domain in ['d.de', 'a.de'] %}{{ 1 / 0 }}{% endif %}$ORIGIN {{ domain }}.\n",
+            encoding='utf-8')
+        config_path = write_config(data_dir, self.DOMAINS)
+
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, jobs=jobs)
+
+        assert list(dj.zones) == ['c.de', 'b.de']
+        assert dj.report.exit_code == 1
+        assert dj.report.domains['a.de']['render']['status'] == 'failed'
+        out = capsys.readouterr().out
+        assert out.index('a.de konnte nicht gerendert') < out.index('d.de konnte nicht gerendert')
+        assert 'a.de konnte nicht gerendert werden: ZeroDivisionError: division by zero' in out
+
+
+# ---------------------------------------------------------------------------
+# Konfiguration mit domains.d und Cache
+# ---------------------------------------------------------------------------
+
+class TestConfigLoader:
+
+    @staticmethod
+    def _split_config(data_dir, main_domains, files):
+        import json
+        from tests.conftest import make_config
+        cfg = make_config(main_domains)
+        config_path = data_dir / 'config' / 'config.json'
+        config_path.write_text(json.dumps(cfg), encoding='utf-8')
+        domains_dir = data_dir / 'config' / 'domains.d'
+        domains_dir.mkdir()
+        for name, domains in files.items():
+            (domains_dir / name).write_text(
+                json.dumps({d: {'template': 'test.tpl'} for d in domains}), encoding='utf-8')
+        return config_path
+
+    def test_domains_d_wird_zusammengefuehrt(self, data_dir):
+        """Domains aus config.json und allen Dateien in domains.d werden geladen."""
+        from dnsjinja.config_loader import load_config
+        config_path = self._split_config(
+            data_dir, ['a.de'], {'gruppe.json': ['c.de', 'b.de'], 'd.de.json': ['d.de']})
+
+        loaded = load_config(config_path)
+
+        assert list(loaded.data['domains']) == ['a.de', 'd.de', 'c.de', 'b.de']
+        assert loaded.model.domains['c.de'].template == 'test.tpl'
+        assert loaded.model.global_config.zone_files == 'zone-files'
+
+    def test_doppelte_domain_ist_fehler(self, data_dir):
+        """Eine Domain darf nur in einer Datei konfiguriert sein."""
+        from dnsjinja.config_loader import ConfigError, load_config
+        config_path = self._split_config(data_dir, ['a.de'], {'x.json': ['a.de']})
+
+        with pytest.raises(ConfigError, match='mehrfach'):
+            load_config(config_path)
+
+    def test_ungueltige_datei_wird_gemeldet(self, data_dir):
+        """Validierungsfehler in domains.d nennen die betroffene Datei."""
+        from dnsjinja.config_loader import ConfigError, load_config
+        config_path = self._split_config(data_dir, [], {})
+        (data_dir / 'config' / 'domains.d' / 'kaputt.json').write_text('{"x.de": {}}', encoding='utf-8')
+
+        with pytest.raises(ConfigError, match='kaputt.json'):
+            load_config(config_path)
+
+    def test_cache_ueberspringt_validierung(self, data_dir, tmp_path, monkeypatch):
+        """Unveränderte Dateien werden aus dem Cache geladen, geänderte neu validiert."""
+        import os
+        from dnsjinja import config_loader
+        config_path = self._split_config(data_dir, ['a.de'], {'b.json': ['b.de'], 'c.json': ['c.de']})
+        cache_dir = tmp_path / 'cache'
+
+        first = config_loader.load_config(config_path, cache_dir)
+        assert first.cache_hits == 0
+
+        calls = []
+        original = config_loader._validate_domains
+        monkeypatch.setattr(config_loader, '_validate_domains',
+                            lambda path, domains: calls.append(path.name) or original(path, domains))
+        # Nur Zeitstempel geändert → Hash passt, keine Validierung
+        c_file = data_dir / 'config' / 'domains.d' / 'c.json'
+        os.utime(c_file, ns=(1, 1))
+        # Inhalt geändert → neue Validierung
+        (data_dir / 'config' / 'domains.d' / 'b.json').write_text(
+            '{"b.de": {"template": "test.tpl", "mail": "x"}}', encoding='utf-8')
+
+        second = config_loader.load_config(config_path, cache_dir)
+
+        assert calls == ['b.json']
+        assert second.cache_hits == 2
+        assert second.data['domains']['b.de']['mail'] == 'x'
+
+    def test_dnsjinja_nutzt_domains_d(self, data_dir, mock_client, mock_dns_resolver):
+        """DNSJinja rendert auch Domains, die nur in domains.d konfiguriert sind."""
+        zone_b = MagicMock(); zone_b.name = 'b.de'; zone_b.id = 'id-b'
+        mock_client.zones.get_all.return_value = [zone_b]
+        config_path = self._split_config(data_dir, [], {'b.json': ['b.de']})
+
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver)
+
+        assert list(dj.zones) == ['b.de']
+        assert dj.config['domains']['b.de']['zone-id'] == 'id-b'
+
+
+# ---------------------------------------------------------------------------
+# explore_hetzner --export-dir
+# ---------------------------------------------------------------------------
+
+class TestExploreExport:
+
+    @staticmethod
+    def _explorer(pages, output):
+        from unittest.mock import patch
+        from dnsjinja.explore_hetzner import ExploreHetzner
+
+        results = []
+        for i, names in enumerate(pages):
+            zones = []
+            for name in names:
+                z = MagicMock(); z.name = name
+                zones.append(z)
+            result = MagicMock()
+            result.zones = zones
+            result.meta.pagination.next_page = i + 2 if i + 1 < len(pages) else None
+            results.append(result)
+
+        with patch('dnsjinja.explore_hetzner.Client') as mock_class:
+            client = MagicMock()
+            mock_class.return_value = client
+            client.zones.get_list.side_effect = results
+            ex = ExploreHetzner(output, 'test-token')
+        return ex, client
+
+    def test_export_schreibt_zonen_und_config(self, tmp_path):
+        """Alle Zonen aller Seiten werden exportiert und als Config ausgegeben."""
+        import io
+        import json
+        output = io.StringIO()
+        ex, client = self._explorer([['a.de', 'b.de'], ['c.de']], output)
+        client.zones.export_zonefile.side_effect = lambda z: MagicMock(zonefile=f'$ORIGIN {z.name}.')
+
+        failed = ex.export(tmp_path / 'export', workers=2)
+
+        assert failed == 0
+        assert sorted(p.name for p in (tmp_path / 'export').iterdir()) == ['a.de.zone', 'b.de.zone', 'c.de.zone']
+        assert (tmp_path / 'export' / 'c.de.zone').read_text(encoding='utf-8') == '$ORIGIN c.de.\n'
+        config = json.loads(output.getvalue())
+        assert sorted(config['domains']) == ['a.de', 'b.de', 'c.de']
+        assert config['domains']['a.de'] == {'template': ''}
+        from dnsjinja.zone_cache import MAX_PER_PAGE
+        assert {c.kwargs['per_page'] for c in client.zones.get_list.call_args_list} == {MAX_PER_PAGE}
+
+    def test_export_rrsets_und_fehler(self, tmp_path, capsys):
+        """Fehlgeschlagene Zonen werden gemeldet und fehlen in der Config."""
+        import io
+        import json
+        output = io.StringIO()
+        ex, client = self._explorer([['ok.de', 'fail.de']], output)
+        rrset = MagicMock(); rrset.name = '@'; rrset.type = 'A'; rrset.ttl = 3600
+        rrset.records = [MagicMock(value='192.0.2.1')]
+
+        def get_rrset_all(zone):
+            if zone.name == 'fail.de':
+                raise hcloud.APIException(code=500, message='Fehler', details={})
+            return [rrset]
+        client.zones.get_rrset_all.side_effect = get_rrset_all
+
+        failed = ex.export(tmp_path, workers=1, fmt='rrsets')
+
+        assert failed == 1
+        assert json.loads(output.getvalue())['domains'] == {'ok.de': {'template': ''}}
+        assert json.loads((tmp_path / 'ok.de.rrsets.json').read_text(encoding='utf-8')) == [
+            {'name': '@', 'type': 'A', 'ttl': 3600, 'records': ['192.0.2.1']}
+        ]
+        assert 'fail.de konnte nicht exportiert werden' in capsys.readouterr().err
+
+
+# ---------------------------------------------------------------------------
+# Verteilungsprüfung nach dem Upload (--verify)
+# ---------------------------------------------------------------------------
+
+class TestVerifyPropagation:
+
+    def test_sichtbare_aenderungen_werden_bestaetigt(self, dns_server):
+        """Stimmen SOA-Zähler und rdata, ist die Zone sofort bestätigt."""
+        from dnsjinja.verify import ZoneExpectation, verify_propagation
+        exp = ZoneExpectation('example.com', 2026013199, [
+            ('@', 'A', ['192.0.2.1']),
+            ('old', 'A', ['192.0.2.50']),
+            ('weg', 'A', None),
+        ])
+
+        results = verify_propagation([exp], ['127.0.0.1'], timeout=5, port=dns_server.port)
+
+        assert results[0].domain == 'example.com'
+        assert results[0].seconds is not None
+        assert results[0].pending == []
+
+    def test_fehlende_aenderung_laeuft_in_frist(self, dns_server):
+        """Fehlt ein erwarteter Wert, wird nach der Frist der Nameserver gemeldet."""
+        from dnsjinja.verify import ZoneExpectation, verify_propagation
+        exp = ZoneExpectation('example.com', None, [('@', 'A', ['192.0.2.99'])])
+
+        results = verify_propagation([exp], ['127.0.0.1'], timeout=0.3, port=dns_server.port,
+                                     initial_delay=0.05)
+
+        assert results[0].seconds is None
+        assert results[0].pending == ['127.0.0.1']
+
+    def test_alter_soa_zaehler_gilt_als_nicht_verteilt(self, dns_server):
+        """Ohne erhöhten SOA-Zähler ist die Zone noch nicht verteilt."""
+        from dnsjinja.verify import ZoneExpectation, verify_propagation
+        exp = ZoneExpectation('example.com', 2026020101, [])
+
+        results = verify_propagation([exp], ['127.0.0.1'], timeout=0.2, port=dns_server.port,
+                                     initial_delay=0.05)
+
+        assert results[0].seconds is None
+
+    def test_serial_arithmetik(self):
+        from dnsjinja.verify import serial_newer
+        assert serial_newer(2026020102, 2026020101)
+        assert not serial_newer(2026020101, 2026020101)
+        assert serial_newer(5, 2**32 - 5)
+
+    def test_verify_zones_meldet_nicht_verteilte_zonen(
+        self, data_dir, config_file, mock_client, mock_dns_resolver, capsys
+    ):
+        """verify_zones() prüft nur geänderte Zonen und schreibt Exit-Code 253."""
+        from unittest.mock import patch
+        from dnsjinja.verify import VerifyResult
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                           upload=True, verify=True, verify_timeout=1)
+        dj.upload_zones()
+
+        with patch('dnsjinja.dnsjinja.verify_propagation',
+                   return_value=[VerifyResult('example.com', None, ['213.133.100.98'])]) as vp:
+            dj.verify_zones()
+
+        (exp,), name_servers = vp.call_args.args
+        assert exp.previous_serial == 2026020101
+        assert exp.rrsets == [('@', 'NS', sorted(['hydrogen.ns.hetzner.com.', 'oxygen.ns.hetzner.com.',
+                                                  'helium.ns.hetzner.de.']))]
+        assert 'noch nicht sichtbar auf: 213.133.100.98' in capsys.readouterr().out
+        assert dj.exit_status_file.read_text(encoding='utf-8') == '253'
+
+
+# ---------------------------------------------------------------------------
+# Sharding (--shard) und Laufbericht (--report)
+# ---------------------------------------------------------------------------
+
+class TestSharding:
+
+    DOMAINS = [f'domain{i}.de' for i in range(20)]
+
+    def test_jede_domain_in_genau_einem_shard(self):
+        """Die Zuordnung ist vollständig, eindeutig und stabil."""
+        from dnsjinja.report import Shard
+        shards = [Shard(i, 3) for i in range(1, 4)]
+        for d in self.DOMAINS:
+            assert sum(s.contains(d) for s in shards) == 1
+        assert [d for d in self.DOMAINS if shards[0].contains(d)] == \
+               [d for d in self.DOMAINS if Shard.parse('1/3').contains(d)]
+
+    @pytest.mark.parametrize('text', ['0/3', '4/3', 'a/b', '3'])
+    def test_ungueltige_shard_angabe(self, text):
+        from dnsjinja.report import Shard
+        with pytest.raises(ValueError):
+            Shard.parse(text)
+
+    def test_shards_bearbeiten_getrennte_domains_und_berichte_lassen_sich_mergen(
+        self, data_dir, mock_client, mock_dns_resolver, capsys
+    ):
+        """Jeder Shard rendert nur seine Domains und meldet nur seine unbekannten Zonen."""
+        from dnsjinja.report import Shard, load_report, merge_reports
+        zones = []
+        for name in self.DOMAINS + ['fremd1.de', 'fremd2.de', 'fremd3.de']:
+            z = MagicMock(); z.name = name; z.id = f'id-{name}'
+            zones.append(z)
+        mock_client.zones.get_all.return_value = zones
+        config_path = write_config(data_dir, self.DOMAINS)
+
+        reports = []
+        rendered = []
+        for i in (1, 2):
+            dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver,
+                               shard=Shard(i, 2), write_zone=True)
+            dj.write_zone_files()
+            rendered.append(set(dj.zones))
+            path = data_dir / f'report-{i}.json'
+            dj.write_report(path)
+            reports.append(load_report(path))
+
+        assert rendered[0] | rendered[1] == set(self.DOMAINS)
+        assert not rendered[0] & rendered[1]
+        out = capsys.readouterr().out
+        for name in ('fremd1.de', 'fremd2.de', 'fremd3.de'):
+            assert out.count(f'{name} ist bei Hetzner eingerichtet') == 1
+
+        merged = merge_reports(reports)
+        assert merged['shards'] == ['1/2', '2/2']
+        assert sorted(merged['domains']) == sorted(self.DOMAINS)
+        assert merged['domains']['domain0.de']['write']['status'] == 'ok'
+        assert merged['unconfigured'] == ['fremd1.de', 'fremd2.de', 'fremd3.de']
+
+    def test_bericht_enthaelt_fehler_und_exit_code(
+        self, data_dir, config_file, mock_client, mock_dns_resolver
+    ):
+        """Fehlgeschlagene Uploads stehen mit Meldung und Exit-Code im Bericht."""
+        mock_client.zones.get_rrset_all.side_effect = hcloud.APIException(
+            code=500, message='Fehler', details={})
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver, upload=True)
+
+        dj.upload_zones()
+        report = dj.report.to_dict()
+
+        assert report['exit_code'] == 254
+        assert report['domains']['example.com']['upload']['status'] == 'failed'
+        assert dj.report.failed_domains() == ['example.com']
+
+    def test_abbruch_vor_dem_lauf_hinterlaesst_bericht(self, data_dir, tmp_path):
+        """Bricht schon der Aufbau ab (hier: fehlerhafte Konfiguration), wird trotzdem ein Bericht geschrieben."""
+        import json
+        from click.testing import CliRunner
+        from dnsjinja.dnsjinja import run
+        config_path = data_dir / 'config' / 'kaputt.json'
+        config_path.write_text('{', encoding='utf-8')
+        report_file = tmp_path / 'result.json'
+        report_file.write_text('{"exit_code": 0}', encoding='utf-8')
+
+        result = CliRunner().invoke(run, ['-d', str(data_dir), '-c', str(config_path), '--cache-dir', '',
+                                          '--auth-api-token', 'test-token', '-u', '--report', str(report_file)])
+
+        assert result.exit_code == 1
+        report = json.loads(report_file.read_text(encoding='utf-8'))
+        assert (report['exit_code'], report['domains']) == (1, {})
+
+
+# ---------------------------------------------------------------------------
+# Parallele Läufe: Zonen-Sperren und Ergebnisdateien
+# ---------------------------------------------------------------------------
+
+class TestParallelRuns:
+
+    def test_gesperrte_zone_wird_nicht_hochgeladen(
+        self, data_dir, config_file, mock_client, mock_dns_resolver, tmp_path
+    ):
+        """Hält ein anderer Lauf die Zonen-Sperre, schlägt der Upload nach lock_timeout fehl."""
+        from dnsjinja.locks import zone_lock
+        lock_dir = tmp_path / 'locks'
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver, upload=True,
+                           lock_dir=str(lock_dir), lock_timeout=0.2)
+
+        with zone_lock(lock_dir, 'example.com'):
+            with pytest.raises(UploadError, match='gesperrt'):
+                dj.upload_zone('example.com')
+        mock_client.zones.get_rrset_all.assert_not_called()
+        assert dj.report.exit_code == 254
+
+        # nach Freigabe klappt es
+        dj.upload_zone('example.com')
+        assert dj.report.domains['example.com']['upload']['status'] == 'ok'
+
+    def test_ergebnisdatei_statt_pointer(
+        self, data_dir, config_file, mock_client, mock_dns_resolver, tmp_path
+    ):
+        """Mit report_file wird die globale Pointer-Datei nicht angefasst."""
+        import tempfile
+        pointer = Path(tempfile.gettempdir()) / 'dnsjinja.exit.ptr'
+        pointer.write_text('fremder-lauf', encoding='utf-8')
+        report_file = tmp_path / 'result.json'
+        report_file.write_text('{"exit_code": 254}', encoding='utf-8')
+
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                           report_file=str(report_file))
+
+        assert pointer.read_text(encoding='utf-8') == 'fremder-lauf'
+        assert not report_file.exists()   # altes Ergebnis verworfen
+        dj.write_report()
+        assert report_file.exists()
+
+    def test_exit_on_error_liest_berichte(self, tmp_path):
+        """exit_on_error führt mehrere Berichte zusammen; fehlende Berichte ergeben 1."""
+        import json
+        from click.testing import CliRunner
+        from dnsjinja.exit_on_error import run as exit_on_error
+        ok = tmp_path / 'ok.json'
+        failed = tmp_path / 'failed.json'
+        ok.write_text(json.dumps({'exit_code': 0, 'domains': {'a.de': {}}}), encoding='utf-8')
+        failed.write_text(json.dumps({'exit_code': 254, 'domains': {'b.de': {}}}), encoding='utf-8')
+        runner = CliRunner()
+
+        assert runner.invoke(exit_on_error, ['--report', str(ok)]).exit_code == 0
+        assert runner.invoke(exit_on_error, ['--report', str(ok), '--report', str(failed)]).exit_code == 254
+        assert runner.invoke(exit_on_error, ['--report', str(tmp_path / 'fehlt.json')]).exit_code == 1
+
+
+# ---------------------------------------------------------------------------
+# Profiling (--profile)
+# ---------------------------------------------------------------------------
+
+class TestProfiling:
+
+    def test_profil_je_domain_und_phase(
+        self, data_dir, mock_client, mock_dns_resolver, tmp_path, capsys
+    ):
+        """--profile misst Includes, hostname-Aufrufe und schreibt .prof je Phase."""
+        import json
+        import pstats
+        (data_dir / 'templates' / 'a.inc').write_text(
+            '{% for i in range(3) %}h{{ i }} IN A {{ ("127.0.0.%d" % (i + 1)) | hostname }}\n{% endfor %}', encoding='utf-8')
+        (data_dir / 'templates' / 'schwer.tpl').write_text(
+            TEST_TEMPLATE + "{% include 'a.inc' %}\n{% include 'a.inc' %}\n", encoding='utf-8')
+        zones = []
+        for name in ('leicht.de', 'schwer.de'):
+            z = MagicMock(); z.name = name; z.id = f'id-{name}'
+            zones.append(z)
+        mock_client.zones.get_all.return_value = zones
+        config_path = write_config(data_dir, ['leicht.de', 'schwer.de'])
+        config = json.loads(config_path.read_text(encoding='utf-8'))
+        config['domains']['schwer.de']['template'] = 'schwer.tpl'
+        config_path.write_text(json.dumps(config), encoding='utf-8')
+        profile_dir = tmp_path / 'profile'
+
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, write_zone=True,
+                           jobs=4, profile_dir=str(profile_dir), profile_top=1)
+        with dj.profile_phase('write'):
+            dj.write_zone_files()
+        dj.write_profile()
+
+        by_domain = {p.domain: p for p in dj.profiler.domains}
+        assert (by_domain['schwer.de'].includes, by_domain['schwer.de'].hostname_calls) == (2, 6)
+        assert (by_domain['leicht.de'].includes, by_domain['leicht.de'].hostname_calls) == (0, 0)
+        assert '127.0.0.1' in dj.zones['schwer.de']
+        for phase in ('render', 'write'):
+            pstats.Stats(str(profile_dir / f'{phase}.prof'))
+        data = json.loads((profile_dir / 'profile.json').read_text(encoding='utf-8'))
+        assert {d['domain'] for d in data['domains']} == {'leicht.de', 'schwer.de'}
+        assert 'Langsamste Domains (Top 1)' in capsys.readouterr().out
+
+
+# ---------------------------------------------------------------------------
+# Upload-Journal und --resume
+# ---------------------------------------------------------------------------
+
+class TestResume:
+
+    def test_abgebrochener_upload_wird_fortgesetzt(
+        self, data_dir, mock_client, mock_dns_resolver, tmp_path
+    ):
+        """Abgeschlossene Zonen entfallen, unvollständige setzen mit den restlichen Änderungen fort."""
+        (data_dir / 'templates' / 'test.tpl').write_text(
+            TEST_TEMPLATE + 'www IN A 192.0.2.1\nmail IN A 192.0.2.2\n', encoding='utf-8')
+        zones = []
+        for name in ('a.de', 'b.de'):
+            z = MagicMock(); z.name = name; z.id = f'id-{name}'
+            zones.append(z)
+        mock_client.zones.get_all.return_value = zones
+        config_path = write_config(data_dir, ['a.de', 'b.de'])
+        journal = tmp_path / 'journal.jsonl'
+
+        # a.de vollständig, b.de bricht nach der ersten Änderung ab
+        mock_client.zones.create_rrset.side_effect = [
+            MagicMock(), MagicMock(), MagicMock(), MagicMock(),
+            hcloud.APIException(code=503, message='Netzwerk', details={}),
+        ]
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver,
+                           upload=True, journal_file=str(journal))
+        dj.upload_zones()
+        first_serial = dj._serials['b.de']
+        created = [c.kwargs['name'] for c in mock_client.zones.create_rrset.call_args_list]
+        assert dj.report.domains['b.de']['upload']['status'] == 'failed'
+
+        mock_client.zones.create_rrset.reset_mock(side_effect=True)
+        mock_dns_resolver.resolve.reset_mock()
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver,
+                           upload=True, journal_file=str(journal), resume=True)
+        assert list(dj.zones) == ['b.de']
+        assert dj._serials['b.de'] == first_serial
+        mock_dns_resolver.resolve.assert_not_called()
+        dj.upload_zones()
+
+        resumed = [c.kwargs['name'] for c in mock_client.zones.create_rrset.call_args_list]
+        assert len(resumed) == 2
+        assert created[3] not in resumed
+        assert dj.report.domains['a.de']['upload']['status'] == 'skipped'
+        assert dj.report.domains['b.de']['upload']['status'] == 'ok'
+
+        # Alles erledigt: ein weiterer --resume hat nichts mehr zu tun
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver,
+                           upload=True, journal_file=str(journal), resume=True)
+        assert dj.zones == {}
+
+    def test_journal_eines_laufenden_laufs_bleibt_erhalten(
+        self, data_dir, config_file, mock_client, mock_dns_resolver, tmp_path, capsys
+    ):
+        """Ein zweiter Lauf mit demselben Journal bricht ab, statt es zu leeren."""
+        journal = tmp_path / 'journal.jsonl'
+        first = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                              upload=True, journal_file=str(journal))
+        content = journal.read_text(encoding='utf-8')
+
+        with pytest.raises(SystemExit) as exc_info:
+            make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                          upload=True, journal_file=str(journal))
+
+        assert exc_info.value.code == 1
+        assert 'wird bereits von einem anderen Lauf verwendet' in capsys.readouterr().out
+        assert journal.read_text(encoding='utf-8') == content
+        first.upload_zones()            # gibt das Journal frei
+        make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                      upload=True, journal_file=str(journal), resume=True)
+
+    def test_unvollstaendige_letzte_zeile_wird_ignoriert(self, tmp_path):
+        from dnsjinja.journal import load_journal
+        journal = tmp_path / 'journal.jsonl'
+        journal.write_text(
+            '{"event": "plan", "domain": "a.de", "serial": "2026101901", '
+            '"changes": [["create", "www", "A", 3600, ["192.0.2.1"]], ["delete", "old", "A", 3600, ["192.0.2.9"]]]}\n'
+            '{"event": "applied", "domain": "a.de", "index": 0}\n'
+            '{"event": "applied", "dom', encoding='utf-8')
+
+        state = load_journal(journal)
+
+        assert state.done == set()
+        assert [ch.name for ch in state.pending['a.de'].changes] == ['old']
+
+
+# ---------------------------------------------------------------------------
+# Streaming-Pipeline (--stream)
+# ---------------------------------------------------------------------------
+
+class TestStreaming:
+
+    DOMAINS = [f'domain{i}.de' for i in range(6)]
+
+    @pytest.fixture
+    def config_path(self, data_dir, mock_client):
+        zones = []
+        for name in self.DOMAINS:
+            z = MagicMock(); z.name = name; z.id = f'id-{name}'
+            zones.append(z)
+        mock_client.zones.get_all.return_value = zones
+        return write_config(data_dir, self.DOMAINS)
+
+    @pytest.mark.parametrize('jobs', [1, 2])
+    def test_domains_werden_einzeln_bearbeitet_und_freigegeben(
+        self, data_dir, config_path, mock_client, mock_dns_resolver, jobs
+    ):
+        """Während des Uploads ist nur die aktuelle Zone im Speicher."""
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver,
+                           upload=True, write_zone=True, stream=True, jobs=jobs)
+        assert dj.zones == {}
+        held = []
+        mock_client.zones.create_rrset.side_effect = lambda *a, **kw: held.append(list(dj.zones))
+
+        dj.process_zones()
+
+        assert held == [[d] for d in self.DOMAINS]
+        assert dj.zones == {} and dj._rrsets == {}
+        written = sorted(p.name.split('.zone')[0] for p in (data_dir / 'zone-files').iterdir())
+        assert written == self.DOMAINS
+        assert all(dj.report.domains[d]['upload']['status'] == 'ok' for d in self.DOMAINS)
+
+    def test_dry_run_gibt_zonen_fortlaufend_aus(
+        self, data_dir, config_path, mock_client, mock_dns_resolver
+    ):
+        import io
+        out = io.StringIO()
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, stream=True)
+
+        dj.dry_run(out)
+
+        text = out.getvalue()
+        assert [line.split()[1] for line in text.splitlines() if line.startswith('===')] == self.DOMAINS
+        assert dj.zones == {}
+
+
+# ---------------------------------------------------------------------------
+# Zonenliste: parallele Seitenabfrage und Cache
+# ---------------------------------------------------------------------------
+
+class TestZoneListCache:
+
+    @staticmethod
+    def _zones(names):
+        zones = []
+        for i, name in enumerate(names):
+            z = MagicMock(); z.name = name; z.id = 1000 + i
+            zones.append(z)
+        return zones
+
+    def test_alle_seiten_werden_gelesen(self, mock_client):
+        from dnsjinja.zone_cache import fetch_all_zones
+        mock_client.zones.get_all.return_value = self._zones([f'z{i}.de' for i in range(120)])
+
+        zones = fetch_all_zones(mock_client, workers=4)
+
+        assert [z.name for z in zones] == [f'z{i}.de' for i in range(120)]
+        pages = sorted(c.kwargs['page'] for c in mock_client.zones.get_list.call_args_list)
+        assert pages == [1, 2, 3]
+
+    def test_zonenliste_aus_cache_und_invalidierung(
+        self, data_dir, mock_client, mock_dns_resolver, tmp_path
+    ):
+        """Zweiter Lauf ohne API-Abfrage; eine unbekannte konfigurierte Domain lädt neu."""
+        import json
+        mock_client.zones.get_all.return_value = self._zones(['a.de', 'b.de'])
+        config_path = write_config(data_dir, ['a.de'])
+        cache_dir = tmp_path / 'cache'
+
+        make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, cache_dir=str(cache_dir))
+        assert mock_client.zones.get_list.call_count == 1
+
+        mock_client.zones.get_list.reset_mock()
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, cache_dir=str(cache_dir))
+        mock_client.zones.get_list.assert_not_called()
+        assert dj.config['domains']['a.de']['zone-id'] == 1000
+        assert dj.report.unconfigured == ['b.de']
+
+        mock_client.zones.get_all.return_value = self._zones(['a.de', 'b.de', 'c.de'])
+        config_path = write_config(data_dir, ['a.de', 'c.de'])
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, cache_dir=str(cache_dir))
+        assert mock_client.zones.get_list.call_count == 1
+        assert 'c.de' in dj.config['domains']
+
+        # abgelaufener Eintrag
+        cache_file = next((cache_dir / 'zones').glob('*.json'))
+        entry = json.loads(cache_file.read_text(encoding='utf-8'))
+        entry['fetched'] -= 3600
+        cache_file.write_text(json.dumps(entry), encoding='utf-8')
+        mock_client.zones.get_list.reset_mock()
+        make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, cache_dir=str(cache_dir))
+        assert mock_client.zones.get_list.call_count == 1
+
+
+# ---------------------------------------------------------------------------
+# Mehrere Hetzner-Projekte (global.projects)
+# ---------------------------------------------------------------------------
+
+class TestProjects:
+
+    @pytest.fixture
+    def setup(self, data_dir, monkeypatch):
+        import json
+        from unittest.mock import patch
+        from tests.conftest import make_config, paged_zones
+        config = make_config(['x.kunde-a.de', 'y.de', 'z.de'])
+        config['global']['projects'] = {
+            'a': {'token-env': 'TEST_TOKEN_A', 'domains': ['*.kunde-a.de']},
+            'b': {'token-env': 'TEST_TOKEN_B', 'rate': 1000, 'burst': 5},
+        }
+        config['domains']['y.de']['project'] = 'b'
+        config_path = data_dir / 'config' / 'config.json'
+        config_path.write_text(json.dumps(config), encoding='utf-8')
+        monkeypatch.setenv('TEST_TOKEN_A', 'token-a')
+        monkeypatch.setenv('TEST_TOKEN_B', 'token-b')
+
+        clients = {}
+        for token, names in (('token-a', ['x.kunde-a.de']), ('token-b', ['y.de']),
+                             ('test-token-unit', ['z.de'])):
+            client = MagicMock()
+            zones = []
+            for name in names:
+                z = MagicMock(); z.name = name; z.id = f'id-{name}'
+                zones.append(z)
+            client.zones.get_list.side_effect = \
+                lambda page=1, per_page=50, zones=zones, **kw: paged_zones(zones, page, per_page)
+            client.zones.get_rrset_all.return_value = []
+            clients[token] = client
+        with patch('dnsjinja.dnsjinja.Client') as mock_class:
+            mock_class.side_effect = lambda token, api_endpoint: clients[token]
+            yield config_path, clients
+
+    def test_domains_werden_ueber_ihr_projekt_hochgeladen(
+        self, data_dir, setup, mock_dns_resolver, capsys
+    ):
+        config_path, clients = setup
+        dj = make_dnsjinja(data_dir, config_path, None, mock_dns_resolver, upload=True)
+
+        assert sorted(dj.backends) == ['', 'a', 'b']
+        assert dj._project_of == {'x.kunde-a.de': 'a', 'y.de': 'b', 'z.de': ''}
+        assert dj.report.unconfigured == []
+        dj.upload_zones()
+
+        for token, domain in (('token-a', 'x.kunde-a.de'), ('token-b', 'y.de'), ('test-token-unit', 'z.de')):
+            zones = [c.args[0].name for c in clients[token].zones.create_rrset.call_args_list]
+            assert zones == [domain]
+        out = capsys.readouterr().out
+        assert 'Domäne y.de wurde bei Hetzner (b) erfolgreich aktualisiert' in out
+
+    def test_fehlendes_projekt_token(self, data_dir, setup, mock_dns_resolver, monkeypatch, capsys):
+        config_path, _ = setup
+        monkeypatch.delenv('TEST_TOKEN_B')
+        with pytest.raises(SystemExit):
+            make_dnsjinja(data_dir, config_path, None, mock_dns_resolver)
+        assert 'TEST_TOKEN_B' in capsys.readouterr().out
+
+    def test_anfrage_budget(self):
+        """Nach dem Burst wird auf das Budget gewartet."""
+        from unittest.mock import patch
+        from dnsjinja.ratelimit import TokenBucket, limit_client
+        client = MagicMock()
+        request = client._client.request
+        # Angehaltene Uhr: das Ergebnis hängt nicht von der Geschwindigkeit des Rechners ab
+        with patch('dnsjinja.ratelimit.time.monotonic', return_value=100.0), \
+                patch('dnsjinja.ratelimit.time.sleep') as sleep:
+            bucket = TokenBucket(rate=200, burst=2)
+            limit_client(client, bucket)
+            for _ in range(6):
+                client._client.request('GET', '/zones')
+
+        assert request.call_count == 6
+        assert [c.args[0] for c in sleep.call_args_list] == pytest.approx([1 / 200, 2 / 200, 3 / 200, 4 / 200])
+        assert bucket.waited == pytest.approx(10 / 200)
+
+    def test_hcloud_interna_vorhanden(self):
+        """Die Wrapper hängen an hcloud-Interna; fehlen sie, soll das sofort auffallen."""
+        from hcloud import Client
+        from dnsjinja.ratelimit import hcloud_base
+
+        assert callable(hcloud_base(Client(token='test-token')).request)
+        with pytest.raises(RuntimeError, match='wird nicht unterstützt'):
+            hcloud_base(object())
+
+
+# ---------------------------------------------------------------------------
+# Fragment-Cache für eingebundene Templates
+# ---------------------------------------------------------------------------
+
+class TestFragmentCache:
+
+    PARKED = ("{% include 'mail.inc' %}\n"
+              "{% include 'ns.inc' %}\n"
+              "{% include 'custom/' + domain + '.inc' ignore missing %}\n")
+
+    def _templates(self, data_dir):
+        templates = data_dir / 'templates'
+        (templates / 'custom').mkdir(exist_ok=True)
+        (templates / 'mail.inc').write_text(
+            '@ IN MX 10 {{ mx }}\n{{ domain }}. IN TXT "v=spf1 mx -all"\n', encoding='utf-8')
+        (templates / 'ns.inc').write_text(
+            '{% for ns in ["a.ns.example.net", "b.ns.example.net"] %}@ IN NS {{ ns }}.\n{% endfor %}', encoding='utf-8')
+        (templates / 'custom' / 'b.de.inc').write_text('www IN A 192.0.2.2\n', encoding='utf-8')
+        (templates / 'parked.tpl').write_text(TEST_TEMPLATE + self.PARKED, encoding='utf-8')
+
+    def _render(self, data_dir, mock_client, mock_dns_resolver, **kwargs):
+        import json
+        names = ['a.de', 'b.de', 'c.de', 'd.de']
+        zones = []
+        for name in names:
+            z = MagicMock(); z.name = name; z.id = f'id-{name}'
+            zones.append(z)
+        mock_client.zones.get_all.return_value = zones
+        config_path = write_config(data_dir, names)
+        config = json.loads(config_path.read_text(encoding='utf-8'))
+        for name in names:
+            config['domains'][name]['template'] = 'parked.tpl'
+            config['domains'][name]['mx'] = 'mx2.example.net.' if name == 'd.de' else 'mx.example.net.'
+        config_path.write_text(json.dumps(config), encoding='utf-8')
+        return make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, **kwargs)
+
+    def test_gleiche_fragmente_werden_wiederverwendet(
+        self, data_dir, mock_client, mock_dns_resolver, capsys
+    ):
+        """Parkdomains teilen sich Fragmente, die Ausgabe bleibt identisch."""
+        self._templates(data_dir)
+        cached = self._render(data_dir, mock_client, mock_dns_resolver)
+        plain = self._render(data_dir, mock_client, mock_dns_resolver, fragment_cache=False)
+
+        assert cached.zones == plain.zones
+        assert 'b.de. IN TXT' in cached.zones['b.de'] and 'www IN A 192.0.2.2' in cached.zones['b.de']
+        assert 'mx2.example.net.' in cached.zones['d.de']
+        # mail.inc: a/b/c teilen sich ein Fragment, d.de hat einen anderen MX;
+        # ns.inc: ein Fragment für alle; custom/b.de.inc liest nichts
+        assert cached.fragment_cache_stats() == (5, 4)
+        assert plain.fragment_cache_stats() == (0, 0)
+        parallel = self._render(data_dir, mock_client, mock_dns_resolver, jobs=2)
+        assert parallel.zones == plain.zones and sum(parallel.fragment_cache_stats()) == 9
+        assert 'Fragment-Cache: 5 von 9 Includes wiederverwendet (56 %)' in capsys.readouterr().out
+
+    def test_domain_in_ausdruecken_verhindert_ersetzung(self, data_dir):
+        """Wird `domain` weiterverarbeitet, gehört sie zum Cache-Schlüssel."""
+        from dnsjinja.render import FragmentCache, make_environment
+        templates = data_dir / 'templates'
+        (templates / 'upper.inc').write_text('{{ domain | upper }}\n', encoding='utf-8')
+        (templates / 'plain.inc').write_text('{{ domain }}\n', encoding='utf-8')
+        env = make_environment(templates)
+        cache = FragmentCache()
+        assert cache.info(env, 'plain.inc').origin_only
+        assert not cache.info(env, 'upper.inc').origin_only
+        (templates / 'main.tpl').write_text("{% include 'upper.inc' %}{% include 'plain.inc' %}", encoding='utf-8')
+        main = env.get_template('main.tpl')
+        assert main.render(domain='a.de') + main.render(domain='b.de') == 'A.DEa.deB.DEb.de'
+        assert (env.fragment_cache.hits, env.fragment_cache.misses) == (1, 3)
+
+    def test_vererbte_bloecke_werden_nicht_zwischengespeichert(self, data_dir):
+        """Zwei Templates erben von derselben Basis: ihre Blöcke bleiben erhalten."""
+        from dnsjinja.render import make_environment
+        templates = data_dir / 'templates'
+        (templates / 'base.tpl').write_text('head {{ domain }}\n{% block b %}default{% endblock %}', encoding='utf-8')
+        (templates / 'a.tpl').write_text("{% extends 'base.tpl' %}{% block b %}AAA{% endblock %}", encoding='utf-8')
+        (templates / 'b.tpl').write_text("{% extends 'base.tpl' %}{% block b %}BBB{% endblock %}", encoding='utf-8')
+        env = make_environment(templates)
+
+        assert env.get_template('a.tpl').render(domain='x.de') == 'head x.de\nAAA'
+        assert env.get_template('b.tpl').render(domain='x.de') == 'head x.de\nBBB'
+        assert env.fragment_cache.info(env, 'base.tpl') is None
+
+
+# ---------------------------------------------------------------------------
+# dnsjinja serve (HTTP-API)
+# ---------------------------------------------------------------------------
+
+class TestServe:
+
+    def _service(self, data_dir, mock_client, mock_dns_resolver, names):
+        from dnsjinja.server import ControlService
+        zones = []
+        for name in names:
+            z = MagicMock(); z.name = name; z.id = f'id-{name}'
+            zones.append(z)
+        mock_client.zones.get_all.return_value = zones
+        config_path = write_config(data_dir, names)
+        return ControlService(lambda: make_dnsjinja(data_dir, config_path, mock_client,
+                                                    mock_dns_resolver, stream=True))
+
+    def _request(self, httpd, method, path, body=None, token=''):
+        import json
+        import urllib.error
+        import urllib.request
+        url = f'http://127.0.0.1:{httpd.server_address[1]}{path}'
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(url, data=data, method=method)
+        if token:
+            req.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_auftraege_ueber_http(self, data_dir, mock_client, mock_dns_resolver):
+        """Render, Plan und Upload einzelner Domains über die HTTP-API."""
+        import threading
+        from dnsjinja.server import make_server
+        service = self._service(data_dir, mock_client, mock_dns_resolver, ['a.de', 'b.de'])
+        assert service.pipeline.zones == {}
+        httpd = make_server(service, port=0, token='geheim')
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        service.start()
+        try:
+            assert self._request(httpd, 'GET', '/health')[0] == 401
+            status, job = self._request(httpd, 'POST', '/jobs?wait=10',
+                                        {'action': 'render', 'domains': ['b.de']}, 'geheim')
+            assert status == 200 and job['status'] == 'ok'
+            assert job['result']['b.de']['render']['serial'] == service.pipeline.today + '01'
+            assert '$ORIGIN b.de.' in job['result']['b.de']['render']['zone']
+
+            status, job = self._request(httpd, 'POST', '/jobs?wait=10',
+                                        {'action': 'plan', 'domains': ['a.de']}, 'geheim')
+            assert job['status'] == 'ok'
+            assert ['create', '@', 'NS'] == job['result']['a.de']['plan']['changes'][0][:3]
+            mock_client.zones.create_rrset.assert_not_called()
+
+            status, job = self._request(httpd, 'POST', '/jobs?wait=10',
+                                        {'action': 'upload', 'domains': ['a.de']}, 'geheim')
+            assert job['result']['a.de']['upload']['status'] == 'ok'
+            mock_client.zones.create_rrset.assert_called()
+
+            status, body = self._request(httpd, 'POST', '/jobs', {'action': 'upload', 'domains': ['x.de']}, 'geheim')
+            assert status == 400 and 'x.de' in body['error']
+            status, body = self._request(httpd, 'GET', f'/jobs/{job["id"]}', token='geheim')
+            assert status == 200 and body['action'] == 'upload'
+            status, metrics = self._request(httpd, 'GET', '/metrics', token='geheim')
+            assert metrics['actions']['render']['jobs'] == 1 and metrics['queued'] == 0
+            assert service.pipeline.zones == {}
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            service.stop()
+
+    def test_ungueltige_anfragen(self, data_dir, mock_client, mock_dns_resolver):
+        """Falsche Typen und Wartezeiten ergeben 400 statt eines abgebrochenen Handlers."""
+        import threading
+        from dnsjinja.server import make_server
+        service = self._service(data_dir, mock_client, mock_dns_resolver, ['a.de'])
+        httpd = make_server(service, port=0)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        try:
+            for body in ({'action': 'render', 'domains': 5}, {'action': 'render', 'domains': {'a.de': 1}},
+                         {'action': 'render', 'domains': ['a.de', 7]}, {'action': ['render'], 'domains': ['a.de']},
+                         {'action': 'render', 'domains': None}):
+                status, answer = self._request(httpd, 'POST', '/jobs', body)
+                assert status == 400 and 'Ungültige Anfrage' in answer['error'], body
+            for wait in ('inf', 'nan', '-1', '100000', 'bald'):
+                status, answer = self._request(httpd, 'POST', f'/jobs?wait={wait}',
+                                               {'action': 'render', 'domains': ['a.de']})
+                assert status == 400, wait
+            assert service.jobs == {}
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+    def test_wartende_auftraege_werden_zusammengefasst(self, data_dir, mock_client, mock_dns_resolver):
+        """Solange ein Auftrag wartet, nimmt er weitere Domains derselben Aktion auf."""
+        service = self._service(data_dir, mock_client, mock_dns_resolver, ['a.de', 'b.de', 'c.de'])
+        first = service.submit('render', ['a.de'])
+        assert service.submit('render', ['b.de', 'a.de']) is first
+        other = service.submit('backup', ['c.de'])
+        assert other is not first and first.domains == ['a.de', 'b.de']
+
+        service.start()
+        try:
+            assert first.done.wait(10) and other.done.wait(10)
+        finally:
+            service.stop()
+        assert first.status == 'ok' and set(first.result) == {'a.de', 'b.de'}
+        assert other.result['c.de']['backup']['status'] == 'ok'
+        with pytest.raises(ValueError):
+            service.submit('löschen', ['a.de'])
+
+
+# ---------------------------------------------------------------------------
+# dnsjinja audit
+# ---------------------------------------------------------------------------
+
+class TestAudit:
+
+    @staticmethod
+    def _remote(rrsets):
+        """hcloud-RRSets zum Stand {(name, typ): (ttl, records)}."""
+        result = []
+        for (name, rdtype), (ttl, records) in rrsets.items():
+            rrset = MagicMock(); rrset.name = name; rrset.type = rdtype; rrset.ttl = ttl
+            rrset.records = [MagicMock(value=v) for v in records]
+            rrset.protection = None
+            result.append(rrset)
+        return result
+
+    def test_live_serials(self, dns_server):
+        """SOA-Zähler werden von allen Nameservern gleichzeitig abgefragt."""
+        from dnsjinja.audit import live_serials
+        serials = live_serials(['example.com', 'fremd.de'], ['127.0.0.1'], port=dns_server.port, timeout=2)
+        assert serials == {'example.com': 2026020101, 'fremd.de': None}
+
+    def test_nur_abweichende_zaehler_werden_verglichen(
+        self, data_dir, config_file, mock_client, mock_dns_resolver, tmp_path, capsys
+    ):
+        """Erst nach geändertem SOA-Zähler werden die RRSets geladen; Änderungen → 252."""
+        from unittest.mock import patch
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                           upload=True, cache_dir=str(tmp_path / 'cache'))
+        dj.upload_zones()
+        uploaded = dj.sync_state.load('example.com')[0]
+        mock_client.zones.get_rrset_all.return_value = self._remote(uploaded)
+        mock_client.zones.get_rrset_all.reset_mock()
+
+        auditor = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                                stream=True, cache_dir=str(tmp_path / 'cache'))
+        rendered = int(dj._serials['example.com'])
+        with patch('dnsjinja.dnsjinja.live_serials', return_value={'example.com': rendered}):
+            (after_upload,) = auditor.audit_zones()
+        assert (after_upload.status, after_upload.check) == ('ok', 'serial')
+        mock_client.zones.get_rrset_all.assert_not_called()
+
+        with patch('dnsjinja.dnsjinja.live_serials', return_value={'example.com': rendered + 1}):
+            (first,) = auditor.audit_zones()
+            (second,) = auditor.audit_zones()
+        assert (first.status, first.check) == ('ok', 'full')
+        assert (second.status, second.check) == ('ok', 'serial')
+        assert mock_client.zones.get_rrset_all.call_count == 1
+
+        changed = dict(uploaded)
+        changed[('www', 'A')] = (300, ['192.0.2.99'])
+        mock_client.zones.get_rrset_all.return_value = self._remote(changed)
+        with patch('dnsjinja.dnsjinja.live_serials', return_value={'example.com': rendered + 2}):
+            (third,) = auditor.audit_zones()
+        assert third.status == 'drift' and third.changes[0][:3] == ('delete', 'www', 'A')
+        assert auditor.exit_status_file.read_text(encoding='utf-8') == '252'
+        out = capsys.readouterr().out
+        assert 'example.com wurde außerhalb von dnsjinja geändert' in out
+        assert '1 per SOA-Zähler bestätigt' in out
+
+    def test_upload_ohne_aenderungen_behaelt_bestaetigten_zaehler(
+        self, data_dir, config_file, mock_client, mock_dns_resolver, tmp_path
+    ):
+        """Ein Upload ohne Änderungen verwirft den vom Audit bestätigten SOA-Zähler nicht."""
+        cache_dir = str(tmp_path / 'cache')
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver, upload=True, cache_dir=cache_dir)
+        dj.upload_zones()
+        uploaded, serial = dj.sync_state.load('example.com')
+        assert dj._changes['example.com'] and serial == int(dj._serials['example.com'])
+        dj.sync_state.save('example.com', uploaded, 4711)      # vom Audit bestätigt
+        mock_client.zones.get_rrset_all.return_value = self._remote(uploaded)
+
+        again = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver, upload=True, cache_dir=cache_dir)
+        again.upload_zones()
+
+        assert again._changes['example.com'] == []
+        assert again.sync_state.load('example.com') == (uploaded, 4711)
+
+
+# ---------------------------------------------------------------------------
+# Offline-Plan gegen das neueste Backup
+# ---------------------------------------------------------------------------
+
+class TestOfflinePlan:
+
+    def test_vergleich_mit_neuestem_backup(self, data_dir, config_file, mock_dns_resolver, capsys):
+        """Ohne Token und Netzwerk: Vergleich der gerenderten Zone mit dem neuesten Backup."""
+        from unittest.mock import patch
+        backups = data_dir / 'zone-backups'
+        (backups / 'example.com.zone.2026010101').write_text(
+            TEST_TEMPLATE.replace('{{ domain }}', 'example.com').replace('{{ soa_serial }}', '2026010101')
+            + 'alt IN A 192.0.2.1\n', encoding='utf-8')
+        (backups / 'example.com.zone.2026020101').write_text(
+            TEST_TEMPLATE.replace('{{ domain }}', 'example.com').replace('{{ soa_serial }}', '2026020101')
+            + 'www IN A 192.0.2.2\n', encoding='utf-8')
+
+        with patch('dnsjinja.dnsjinja.Client') as client_class:
+            dj = DNSJinja(datadir=str(data_dir), config_file=str(config_file), offline=True, stream=True)
+            plans = dj.plan_zones()
+
+        client_class.assert_not_called()
+        mock_dns_resolver.resolve.assert_not_called()
+        assert dj.latest_backup('example.com').name == 'example.com.zone.2026020101'
+        assert dj._serials['example.com'] == dj.today + '01'
+        assert [ch[:3] for ch in plans['example.com']] == [('delete', 'www', 'A')]
+        out = capsys.readouterr().out
+        assert 'example.com: 1 Änderung(en) (gegen example.com.zone.2026020101)' in out
+        assert 'delete www A 3600 192.0.2.2' in out
+
+    def test_ohne_backup_wird_fehler_gemeldet(self, data_dir, config_file, mock_dns_resolver, capsys):
+        dj = DNSJinja(datadir=str(data_dir), config_file=str(config_file), offline=True, stream=True)
+        assert dj.plan_zones(['example.com']) == {}
+        assert dj.report.domains['example.com']['plan']['status'] == 'failed'
+        assert 'kein Backup' in capsys.readouterr().out
+
+
+# ---------------------------------------------------------------------------
+# Große Zonen: RRSets direkt aus dem Zone-File lesen
+# ---------------------------------------------------------------------------
+
+class TestLargeZone:
+
+    ZONE = (
+        '$ORIGIN example.com.\n'
+        '$TTL 3600\n'
+        '@ IN SOA ns1.example.net. hostmaster.example.net. 2026101901 86400 10800 3600000 3600\n'
+        '@ IN NS ns1.example.net.\n'
+        'example.com. IN NS ns2\n'
+        '@ 300 IN MX 20 mail2.example.net.\n'
+        '@ IN MX 10 mail\n'
+        '@ IN TXT "v=spf1 mx -all" "zweiter Teil"\n'
+        '@ IN CAA 0 issue "letsencrypt.org"\n'
+        'www IN CNAME @\n'
+        'mail IN A 192.0.2.1\n'
+        'mail.example.com. 60 IN A 192.0.2.1\n'
+        '    IN AAAA 2001:db8::1\n'
+        '$TTL 120\n'
+        '_sip._tcp IN SRV 10 5 5060 sip.example.net.\n'
+        'a.b.c IN A 192.0.2.3\n'
+        'fremd.example.org. IN A 192.0.2.5\n'
+        '$ORIGIN sub.example.com.\n'
+        'host IN A 192.0.2.4\n'
+    )
+
+    def test_gleiches_ergebnis_wie_dns_zone(self):
+        import dns.name
+        import dns.zone
+        from dnsjinja.backends import text_to_rrsets, zone_to_rrsets
+        expected = zone_to_rrsets(dns.zone.from_text(self.ZONE, origin=dns.name.from_text('example.com')))
+        rrsets = text_to_rrsets(self.ZONE, 'example.com')
+        assert rrsets == expected
+        assert rrsets[('mail', 'A')] == (60, ['192.0.2.1'])
+        assert ('host.sub', 'A') in rrsets
+
+    def test_andere_reader_schnittstelle_liest_ueber_dns_zone(self, monkeypatch, tmp_path, caplog):
+        """Fehlt eine vom Reader erwartete Methode (andere dnspython-Version), bleibt das Ergebnis gleich
+        und es wird nur einmal gewarnt."""
+        from dnsjinja import backends
+        from dnsjinja.backends import _RRSetSink, text_to_rrsets, zone_file_rrsets
+        expected = text_to_rrsets(self.ZONE, 'example.com')
+        path = tmp_path / 'example.com.zone'
+        path.write_text(self.ZONE, encoding='utf-8')
+        monkeypatch.delattr(_RRSetSink, 'origin_information')
+        monkeypatch.setattr(backends, '_reader_ok', None)
+
+        assert text_to_rrsets(self.ZONE, 'example.com') == expected
+        assert text_to_rrsets(self.ZONE, 'example.com') == expected
+        assert {k: (r.ttl, r.records) for k, r in zone_file_rrsets(str(path), 'example.com').items()} == expected
+        assert len([r for r in caplog.records if 'Reader nicht nutzbar' in r.getMessage()]) == 1
+
+    def test_fehler_im_sink_werden_nicht_verschluckt(self, monkeypatch):
+        """Passt die Schnittstelle, kommen Fehler beim Lesen unverändert an."""
+        from dnsjinja import backends
+        from dnsjinja.backends import _RRSetSink, text_to_rrsets
+        monkeypatch.setattr(backends, '_reader_ok', True)
+
+        def add(self, name, ttl, rdata):
+            raise AttributeError('Fehler im Sink')
+        monkeypatch.setattr(_RRSetSink, 'add', add)
+
+        with pytest.raises(AttributeError, match='Fehler im Sink'):
+            text_to_rrsets(self.ZONE, 'example.com')
+
+    def test_owner_namen_werden_interniert(self):
+        from dnsjinja.backends import text_to_rrsets
+        rrsets = text_to_rrsets(self.ZONE, 'example.com')
+        names = {name for name, _ in rrsets if name == 'mail'}
+        assert len({id(name) for name, _ in rrsets if name in names}) == 1
+
+    @pytest.mark.parametrize('extra, error', [
+        ('www IN A 192.0.2.9\n', 'CNAMEAndOtherData'),
+        ('kaputt IN A 999.0.0.1\n', 'SyntaxError'),
+    ])
+    def test_fehler_wie_dns_zone(self, extra, error):
+        import dns.name
+        import dns.zone
+        from dnsjinja.backends import text_to_rrsets
+        text = self.ZONE.replace('$ORIGIN sub.example.com.\n', '') + extra
+        with pytest.raises(Exception) as expected:
+            dns.zone.from_text(text, origin=dns.name.from_text('example.com'))
+        with pytest.raises(type(expected.value)) as e:
+            text_to_rrsets(text, 'example.com')
+        assert type(e.value).__name__ == error
+
+    def test_ohne_soa_oder_ns(self):
+        import dns.zone
+        from dnsjinja.backends import text_to_rrsets
+        with pytest.raises(dns.zone.NoSOA):
+            text_to_rrsets('$ORIGIN example.com.\n@ 60 IN NS ns1.example.net.\n', 'example.com')
+        with pytest.raises(dns.zone.NoNS):
+            text_to_rrsets('$ORIGIN example.com.\n'
+                           '@ 60 IN SOA ns1 hostmaster 1 2 3 4 5\n', 'example.com')
+
+    def test_spitzenspeicher_deutlich_geringer(self):
+        """Benchmark: 3 000 RRSets, Spitzenspeicher gegenüber dns.zone + zone_to_rrsets."""
+        import tracemalloc
+        import dns.name
+        import dns.zone
+        from dnsjinja.backends import text_to_rrsets, zone_to_rrsets
+        lines = [self.ZONE]
+        for i in range(1000):
+            lines.append(f'_acme-challenge.h{i} 60 IN TXT "token-{i:08d}-abcdefghijklmnopqrstuvwxyz"\n')
+            lines.append(f'h{i} IN A 10.0.{i // 256}.{i % 256}\n')
+            lines.append(f'h{i} IN AAAA 2001:db8::{i:x}\n')
+        text = ''.join(lines)
+
+        def peak(fn):
+            tracemalloc.start()
+            try:
+                result = fn()
+                return result, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        expected, zone_peak = peak(
+            lambda: zone_to_rrsets(dns.zone.from_text(text, origin=dns.name.from_text('example.com'))))
+        rrsets, stream_peak = peak(lambda: text_to_rrsets(text, 'example.com'))
+        assert rrsets == expected
+        assert len(rrsets) > 3000
+        assert zone_peak / stream_peak >= 2
+
+
+# ---------------------------------------------------------------------------
+# Reihenfolge paralleler Läufe nach Dauer früherer Läufe
+# ---------------------------------------------------------------------------
+
+class TestSchedule:
+
+    DOMAINS = ['a.de', 'b.de', 'c.de', 'd.de', 'e.de', 'f.de', 'g.de', 'gross.de']
+
+    def _dnsjinja(self, data_dir, mock_client, mock_dns_resolver, tmp_path, **kwargs):
+        config_path = write_config(data_dir, self.DOMAINS)
+        mock_client.zones.get_all.return_value = TestZoneListCache._zones(self.DOMAINS)
+        return make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver,
+                             cache_dir=str(tmp_path / 'cache'), **kwargs)
+
+    def test_schaetzung_ohne_messung_nach_rrset_zahl(self, tmp_path):
+        from dnsjinja.schedule import DurationHistory, longest_first
+        config_path = tmp_path / 'config.json'
+        config_path.write_text('{}', encoding='utf-8')
+        history = DurationHistory(tmp_path, config_path)
+        history.record('upload', 'a.de', 2.0, 100)
+        history.record('upload', 'b.de', 1.0, 100)
+        assert history.estimate('upload', 'a.de', 100) == 2.0
+        # 3 s für 200 RRSets gemessen → 0,015 s je RRSet
+        assert history.estimate('upload', 'neu.de', 1000) == pytest.approx(15.0)
+        history.record('upload', 'a.de', 4.0, 100)
+        assert history.estimate('upload', 'a.de', 100) == 3.0
+        rrsets = {'a.de': 100, 'b.de': 100, 'neu.de': 1000}
+        assert longest_first(['a.de', 'b.de', 'neu.de'],
+                             lambda d: history.estimate('upload', d, rrsets[d])) == ['neu.de', 'a.de', 'b.de']
+
+    def test_speichern_behaelt_eintraege_anderer_laeufe(self, tmp_path):
+        from dnsjinja.schedule import DurationHistory
+        config_path = tmp_path / 'config.json'
+        config_path.write_text('{}', encoding='utf-8')
+        first, second = DurationHistory(tmp_path, config_path), DurationHistory(tmp_path, config_path)
+        first.record('backup', 'a.de', 1.0, 10)
+        first.save()
+        second.record('backup', 'b.de', 2.0, 20)
+        second.save()
+        assert DurationHistory(tmp_path, config_path).entries == {
+            'backup': {'a.de': [1.0, 10], 'b.de': [2.0, 20]}}
+
+    def test_dauer_wird_je_domain_gespeichert(
+        self, data_dir, mock_client, mock_dns_resolver, tmp_path
+    ):
+        dj = self._dnsjinja(data_dir, mock_client, mock_dns_resolver, tmp_path, backup=True)
+        dj.backup_zones()
+        entries = type(dj.durations)(dj.cache_dir, dj.config_file).entries
+        assert set(entries['backup']) == set(self.DOMAINS)
+        assert all(rrsets > 0 for _, rrsets in entries['backup'].values())
+
+    def test_laengste_domain_zuerst(self, data_dir, mock_client, mock_dns_resolver, tmp_path, capsys):
+        """Eine große Zone am Ende der Konfiguration verlängert den Lauf nicht mehr."""
+        seconds = {d: 0.05 for d in self.DOMAINS[:-1]}
+        seconds['gross.de'] = 0.35
+        dj = self._dnsjinja(data_dir, mock_client, mock_dns_resolver, tmp_path, workers=2)
+        for domain, s in seconds.items():
+            dj.durations.record('backup', domain, s, 10)
+        assert dj.schedule('backup', self.DOMAINS)[0] == 'gross.de'
+
+        import time
+        started = []
+        start = time.monotonic()
+        dj._for_each_domain(lambda d: (started.append(d), time.sleep(seconds[d])), phase='backup')
+        elapsed = time.monotonic() - start
+
+        assert started[0] == 'gross.de'
+        # Konfigurationsreihenfolge: 4 × 0,05 s + 0,35 s; längste zuerst: max(0,35, 0,7 / 2)
+        assert elapsed < 0.5
+        assert 'Backup: 8 Domain(s)' in capsys.readouterr().out
+
+
+# ---------------------------------------------------------------------------
+# Zeitbudget (--deadline) und Fristen je Aufruf
+# ---------------------------------------------------------------------------
+
+class TestDeadline:
+
+    DOMAINS = ['a.de', 'b.de', 'c.de']
+
+    def _dnsjinja(self, data_dir, mock_client, mock_dns_resolver, **kwargs):
+        config_path = write_config(data_dir, self.DOMAINS)
+        mock_client.zones.get_all.return_value = TestZoneListCache._zones(self.DOMAINS)
+        return make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver, **kwargs)
+
+    def test_frist_begrenzt_einzelne_aufrufe(self):
+        from dnsjinja.deadline import MIN_CALL_TIMEOUT, Deadline
+        unbounded = Deadline()
+        assert unbounded.remaining() is None and unbounded.cap(30.0) == 30.0
+        deadline = Deadline(10.0)
+        assert 9.0 < deadline.cap(30.0) <= 10.0
+        assert deadline.cap(5.0) == 5.0
+        deadline.expire('Test')
+        assert deadline.expired() and deadline.reason == 'Test'
+        assert deadline.cap(30.0) == MIN_CALL_TIMEOUT
+
+    def test_timeout_je_api_anfrage(self):
+        from dnsjinja.deadline import Deadline, timeout_client
+        client = MagicMock()
+        request = client._client.request
+        timeout_client(client, 30.0, Deadline(5.0))
+        client._client.request('GET', '/zones')
+        assert request.call_args.kwargs['timeout'] <= 5.0
+        client._client.request('GET', '/zones', timeout=2.0)
+        assert request.call_args.kwargs['timeout'] == 2.0
+
+    def test_timeout_an_echtem_hcloud_client(self):
+        """Die Frist hängt an hcloud-Interna: mit der installierten Version muss die Anfrage sie erhalten."""
+        from unittest.mock import patch
+        from hcloud import Client
+        from dnsjinja.deadline import Deadline, timeout_client
+        client = Client(token='test-token')
+        with patch.object(client._client, '_session') as session:
+            session.request.return_value.status_code = 200
+            session.request.return_value.content = b'{}'
+            timeout_client(client, 30.0, Deadline(5.0))
+            client._client.request('GET', '/zones')
+        assert 0 < session.request.call_args.kwargs['timeout'] <= 5.0
+
+    def test_soa_abfrage_mit_frist(self, data_dir, config_file, mock_client, mock_dns_resolver):
+        make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver, dns_timeout=2.5)
+        assert mock_dns_resolver.resolve.call_args.kwargs['lifetime'] == 2.5
+
+    def test_keine_weiteren_domains_nach_ablauf(
+        self, data_dir, mock_client, mock_dns_resolver, tmp_path, capsys
+    ):
+        """Die laufende Domain wird fertig, weitere werden als übersprungen gemeldet (251)."""
+        import json
+        report_file = tmp_path / 'report.json'
+        dj = self._dnsjinja(data_dir, mock_client, mock_dns_resolver, backup=True, upload=True,
+                            report_file=str(report_file))
+
+        def export(zone):
+            dj.deadline.expire('Frist von 60 s abgelaufen')
+            return MagicMock(zonefile='')
+
+        mock_client.zones.export_zonefile.side_effect = export
+        dj.backup_zones()
+        dj.upload_zones()
+        dj.report_deadline()
+        dj.write_report()
+
+        report = json.loads(report_file.read_text(encoding='utf-8'))
+        assert report['exit_code'] == 251
+        assert report['domains']['a.de']['backup']['status'] == 'ok'
+        for domain in ('b.de', 'c.de'):
+            assert report['domains'][domain]['backup'] == {
+                'status': 'skipped', 'message': 'Frist von 60 s abgelaufen'}
+        assert {report['domains'][d]['upload']['status'] for d in self.DOMAINS} == {'skipped'}
+        mock_client.zones.get_rrset_all.assert_not_called()
+        out = capsys.readouterr().out
+        assert out.count('weitere Domains werden nicht begonnen') == 1
+        assert '3 Domain(s) wegen Frist von 60 s abgelaufen nicht (vollständig) bearbeitet' in out
+
+    def test_streaming_rendert_nach_ablauf_nicht_weiter(
+        self, data_dir, mock_client, mock_dns_resolver
+    ):
+        dj = self._dnsjinja(data_dir, mock_client, mock_dns_resolver, upload=True, stream=True)
+        upload_zone = dj._upload_zone
+
+        def upload_once(domain):
+            upload_zone(domain)
+            dj.deadline.expire()
+
+        dj._upload_zone = upload_once
+        dj.process_zones()
+        assert dj.report.domains['a.de']['upload']['status'] == 'ok'
+        assert dj.report.domains['b.de'] == {'render': {'status': 'skipped', 'message': 'Abbruch angefordert'}}
+        assert 'c.de' not in dj._serials
+        assert dj.exit_status_file.read_text(encoding='utf-8') == '251'
+
+
+# ---------------------------------------------------------------------------
+# Minimale API-Aufrufe je RRSet
+# ---------------------------------------------------------------------------
+
+class TestUpdateOperations:
+
+    @staticmethod
+    def _update(current_ttl, current, ttl, records):
+        from dnsjinja.backends import RemoteRRSet, RRSetChange
+        return RRSetChange('update', '_acme-challenge', 'TXT', ttl, records,
+                           RemoteRRSet(current_ttl, current, handle=MagicMock()))
+
+    def test_nur_ttl_geaendert(self):
+        from dnsjinja.backends import RRSetOperation, update_operations
+        assert update_operations(self._update(300, ['"a"', '"b"'], 60, ['"a"', '"b"'])) == [
+            RRSetOperation('ttl', [])]
+
+    def test_einzelner_record_ergaenzt_oder_entfernt(self):
+        from dnsjinja.backends import RRSetOperation, update_operations
+        current = [f'"token-{i}"' for i in range(10)]
+        assert update_operations(self._update(60, current, 60, sorted(current + ['"neu"']))) == [
+            RRSetOperation('add', ['"neu"'])]
+        assert update_operations(self._update(60, current, 300, current[1:])) == [
+            RRSetOperation('remove', ['"token-0"']), RRSetOperation('ttl', [])]
+
+    def test_ergaenzen_und_entfernen_ersetzt_vollstaendig(self):
+        from dnsjinja.backends import RRSetOperation, update_operations
+        assert update_operations(self._update(60, ['"a"', '"b"'], 60, ['"b"', '"c"'])) == [
+            RRSetOperation('set', ['"b"', '"c"'])]
+
+    def test_upload_ruft_nur_noetige_api_methoden(
+        self, data_dir, config_file, mock_client, mock_dns_resolver, capsys
+    ):
+        """Ein neuer ACME-Token: add_records statt set_records; TTL allein: change_ttl."""
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver, upload=True)
+        desired = dj._parse_zone_rrsets('example.com')
+        current = dict(desired)
+        ns_ttl, ns_records = desired[('@', 'NS')]
+        current[('@', 'NS')] = (ns_ttl + 60, ns_records)
+        desired[('_acme-challenge', 'TXT')] = (60, ['"alt-1"', '"alt-2"', '"neu"'])
+        current[('_acme-challenge', 'TXT')] = (60, ['"alt-1"', '"alt-2"'])
+        mock_client.zones.get_rrset_all.return_value = TestAudit._remote(current)
+
+        dj.upload_zones()
+
+        zones = mock_client.zones
+        zones.set_rrset_records.assert_not_called()
+        (handle, records), _ = zones.add_rrset_records.call_args
+        assert handle.name == '_acme-challenge' and [r.value for r in records] == ['"neu"']
+        zones.change_rrset_ttl.assert_called_once()
+        assert dj.report.domains['example.com']['upload'] == {
+            'status': 'ok', 'changes': 2, 'requests': 2, 'saved_requests': 1}
+        assert ('Upload: 2 Schreibanfrage(n) mit 1 Record(s), '
+                'eingespart: 1 Anfrage(n), 5 Record(s)') in capsys.readouterr().out
+
+
+# ---------------------------------------------------------------------------
+# remote-state: aktueller Stand per AXFR statt über die REST-API
+# ---------------------------------------------------------------------------
+
+class TestAxfrRemoteState:
+
+    @staticmethod
+    def _make(data_dir, dns_server, template=TestRfc2136Backend.ZONE_TEMPLATE, **kwargs):
+        import json
+        from tests.conftest import make_config, TSIG_KEY_NAME, TSIG_SECRET
+        (data_dir / 'templates' / 'test.tpl').write_text(template, encoding='utf-8')
+        cfg = make_config(['example.com'])
+        cfg['global']['remote-state'] = {
+            'type': 'axfr', 'server': '127.0.0.1', 'port': dns_server.port,
+            'tsig-key-name': TSIG_KEY_NAME, 'timeout': 5,
+        }
+        config_path = data_dir / 'config' / 'config.json'
+        config_path.write_text(json.dumps(cfg), encoding='utf-8')
+        return DNSJinja(datadir=str(data_dir), config_file=str(config_path), auth_api_token='test-token-unit',
+                        tsig_secret=TSIG_SECRET, **kwargs)
+
+    def test_upload_liest_stand_per_axfr(self, data_dir, dns_server, mock_client, mock_dns_resolver):
+        """Der Stand kommt per Zonentransfer; geschrieben wird weiterhin über die API."""
+        dj = self._make(data_dir, dns_server, upload=True)
+
+        dj.upload_zones()
+
+        zones = mock_client.zones
+        zones.get_rrset_all.assert_not_called()
+        assert dns_server.transfers == {'example.com': 1}
+        (deleted,), _ = zones.delete_rrset.call_args
+        assert (deleted.name, deleted.type, deleted.zone.id) == ('old', 'A', 'test-zone-id-123')
+        (handle, records), _ = zones.set_rrset_records.call_args
+        assert handle.name == '@' and [r.value for r in records] == ['192.0.2.99']
+        zones.add_rrset_records.assert_not_called()
+        assert {c.kwargs['name'] for c in zones.create_rrset.call_args_list} == {'@', 'mail', 'www'}
+
+    @pytest.mark.parametrize('listing', ['geschuetzt', 'fehler'])
+    def test_geschuetzte_rrsets_bleiben_unveraendert(
+        self, data_dir, dns_server, mock_client, mock_dns_resolver, listing
+    ):
+        """Den Schutz liefert die API (eine Anfrage je Zone), ohne sie gelten SOA und NS am Apex als geschützt."""
+        template = TestRfc2136Backend.ZONE_TEMPLATE.replace(
+            '@ IN NS hydrogen.ns.hetzner.com.\n', '@ IN NS hydrogen.ns.hetzner.com.\n@ IN NS oxygen.ns.hetzner.com.\n')
+        dj = self._make(data_dir, dns_server, template, upload=True)
+        zones = mock_client.zones
+        if listing == 'fehler':
+            zones.get_rrset_list.side_effect = hcloud.APIException(code='forbidden', message='', details={})
+        else:
+            ns = MagicMock(); ns.name = '@'; ns.type = 'NS'; ns.protection = {'change': True}
+            zones.get_rrset_list.return_value.rrsets = [ns]
+
+        dj.upload_zones()
+
+        zones.get_rrset_list.assert_called_once()
+        assert dj.report.domains['example.com']['upload']['status'] == 'ok'
+        assert [c.args[0].type for c in zones.set_rrset_records.call_args_list] == ['A']
+
+    def test_prefetch_gleichzeitig_fehler_erst_beim_zugriff(self, dns_server):
+        """Vorab gelesene Zonen werden einmal ausgeliefert; ein fehlgeschlagener Transfer erst beim Zugriff gemeldet."""
+        import dns.tsig
+        from dnsjinja.backends import AxfrStateReader, BackendError
+        from tests.conftest import TSIG_KEY_NAME, TSIG_SECRET
+        reader = AxfrStateReader('127.0.0.1', dns_server.port, dns.tsig.Key(TSIG_KEY_NAME, TSIG_SECRET), timeout=5)
+
+        reader.prefetch(['example.com', 'unknown.example'])
+
+        assert reader.transfers == 2
+        assert reader.rrsets('example.com')[('old', 'A')] == (3600, ['192.0.2.50'])
+        with pytest.raises(BackendError):
+            reader.rrsets('unknown.example')
+        reader.rrsets('example.com')        # erneut: nicht mehr vorab gelesen
+        assert dns_server.transfers == {'example.com': 2}
+
+    def test_axfr_ohne_server_ungueltig(self):
+        from pydantic import ValidationError
+        from dnsjinja.dnsjinja_config_schema import RemoteStateConfig
+        with pytest.raises(ValidationError):
+            RemoteStateConfig.model_validate({'type': 'axfr'})
+
+
+# ---------------------------------------------------------------------------
+# Vorab-Schätzung der API-Anfragen und --max-api-calls
+# ---------------------------------------------------------------------------
+
+class TestApiBudget:
+
+    @staticmethod
+    def _make(data_dir, mock_client, priorities, **kwargs):
+        import json
+        from tests.conftest import make_config
+        cfg = make_config(list(priorities))
+        for domain, priority in priorities.items():
+            cfg['domains'][domain]['priority'] = priority
+        config_path = data_dir / 'config' / 'config.json'
+        config_path.write_text(json.dumps(cfg), encoding='utf-8')
+        TestParallelRendering._zones(mock_client, list(priorities))
+        return DNSJinja(datadir=str(data_dir), config_file=str(config_path), auth_api_token='test-token-unit',
+                        cache_dir=str(data_dir / 'cache'), upload=True, **kwargs)
+
+    def test_schaetzung_aus_gespeichertem_stand(self, data_dir, mock_client, mock_dns_resolver, capsys):
+        """Ohne gespeicherten Stand je RRSet eine Anfrage, danach nur noch der Abruf."""
+        dj = self._make(data_dir, mock_client, {'example.com': 0})
+        rrsets = len(dj._parse_zone_rrsets('example.com'))
+
+        assert dj.estimate_api_calls('example.com') == ('example.com', 1, rrsets, False)
+        dj.upload_zones()
+        assert f'geschätzt 1 Abruf(e) und {rrsets} Schreibanfrage(n)' in capsys.readouterr().out
+
+        dj = self._make(data_dir, mock_client, {'example.com': 0})
+        assert dj.estimate_api_calls('example.com') == ('example.com', 1, 0, True)
+
+    def test_reject_laedt_nichts_hoch(self, data_dir, mock_client, mock_dns_resolver, capsys):
+        dj = self._make(data_dir, mock_client, {'example.com': 0}, max_api_calls=1)
+
+        dj.upload_zones()
+
+        mock_client.zones.get_rrset_all.assert_not_called()
+        mock_client.zones.create_rrset.assert_not_called()
+        assert dj.report.domains['example.com']['upload']['status'] == 'skipped'
+        assert dj.exit_status_file.read_text(encoding='utf-8') == '250'
+        assert 'Upload wird nicht begonnen' in capsys.readouterr().out
+
+    def test_rate_limit_an_echtem_hcloud_client(self):
+        """Der Hook hängt an der requests-Session des installierten hcloud."""
+        import requests
+        from unittest.mock import patch
+        from hcloud import Client
+        from dnsjinja.ratelimit import RateLimitStatus, track_rate_limit
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{}'
+        response.headers.update({'RateLimit-Limit': '3600', 'RateLimit-Remaining': '42'})
+        client = Client(token='test-token')
+        status = RateLimitStatus()
+        track_rate_limit(client, status)
+
+        with patch('requests.adapters.HTTPAdapter.send', return_value=response):
+            client._client.request('GET', '/zones')
+
+        assert (status.calls, status.limit, status.remaining) == (1, 3600, 42)
+        with pytest.raises(RuntimeError, match='wird nicht unterstützt'):
+            track_rate_limit(MagicMock(_client=MagicMock(_session=None)), status)
+
+    def test_stream_mit_budget_abgelehnt(self, data_dir, mock_client, mock_dns_resolver):
+        """Mit --stream gibt es keine Schätzung vorab, ein Budget würde ignoriert."""
+        from click.testing import CliRunner
+        from dnsjinja.dnsjinja import run
+        dj = self._make(data_dir, mock_client, {'example.com': 0})
+
+        result = CliRunner().invoke(run, ['-d', str(data_dir), '-c', str(dj.config_file), '--cache-dir', '',
+                                          '-u', '--stream', '--max-api-calls', '10'])
+
+        assert result.exit_code == 2
+        assert '--max-api-calls ist mit --stream nicht möglich' in result.output
+        mock_client.zones.create_rrset.assert_not_called()
+
+    def test_priority_laedt_wichtigste_domains_hoch(self, data_dir, mock_client, mock_dns_resolver):
+        """Nur die Domain mit der höchsten Priorität passt ins Budget."""
+        dj = self._make(data_dir, mock_client, {'a.example': 0, 'b.example': 5, 'c.example': 0},
+                        max_api_calls=3, over_budget='priority')
+        assert dj.estimate_api_calls('b.example').calls == 2
+
+        dj.upload_zones()
+
+        assert [c.args[0].name for c in mock_client.zones.get_rrset_all.call_args_list] == ['b.example']
+        assert dj.report.domains['b.example']['upload']['status'] == 'ok'
+        assert {dj.report.domains[d]['upload']['status'] for d in ('a.example', 'c.example')} == {'skipped'}
+        assert dj.exit_status_file.read_text(encoding='utf-8') == '250'
+
+    def test_within_budget_haelt_reihenfolge(self):
+        from dnsjinja.ratelimit import CallEstimate, within_budget
+        estimates = [CallEstimate('a', 1, 4, True), CallEstimate('b', 1, 1, True), CallEstimate('c', 1, 1, True)]
+        priority = {'a': 0, 'b': 0, 'c': 1}.get
+
+        assert within_budget(estimates, 8, priority) == (['c', 'a'], ['b'])
+        assert within_budget(estimates, 1, priority) == ([], ['c', 'a', 'b'])
+
+    def test_rate_limit_header_und_wartezeit(self):
+        from requests.structures import CaseInsensitiveDict
+        from dnsjinja.ratelimit import RateLimitStatus
+        status = RateLimitStatus()
+        status.observe(CaseInsensitiveDict({'ratelimit-limit': '3600', 'ratelimit-remaining': '10'}))
+        status.observe(CaseInsensitiveDict())
+
+        assert (status.calls, status.limit, status.remaining) == (2, 3600, 10)
+        assert status.wait_for(10) == 0.0
+        assert status.wait_for(70) == 60.0
+
+
+# ---------------------------------------------------------------------------
+# Impact-Index und dnsjinja who-uses
+# ---------------------------------------------------------------------------
+
+class TestImpactIndex:
+
+    ZONE_TEMPLATE = """\
+$ORIGIN {{ domain }}.
+$TTL 3600
+@ IN SOA hydrogen.ns.hetzner.com. dns.hetzner.com. {{ soa_serial }} 86400 10800 3600000 3600
+@ IN NS hydrogen.ns.hetzner.com.
+@ IN A {{ ip }}
+@ IN MX 10 {{ mx }}
+@ IN TXT "v=spf1 include:spf.{{ mx }} ip4:198.51.100.0/24 -all"
+www IN CNAME @
+_xmpp-server._tcp IN SRV 5 0 5269 xmpp.example.net.
+"""
+
+    def _make(self, data_dir, mock_client, **kwargs):
+        import json
+        from tests.conftest import make_config
+        (data_dir / 'templates' / 'test.tpl').write_text(self.ZONE_TEMPLATE, encoding='utf-8')
+        cfg = make_config(['a.example', 'b.example'])
+        cfg['domains']['a.example'].update(ip='192.0.2.1', mx='mx.provider.net.', mail='provider')
+        cfg['domains']['b.example'].update(ip='192.0.2.2', mx='mail', custom_groups=['shared'])
+        config_path = data_dir / 'config' / 'config.json'
+        config_path.write_text(json.dumps(cfg), encoding='utf-8')
+        TestParallelRendering._zones(mock_client, ['a.example', 'b.example'])
+        return DNSJinja(datadir=str(data_dir), config_file=str(config_path), auth_api_token='test-token-unit',
+                        cache_dir=str(data_dir / 'cache'), **kwargs)
+
+    def test_record_targets(self):
+        from dnsjinja.impact import record_targets
+        assert record_targets('MX', '10 mail', 'example.com') == ['mail.example.com']
+        assert record_targets('SRV', '0 5 443 .', 'example.com') == []
+        assert record_targets('AAAA', '2001:db8:0::1', 'example.com') == ['2001:db8::1']
+        assert record_targets('CAA', '0 issue "letsencrypt.org; validationmethods=dns-01"', 'x') == ['letsencrypt.org']
+        assert record_targets('TXT', '"v=spf1 a:Out.Example.NET" " ip6:2001:db8::/32 ~all"', 'x') == [
+            'out.example.net', '2001:db8::/32']
+        assert record_targets('TXT', '"google-site-verification=abc"', 'x') == []
+
+    @pytest.mark.parametrize('jobs', [1, 2])
+    def test_index_beim_rendern(self, data_dir, mock_client, mock_dns_resolver, jobs):
+        from dnsjinja.impact import ImpactIndex
+        dj = self._make(data_dir, mock_client, jobs=jobs)
+        index = ImpactIndex(dj.cache_dir, dj.config_file)          # wie who-uses: nur die Datei
+
+        assert [(m.domain, m.name, m.rdtype) for m in index.query('192.0.2.1')] == [('a.example', '@', 'A')]
+        assert {m.domain for m in index.query('MX.provider.net.')} == {'a.example'}
+        assert [m.domain for m in index.query('*.provider.net')] == ['a.example', 'a.example']
+        assert [m.domain for m in index.query('b.example')] == ['b.example']            # www CNAME @
+        assert [(m.domain, m.name) for m in index.query('mail:provider')] == [('a.example', '')]
+        assert [m.domain for m in index.query('group:shared')] == ['b.example']
+        assert {m.domain for m in index.query('xmpp.example.net')} == {'a.example', 'b.example'}
+        assert {m.domain for m in index.query('198.51.100.7')} == {'a.example', 'b.example'}   # ip4:-Netz
+        assert [m.domain for m in index.query('192.0.2.0/30')] == ['a.example', 'b.example']
+
+    def test_aktualisierung_und_entfernte_domains(self, data_dir, mock_client, mock_dns_resolver):
+        import json
+        dj = self._make(data_dir, mock_client)
+        cfg = json.loads(dj.config_file.read_text(encoding='utf-8'))
+        cfg['domains']['a.example']['ip'] = '203.0.113.9'
+        del cfg['domains']['b.example']
+        dj.config_file.write_text(json.dumps(cfg), encoding='utf-8')
+
+        dj = DNSJinja(datadir=str(data_dir), config_file=str(dj.config_file), auth_api_token='test-token-unit',
+                      cache_dir=str(data_dir / 'cache'))
+
+        assert dj.impact.query('192.0.2.1') == []
+        assert [m.domain for m in dj.impact.query('203.0.113.9')] == ['a.example']
+        assert set(json.loads(dj.impact.path.read_text(encoding='utf-8'))) == {'a.example'}
+
+    def test_who_uses_cli(self, data_dir, mock_client, mock_dns_resolver):
+        from click.testing import CliRunner
+        from dnsjinja.dnsjinja import run
+        dj = self._make(data_dir, mock_client)
+        runner = CliRunner()
+        args = ['-d', str(data_dir), '-c', str(dj.config_file), '--cache-dir', str(dj.cache_dir), 'who-uses']
+
+        result = runner.invoke(run, args + ['--domains-only', 'mail:provider', 'group:shared'])
+        assert (result.exit_code, result.output) == (0, 'a.example\nb.example\n')
+        result = runner.invoke(run, args + ['192.0.2.2'])
+        assert result.output == 'b.example\t@\tA\t192.0.2.2\n'
+        assert runner.invoke(run, args + ['192.0.2.99']).exit_code == 1
+
+
+# ---------------------------------------------------------------------------
+# Wiederholung vorübergehender Fehler (--retries)
+# ---------------------------------------------------------------------------
+
+class TestRetryQueue:
+
+    def test_vorübergehende_und_dauerhafte_fehler(self):
+        import requests
+        from dnsjinja.backends import BackendError
+        from dnsjinja.retry import is_transient
+
+        assert is_transient(hcloud.APIException(code=503, message='', details={}))
+        assert is_transient(hcloud.APIException(code=429, message='', details={}))
+        assert is_transient(hcloud.APIException(code='rate_limit_exceeded', message='', details={}))
+        assert is_transient(requests.exceptions.ConnectTimeout())
+        assert not is_transient(hcloud.APIException(code=422, message='', details={}))
+        assert not is_transient(hcloud.APIException(code='invalid_input', message='', details={}))
+        try:
+            raise BackendError('Server nicht erreichbar') from OSError('refused')
+        except BackendError as e:
+            assert is_transient(e)
+        assert not is_transient(BackendError('Update abgelehnt: REFUSED'))
+
+    def test_wartezeit_waechst_exponentiell_mit_obergrenze(self):
+        import random
+        from dnsjinja.retry import backoff_delay
+        rng = random.Random(1)
+
+        for attempt, bound in ((1, 2.0), (2, 4.0), (3, 8.0), (10, 60.0)):
+            delays = [backoff_delay(attempt, 2.0, 60.0, rng) for _ in range(200)]
+            assert 0 <= min(delays) and max(delays) <= bound
+            assert max(delays) > bound / 2
+
+    def test_spaeterer_fehler_nach_abgeschlossener_wiederholung(self):
+        """Ein vorübergehender Fehler nach der ersten Wiederholung wird ebenfalls wiederholt."""
+        import threading
+        import time
+        from dnsjinja.retry import RetryQueue
+        failures = {'a': 1, 'b': 1}
+        done: dict[str, tuple] = {}
+        a_done = threading.Event()
+
+        def fn(domain):
+            if failures[domain]:
+                failures[domain] -= 1
+                raise hcloud.APIException(code=503, message='Service Unavailable', details={})
+
+        def on_done(domain, error, attempts):
+            done[domain] = (error, attempts)
+            if domain == 'a':
+                a_done.set()
+
+        queue = RetryQueue((hcloud.APIException,), attempts=3, base=0.01)
+        queue.run('a', fn, on_done)
+        assert a_done.wait(5)
+        time.sleep(0.2)                 # der Scheduler der ersten Wiederholung ist beendet
+        queue.run('b', fn, on_done)
+        joined = threading.Thread(target=queue.join, daemon=True)
+        joined.start()
+        joined.join(5)
+
+        assert not joined.is_alive()
+        assert done == {'a': (None, 2), 'b': (None, 2)}
+
+    def test_upload_nach_vorübergehendem_fehler_wiederholt(
+        self, data_dir, config_file, mock_client, mock_dns_resolver, capsys
+    ):
+        mock_client.zones.create_rrset.side_effect = [
+            hcloud.APIException(code=503, message='Service Unavailable', details={}), MagicMock(),
+        ]
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                           upload=True, retries=2, retry_delay=0.01)
+
+        dj.upload_zones()
+
+        assert mock_client.zones.create_rrset.call_count == 2
+        assert dj.report.domains['example.com']['upload']['status'] == 'ok'
+        assert dj.report.domains['example.com']['upload']['attempts'] == 2
+        assert dj.report.exit_code == 0
+        assert 'Versuch 2/3' in capsys.readouterr().out
+
+    def test_dauerhafter_fehler_ohne_wiederholung(
+        self, data_dir, config_file, mock_client, mock_dns_resolver, capsys
+    ):
+        mock_client.zones.create_rrset.side_effect = hcloud.APIException(
+            code='invalid_input', message='ungültiger Record', details={})
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                           upload=True, retries=2, retry_delay=0.01)
+
+        dj.upload_zones()
+
+        mock_client.zones.create_rrset.assert_called_once()
+        entry = dj.report.domains['example.com']['upload']
+        assert (entry['status'], entry['attempts']) == ('failed', 1)
+        assert dj.exit_status_file.read_text(encoding='utf-8') == '254'
+        assert 'nicht aktualisiert' in capsys.readouterr().out
+
+    def test_fehlschlag_nach_allen_versuchen(
+        self, data_dir, mock_client, mock_dns_resolver, capsys
+    ):
+        """Die übrigen Domains laufen weiter; nur die gestörte Domain scheitert endgültig."""
+        TestParallelRendering._zones(mock_client, ['a.de', 'b.de'])
+        config_path = write_config(data_dir, ['a.de', 'b.de'])
+
+        def create_rrset(zone, **kwargs):
+            if zone.name == 'a.de':
+                raise hcloud.APIException(code=502, message='Bad Gateway', details={})
+            return MagicMock()
+
+        mock_client.zones.create_rrset.side_effect = create_rrset
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver,
+                           upload=True, retries=2, retry_delay=0.01)
+
+        dj.upload_zones()
+
+        assert dj.report.domains['a.de']['upload'] == {
+            'status': 'failed', 'message': str(hcloud.APIException(code=502, message='Bad Gateway', details={})),
+            'attempts': 3}
+        assert dj.report.domains['b.de']['upload']['status'] == 'ok'
+        assert dj.exit_status_file.read_text(encoding='utf-8') == '254'
+
+    def test_backup_wird_wiederholt(self, data_dir, config_file, mock_client, mock_dns_resolver):
+        export = mock_client.zones.export_zonefile
+        export.side_effect = [hcloud.APIException(code=429, message='Too Many Requests', details={}),
+                              export.return_value]
+        dj = make_dnsjinja(data_dir, config_file, mock_client, mock_dns_resolver,
+                           backup=True, retries=1, retry_delay=0.01)
+
+        dj.backup_zones()
+
+        assert export.call_count == 2
+        assert dj.report.domains['example.com']['backup'] == {'status': 'ok', 'attempts': 2}
+        assert len(list((data_dir / 'zone-backups').iterdir())) == 1
+
+    def test_stream_wiederholt_sicherung_vor_upload(self, data_dir, mock_client, mock_dns_resolver):
+        """Mit --stream bleibt die Zone bis zur Wiederholung erhalten; hochgeladen wird erst nach der Sicherung."""
+        TestParallelRendering._zones(mock_client, ['a.de', 'b.de'])
+        config_path = write_config(data_dir, ['a.de', 'b.de'])
+        calls = []
+        failures = {'export': 1, 'create': 1}
+
+        def step(kind, zone):
+            calls.append((kind, zone.name))
+            if zone.name == 'a.de' and failures[kind]:
+                failures[kind] -= 1
+                raise hcloud.APIException(code=503, message='Service Unavailable', details={})
+            return MagicMock(zonefile=f'$ORIGIN {zone.name}.')
+
+        mock_client.zones.export_zonefile.side_effect = lambda zone: step('export', zone)
+        mock_client.zones.create_rrset.side_effect = lambda zone, **kwargs: step('create', zone)
+        dj = make_dnsjinja(data_dir, config_path, mock_client, mock_dns_resolver,
+                           backup=True, upload=True, stream=True, retries=1, retry_delay=0.01)
+
+        dj.process_zones()
+
+        a = [kind for kind, name in calls if name == 'a.de']
+        assert a == ['export', 'export', 'create', 'create']
+        assert dj.report.domains['a.de'] == {
+            'backup': {'status': 'ok', 'attempts': 2},
+            'upload': {'status': 'ok', 'changes': 1, 'requests': 1, 'saved_requests': 0, 'attempts': 2},
+        }
+        assert dj.report.domains['b.de']['upload']['status'] == 'ok'
+        assert dj.zones == {} and dj._retained == set()